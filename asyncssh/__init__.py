@@ -31,7 +31,9 @@ from .channel import SSHTCPChannel, SSHUNIXChannel
 from .client import SSHClient
 
 from .connection import SSHClientConnection, SSHServerConnection
+from .connection import SSHClientConnectionOptions
 from .connection import create_connection, create_server, connect, listen
+from .connection import run_many
 
 from .editor import SSHLineEditorChannel
 
@@ -49,6 +51,8 @@ from .misc import BreakReceived, SignalReceived, TerminalSizeChanged
 
 from .pbe import KeyEncryptionError
 
+from .pool import SSHConnectionPool
+
 from .process import SSHClientProcess, SSHServerProcess
 from .process import SSHCompletedProcess, ProcessError
 from .process import DEVNULL, PIPE, STDOUT
@@ -70,7 +74,7 @@ from .session import SSHTCPSession, SSHUNIXSession
 from .server import SSHServer
 
 from .sftp import SFTPClient, SFTPClientFile, SFTPServer, SFTPError
-from .sftp import SFTPAttrs, SFTPVFSAttrs, SFTPName
+from .sftp import SFTPAttrs, SFTPVFSAttrs, SFTPLimits, SFTPName
 from .sftp import SEEK_SET, SEEK_CUR, SEEK_END
 
 from .stream import SSHReader, SSHWriter
@@ -20,9 +20,9 @@ try:
 except ImportError: # pragma: no cover
     _x509_available = False
 
-from .misc import ip_address
+from .misc import FileCache, ip_address
 from .pattern import HostPatternList, WildcardPatternList
-from .public_key import KeyImportError, import_public_key
+from .public_key import KeyImportError, import_public_key_data
 from .public_key import import_certificate, import_certificate_subject
 
 
@@ -30,7 +30,7 @@ class _SSHAuthorizedKeyEntry:
     """An entry in an SSH authorized_keys list"""
 
     def __init__(self, line):
-        self.key = None
+        self.key_data = None
         self.cert = None
         self.options = {}
 
@@ -46,8 +46,10 @@ class _SSHAuthorizedKeyEntry:
     def _import_key_or_cert(self, line):
         """Import key or certificate in this entry"""
 
+        # Public keys are only compared against, so they are kept
+        # encoded rather than decoded here
         try:
-            self.key = import_public_key(line)
+            self.key_data = import_public_key_data(line)
             return
         except KeyImportError:
             pass
@@ -66,7 +68,7 @@ class _SSHAuthorizedKeyEntry:
 
         if 'cert-authority' not in self.options:
             try:
-                self.key = None
+                self.key_data = None
                 self.cert = None
                 self._add_subject('subject', import_certificate_subject(line))
                 return
@@ -215,13 +217,23 @@ class _SSHAuthorizedKeyEntry:
 
 
 class SSHAuthorizedKeys:
-    """An SSH authorized keys list"""
+    """An SSH authorized keys list
+
+       Public key and CA entries are indexed by their encoded key data,
+       and X.509 entries which trust a specific certificate are indexed
+       by the key in that certificate, so that validation only needs to
+       check the options of entries for the key being validated.
+
+    """
 
     def __init__(self, data):
-        self._user_entries = []
-        self._ca_entries = []
+        self._user_entries = {}
+        self._ca_entries = {}
+        self._x509_cert_entries = {}
         self._x509_entries = []
 
+        x509_count = 0
+
         for line in data.splitlines():
             line = line.strip()
             if not line or line.startswith('#'):
@@ -232,24 +244,36 @@ class SSHAuthorizedKeys:
             except KeyImportError:
                 continue
 
-            if entry.key:
+            if entry.key_data:
                 if 'cert-authority' in entry.options:
-                    self._ca_entries.append(entry)
+                    entries = self._ca_entries
                 else:
-                    self._user_entries.append(entry)
+                    entries = self._user_entries
+
+                entries.setdefault(entry.key_data, []).append(entry)
             else:
-                self._x509_entries.append(entry)
+                # X.509 entries are kept with their position in the file,
+                # so the first match is returned when lists are combined
+                x509_entry = (x509_count, entry)
+                x509_count += 1
+
+                if entry.cert and 'cert-authority' not in entry.options:
+                    self._x509_cert_entries.setdefault(
+                        entry.cert.key.public_data, []).append(x509_entry)
+                else:
+                    self._x509_entries.append(x509_entry)
 
         if (not self._user_entries and not self._ca_entries and
-                not self._x509_entries):
+                not self._x509_cert_entries and not self._x509_entries):
             raise ValueError('No valid entries found')
 
     def validate(self, key, client_addr, cert_principals=None, ca=False):
         """Return whether a public key or CA is valid for authentication"""
 
-        for entry in self._ca_entries if ca else self._user_entries:
-            if (entry.key == key and
-                    entry.match_options(client_addr, cert_principals)):
+        entries = self._ca_entries if ca else self._user_entries
+
+        for entry in entries.get(key.public_data, ()):
+            if entry.match_options(client_addr, cert_principals):
                 return entry.options
 
         return None
@@ -257,12 +281,17 @@ class SSHAuthorizedKeys:
     def validate_x509(self, cert, client_addr):
         """Return whether an X.509 certificate is valid for authentication"""
 
-        for entry in self._x509_entries:
-            if (entry.cert and 'cert-authority' not in entry.options and
-                    (cert.key != entry.cert.key or
-                     cert.subject != entry.cert.subject)):
-                continue # pragma: no cover (work around bug in coverage tool)
+        cert_entries = [x509_entry for x509_entry in
+                        self._x509_cert_entries.get(cert.key.public_data, ())
+                        if cert.subject == x509_entry[1].cert.subject]
+
+        if cert_entries:
+            entries = sorted(cert_entries + self._x509_entries,
+                             key=lambda x509_entry: x509_entry[0])
+        else:
+            entries = self._x509_entries
 
+        for _, entry in entries:
             if entry.match_options(client_addr, cert.user_principals,
                                    cert.subject):
                 return entry.options, entry.cert
@@ -302,3 +331,9 @@ def read_authorized_keys(filename):
 
     with open(filename, 'r') as f:
         return import_authorized_keys(f.read())
+
+
+def create_authorized_keys_cache(max_entries):
+    """Return a cache of authorized_keys files, reloaded when they change"""
+
+    return FileCache(read_authorized_keys, max_entries)
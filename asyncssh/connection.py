@@ -28,7 +28,7 @@ from .agent import connect_agent, create_agent_listener
 from .auth import lookup_client_auth
 from .auth import get_server_auth_methods, lookup_server_auth
 
-from .auth_keys import read_authorized_keys
+from .auth_keys import create_authorized_keys_cache, read_authorized_keys
 
 from .channel import SSHClientChannel, SSHServerChannel
 from .channel import SSHTCPChannel, SSHUNIXChannel
@@ -70,7 +70,8 @@ from .kex import get_kex_algs, expand_kex_algs, get_kex
 
 from .keysign import find_keysign, get_keysign_keys
 
-from .known_hosts import match_known_hosts
+from .known_hosts import import_known_hosts, match_known_hosts
+from .known_hosts import read_cached_known_hosts
 
 from .listener import SSHTCPClientListener, SSHUNIXClientListener
 from .listener import create_tcp_forward_listener, create_unix_forward_listener
@@ -80,7 +81,8 @@ from .logging import logger
 
 from .mac import get_mac_algs
 
-from .misc import ChannelOpenError, DisconnectError, PasswordChangeRequired
+from .misc import ChannelOpenError, DisconnectError, Error
+from .misc import PasswordChangeRequired
 from .misc import async_context_manager, create_task, get_symbol_names
 from .misc import ip_address, map_handler_name
 
@@ -131,6 +133,28 @@ _DEFAULT_MAX_PKTSIZE = 32768        # 32 kiB
 # Default line editor parameters
 _DEFAULT_LINE_HISTORY = 1000        # 1000 lines
 
+# Default number of authorized_keys files cached by a server
+_DEFAULT_AUTH_KEYS_CACHE_SIZE = 1024
+
+# Default limit on connections opened at once by run_many
+_DEFAULT_RUN_MANY_CONCURRENCY = 32
+
+# Arguments to run_many which are used to build shared client options
+_CLIENT_OPTION_ARGS = ('known_hosts', 'x509_trusted_certs',
+                       'x509_trusted_cert_paths', 'client_host_keysign',
+                       'client_host_keys', 'client_keys', 'passphrase',
+                       'agent_path', 'client_version', 'kex_algs',
+                       'encryption_algs', 'mac_algs', 'compression_algs',
+                       'signature_algs')
+
+# Limits on cached KEXINIT algorithm lists and negotiated algorithms
+_MAX_CACHED_KEXINITS = 64
+_MAX_CACHED_ALG_CHOICES = 256
+_MAX_CACHED_PEER_KEXINIT_LEN = 4096
+
+_kexinit_cache = OrderedDict()
+_alg_choice_cache = OrderedDict()
+
 
 def _validate_version(version):
     """Validate requested SSH version"""
@@ -275,6 +299,7 @@ class SSHConnection(SSHPacketHandler):
         self._sig_algs = signature_algs
 
         self._kex = None
+        self._kexinit_algs = b''
         self._kexinit_sent = False
         self._kex_complete = False
         self._ignore_first_kex = False
@@ -942,17 +967,38 @@ class SSHConnection(SSHPacketHandler):
         self.logger.debug2('  MAC algs: %s', self._mac_algs)
         self.logger.debug2('  Compression algs: %s', self._cmp_algs)
 
-        cookie = os.urandom(16)
-        kex_algs = NameList(kex_algs + self._get_ext_info_kex_alg())
-        host_key_algs = NameList(host_key_algs)
-        enc_algs = NameList(self._enc_algs)
-        mac_algs = NameList(self._mac_algs)
-        cmp_algs = NameList(self._cmp_algs)
-        langs = NameList([])
+        kex_algs = kex_algs + self._get_ext_info_kex_alg()
+
+        # Everything after the cookie depends only on the configured
+        # algorithms, so it is encoded once and shared by all connections
+        # using the same configuration
+        cache_key = (tuple(kex_algs), tuple(host_key_algs),
+                     tuple(self._enc_algs), tuple(self._mac_algs),
+                     tuple(self._cmp_algs))
+
+        kexinit_algs = _kexinit_cache.pop(cache_key, None)
+
+        if kexinit_algs is None:
+            kex_algs = NameList(kex_algs)
+            host_key_algs = NameList(host_key_algs)
+            enc_algs = NameList(self._enc_algs)
+            mac_algs = NameList(self._mac_algs)
+            cmp_algs = NameList(self._cmp_algs)
+            langs = NameList([])
+
+            kexinit_algs = b''.join((kex_algs, host_key_algs, enc_algs,
+                                     enc_algs, mac_algs, mac_algs, cmp_algs,
+                                     cmp_algs, langs, langs, Boolean(False),
+                                     UInt32(0)))
+
+            if len(_kexinit_cache) >= _MAX_CACHED_KEXINITS:
+                _kexinit_cache.popitem(last=False)
 
-        packet = b''.join((Byte(MSG_KEXINIT), cookie, kex_algs, host_key_algs,
-                           enc_algs, enc_algs, mac_algs, mac_algs, cmp_algs,
-                           cmp_algs, langs, langs, Boolean(False), UInt32(0)))
+        _kexinit_cache[cache_key] = kexinit_algs
+        self._kexinit_algs = kexinit_algs
+
+        cookie = os.urandom(16)
+        packet = Byte(MSG_KEXINIT) + cookie + kexinit_algs
 
         if self.is_server():
             self._server_kexinit = packet
@@ -1367,13 +1413,15 @@ class SSHConnection(SSHPacketHandler):
         _ = packet.get_uint32()                         # reserved
         packet.check_end()
 
+        peer_kexinit = packet.get_consumed_payload()
+
         if self.is_server():
-            self._client_kexinit = packet.get_consumed_payload()
+            self._client_kexinit = peer_kexinit
 
             if b'ext-info-c' in peer_kex_algs and not self._session_id:
                 self._can_send_ext_info = True
         else:
-            self._server_kexinit = packet.get_consumed_payload()
+            self._server_kexinit = peer_kexinit
 
         if self._kexinit_sent:
             self._kexinit_sent = False
@@ -1383,10 +1431,6 @@ class SSHConnection(SSHPacketHandler):
         if self._gss:
             self._gss.reset()
 
-        gss_mechs = self._gss.mechs if self._gss else []
-        kex_algs = expand_kex_algs(self._kex_algs, gss_mechs,
-                                   bool(self._server_host_key_algs))
-
         self.logger.debug1('Received key exchange request')
         self.logger.debug2('  Key exchange algs: %s', peer_kex_algs)
         self.logger.debug2('  Host key algs: %s', peer_host_key_algs)
@@ -1399,7 +1443,31 @@ class SSHConnection(SSHPacketHandler):
         self.logger.debug2('    MAC algs: %s', mac_algs_sc)
         self.logger.debug2('    Compression algs: %s', cmp_algs_sc)
 
-        kex_alg = self._choose_alg('key exchange', kex_algs, peer_kex_algs)
+        # The choices depend only on the local algorithm lists and the
+        # peer's lists checked below, so they're cached by those. Peers
+        # control this key before authenticating, so unusually large
+        # KEXINIT payloads aren't cached at all.
+        if len(peer_kexinit) <= _MAX_CACHED_PEER_KEXINIT_LEN:
+            cache_key = (self.is_client(), self._kexinit_algs,
+                         tuple(peer_kex_algs), tuple(enc_algs_cs),
+                         tuple(enc_algs_sc), tuple(mac_algs_cs),
+                         tuple(mac_algs_sc), tuple(cmp_algs_cs),
+                         tuple(cmp_algs_sc))
+            algs = _alg_choice_cache.pop(cache_key, None)
+        else:
+            cache_key = None
+            algs = None
+
+        if algs:
+            kex_alg = algs[0]
+        else:
+            gss_mechs = self._gss.mechs if self._gss else []
+            kex_algs = expand_kex_algs(self._kex_algs, gss_mechs,
+                                       bool(self._server_host_key_algs))
+
+            kex_alg = self._choose_alg('key exchange', kex_algs,
+                                       peer_kex_algs)
+
         self._kex = get_kex(self, kex_alg)
         self._ignore_first_kex = (first_kex_follows and
                                   self._kex.algorithm != peer_kex_algs[0])
@@ -1412,18 +1480,27 @@ class SSHConnection(SSHPacketHandler):
                 raise DisconnectError(DISC_KEY_EXCHANGE_FAILED, 'Unable '
                                       'to find compatible server host key')
 
-        self._enc_alg_cs = self._choose_alg('encryption', self._enc_algs,
-                                            enc_algs_cs)
-        self._enc_alg_sc = self._choose_alg('encryption', self._enc_algs,
-                                            enc_algs_sc)
+        if not algs:
+            algs = (kex_alg,
+                    self._choose_alg('encryption', self._enc_algs,
+                                     enc_algs_cs),
+                    self._choose_alg('encryption', self._enc_algs,
+                                     enc_algs_sc),
+                    self._choose_alg('MAC', self._mac_algs, mac_algs_cs),
+                    self._choose_alg('MAC', self._mac_algs, mac_algs_sc),
+                    self._choose_alg('compression', self._cmp_algs,
+                                     cmp_algs_cs),
+                    self._choose_alg('compression', self._cmp_algs,
+                                     cmp_algs_sc))
+
+        if cache_key:
+            if len(_alg_choice_cache) >= _MAX_CACHED_ALG_CHOICES:
+                _alg_choice_cache.popitem(last=False)
 
-        self._mac_alg_cs = self._choose_alg('MAC', self._mac_algs, mac_algs_cs)
-        self._mac_alg_sc = self._choose_alg('MAC', self._mac_algs, mac_algs_sc)
+            _alg_choice_cache[cache_key] = algs
 
-        self._cmp_alg_cs = self._choose_alg('compression', self._cmp_algs,
-                                            cmp_algs_cs)
-        self._cmp_alg_sc = self._choose_alg('compression', self._cmp_algs,
-                                            cmp_algs_sc)
+        _, self._enc_alg_cs, self._enc_alg_sc, self._mac_alg_cs, \
+            self._mac_alg_sc, self._cmp_alg_cs, self._cmp_alg_sc = algs
 
         self.logger.debug1('Beginning key exchange')
         self.logger.debug2('  Key exchange alg: %s', self._kex.algorithm)
@@ -3406,7 +3483,8 @@ class SSHClientConnection(SSHConnection):
             raise
 
     @async_context_manager
-    def start_sftp_client(self, path_encoding='utf-8', path_errors='strict'):
+    def start_sftp_client(self, path_encoding='utf-8', path_errors='strict',
+                          cache_ttl=None, cache_size=1024):
         """Start an SFTP client
 
            This method is a coroutine which attempts to start a secure
@@ -3420,13 +3498,26 @@ class SSHClientConnection(SSHConnection):
            will be left as bytes rather than being converted to & from
            strings.
 
+           If cache_ttl is specified, file attributes and directory
+           listings retrieved by the client are cached for that many
+           seconds, with up to cache_size entries kept. Entries are
+           invalidated when the client itself modifies the paths they
+           refer to. See :class:`SFTPClient` for details.
+
            :param path_encoding:
                The Unicode encoding to apply when sending and receiving
                remote pathnames
            :param path_errors:
                The error handling strategy to apply on encode/decode errors
+           :param cache_ttl: (optional)
+               The number of seconds to cache file attributes and
+               directory listings for, or `None` to disable caching
+           :param cache_size: (optional)
+               The maximum number of entries to keep in the cache
            :type path_encoding: `str`
            :type path_errors: `str`
+           :type cache_ttl: `int` or `float`
+           :type cache_size: `int`
 
            :returns: :class:`SFTPClient`
 
@@ -3438,7 +3529,8 @@ class SSHClientConnection(SSHConnection):
                                                          encoding=None)
 
         return (yield from start_sftp_client(self, self._loop, reader, writer,
-                                             path_encoding, path_errors))
+                                             path_encoding, path_errors,
+                                             cache_ttl, cache_size))
 
 
 class SSHServerConnection(SSHConnection):
@@ -3480,10 +3572,11 @@ class SSHServerConnection(SSHConnection):
                  kex_algs, encryption_algs, mac_algs, compression_algs,
                  signature_algs, rekey_bytes, rekey_seconds,
                  server_host_keys, known_client_hosts, trust_client_host,
-                 authorized_client_keys, gss_host, allow_pty, line_editor,
-                 line_history, x11_forwarding, x11_auth_path, agent_forwarding,
-                 process_factory, session_factory, session_encoding,
-                 sftp_factory, allow_scp, window, max_pktsize, login_timeout):
+                 authorized_client_keys, authorized_keys_cache, gss_host,
+                 allow_pty, line_editor, line_history, x11_forwarding,
+                 x11_auth_path, agent_forwarding, process_factory,
+                 session_factory, session_encoding, sftp_factory, allow_scp,
+                 window, max_pktsize, login_timeout):
         super().__init__(server_factory, loop, server_version,
                          x509_trusted_certs, x509_trusted_cert_paths,
                          x509_purposes, kex_algs, encryption_algs, mac_algs,
@@ -3495,6 +3588,7 @@ class SSHServerConnection(SSHConnection):
         self._known_client_hosts = known_client_hosts
         self._trust_client_host = trust_client_host
         self._client_keys = authorized_client_keys
+        self._authorized_keys_cache = authorized_keys_cache
         self._allow_pty = allow_pty
         self._line_editor = line_editor
         self._line_history = line_history
@@ -4295,6 +4389,12 @@ class SSHServerConnection(SSHConnection):
            set the appropriate keys for the user attempting to
            authenticate.
 
+           When a filename is passed in, the parsed keys are cached by
+           the server which accepted this connection and shared with
+           later connections which set the same file, until the file
+           is modified. The number of files cached is set by the
+           `authorized_keys_cache_size` argument to :func:`create_server`.
+
            :param authorized_keys:
                The keys to trust for client public key authentication
            :type authorized_keys: *see* :ref:`SpecifyingAuthorizedKeys`
@@ -4302,7 +4402,7 @@ class SSHServerConnection(SSHConnection):
         """
 
         if isinstance(authorized_keys, str):
-            authorized_keys = read_authorized_keys(authorized_keys)
+            authorized_keys = self._authorized_keys_cache.load(authorized_keys)
 
         self._client_keys = authorized_keys
 
@@ -4673,6 +4773,218 @@ class SSHServerConnection(SSHConnection):
         return SSHReader(session, chan), SSHWriter(session, chan)
 
 
+class SSHClientConnectionOptions:
+    """Reusable SSH client connection options
+
+       This class loads the known hosts, trusted certificates, client
+       keys, and algorithm lists used to open SSH client connections
+       once, so that they can be shared by many calls to
+       :func:`create_connection` or :func:`connect` by passing this
+       object as their `options` argument. Without it, these files
+       are read and parsed again for every new connection.
+
+       The arguments here have the same meaning and defaults as the
+       arguments of the same name in :func:`create_connection`. Files
+       are read when this object is created, except that client keys
+       are requested from an ssh-agent when the first connection using
+       these options is opened. The agent connection and its keys are
+       then shared by all connections using these options until
+       :meth:`close` is called, after which the next connection opened
+       with them will query the agent again.
+
+       :param known_hosts: (optional)
+           The list of keys which will be used to validate the server
+           host key presented during the SSH handshake
+       :param x509_trusted_certs: (optional)
+           A list of certificates which should be trusted for X.509
+           server certificate authentication
+       :param x509_trusted_cert_paths: (optional)
+           A list of path names to "hash directories" containing
+           certificates which should be trusted for X.509 server
+           certificate authentication
+       :param client_host_keysign: (optional)
+           Whether or not to use `ssh-keysign` to sign host-based
+           authentication requests
+       :param client_host_keys: (optional)
+           A list of keys to use to authenticate this client via
+           host-based authentication
+       :param client_keys: (optional)
+           A list of keys which will be used to authenticate this client
+           via public key authentication
+       :param passphrase: (optional)
+           The passphrase to use to decrypt client keys when loading them
+       :param agent_path: (optional)
+           The path of a UNIX domain socket to use to contact an
+           ssh-agent process
+       :param client_version: (optional)
+           An ASCII string to advertise to the SSH server as the version
+           of this client
+       :param kex_algs: (optional)
+           A list of allowed key exchange algorithms in the SSH handshake
+       :param encryption_algs: (optional)
+           A list of encryption algorithms to use during the SSH handshake
+       :param mac_algs: (optional)
+           A list of MAC algorithms to use during the SSH handshake
+       :param compression_algs: (optional)
+           A list of compression algorithms to use during the SSH
+           handshake, or `None` to disable compression
+       :param signature_algs: (optional)
+           A list of public key signature algorithms to use during the
+           SSH handshake
+       :type known_hosts: *see* :ref:`SpecifyingKnownHosts`
+       :type x509_trusted_certs: *see* :ref:`SpecifyingCertificates`
+       :type x509_trusted_cert_paths: `list` of `str`
+       :type client_host_keysign: `bool` or `str`
+       :type client_host_keys:
+           *see* :ref:`SpecifyingPrivateKeys` or :ref:`SpecifyingPublicKeys`
+       :type client_keys: *see* :ref:`SpecifyingPrivateKeys`
+       :type passphrase: `str`
+       :type agent_path: `str` or :class:`SSHServerConnection`
+       :type client_version: `str`
+       :type kex_algs: `list` of `str`
+       :type encryption_algs: `list` of `str`
+       :type mac_algs: `list` of `str`
+       :type compression_algs: `list` of `str`
+       :type signature_algs: `list` of `str`
+
+    """
+
+    def __init__(self, *, known_hosts=(), x509_trusted_certs=(),
+                 x509_trusted_cert_paths=(), client_host_keysign=False,
+                 client_host_keys=None, client_keys=(), passphrase=None,
+                 agent_path=(), client_version=(), kex_algs=(),
+                 encryption_algs=(), mac_algs=(), compression_algs=(),
+                 signature_algs=()):
+        self._client_version = _validate_version(client_version)
+
+        self._kex_algs, self._encryption_algs, self._mac_algs, \
+            self._compression_algs, self._signature_algs = \
+                _validate_algs(kex_algs, encryption_algs, mac_algs,
+                               compression_algs, signature_algs,
+                               x509_trusted_certs is not None)
+
+        if x509_trusted_certs == ():
+            try:
+                x509_trusted_certs = load_certificates(
+                    os.path.join(os.path.expanduser('~'), '.ssh',
+                                 'ca-bundle.crt'))
+            except OSError:
+                pass
+        elif x509_trusted_certs is not None:
+            x509_trusted_certs = load_certificates(x509_trusted_certs)
+
+        if x509_trusted_cert_paths == ():
+            path = os.path.join(os.path.expanduser('~'), '.ssh', 'crt')
+            if os.path.isdir(path):
+                x509_trusted_cert_paths = [path]
+        elif x509_trusted_cert_paths:
+            for path in x509_trusted_cert_paths:
+                if not os.path.isdir(path):
+                    raise ValueError('Path not a directory: ' + str(path))
+
+        self._x509_trusted_certs = x509_trusted_certs
+        self._x509_trusted_cert_paths = x509_trusted_cert_paths
+
+        if known_hosts == ():
+            path = os.path.join(os.path.expanduser('~'), '.ssh', 'known_hosts')
+
+            # A missing file is reported when a connection is attempted
+            known_hosts = read_cached_known_hosts(path) \
+                if os.path.isfile(path) else path
+        elif isinstance(known_hosts, str):
+            known_hosts = read_cached_known_hosts(known_hosts)
+        elif isinstance(known_hosts, bytes):
+            known_hosts = import_known_hosts(known_hosts.decode())
+
+        self._known_hosts = known_hosts
+
+        if client_host_keysign:
+            client_host_keysign = find_keysign(client_host_keysign)
+
+            if client_host_keys:
+                client_host_keys = load_public_keys(client_host_keys)
+            else:
+                client_host_keys = load_default_host_public_keys()
+        else:
+            client_host_keys = load_keypairs(client_host_keys, passphrase)
+
+        self._client_host_keysign = client_host_keysign
+        self._client_host_keys = client_host_keys
+
+        if agent_path == ():
+            agent_path = os.environ.get('SSH_AUTH_SOCK', None)
+
+        if client_keys:
+            client_keys = load_keypairs(client_keys, passphrase)
+        elif client_keys == () and not agent_path:
+            client_keys = load_default_keypairs(passphrase)
+
+        self._agent_path = agent_path
+        self._agent = None
+        self._agent_keys = None
+
+        self._client_keys = client_keys
+        self._passphrase = passphrase
+        self._agent_lock = None
+
+    @asyncio.coroutine
+    def _get_client_keys(self, loop):
+        """Return client keys and the agent path to forward
+
+           When no client keys were specified, keys are requested from
+           the agent once, even when many connections using these
+           options are opened at the same time. They are kept until
+           close() is called, after which the agent is queried again.
+           If the agent can't be reached or returns no keys, keys are
+           loaded from the default key files instead.
+
+        """
+
+        if self._client_keys != ():
+            return self._client_keys, self._agent_path
+
+        if self._agent_lock is None:
+            self._agent_lock = asyncio.Lock(loop=loop)
+
+        with (yield from self._agent_lock):
+            if self._agent_keys is None:
+                agent_keys = None
+                agent = yield from connect_agent(self._agent_path, loop=loop)
+
+                if agent:
+                    # pylint: disable=broad-except
+                    try:
+                        agent_keys = yield from agent.get_keys()
+                    except Exception:
+                        agent.close()
+                        raise
+
+                    self._agent = agent
+
+                if not agent_keys:
+                    agent_keys = load_default_keypairs(self._passphrase)
+
+                self._agent_keys = agent_keys
+
+            agent_path = self._agent_path if self._agent else None
+
+            return self._agent_keys, agent_path
+
+    def close(self):
+        """Close the ssh-agent connection shared by these options
+
+           Keys requested from the agent are discarded, so connections
+           opened after this will query the agent again.
+
+        """
+
+        if self._agent:
+            self._agent.close()
+            self._agent = None
+
+        self._agent_keys = None
+
+
 @asyncio.coroutine
 def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
                       loop=None, tunnel=None, family=0, flags=0,
@@ -4687,7 +4999,7 @@ def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
                       client_version=(), kex_algs=(), encryption_algs=(),
                       mac_algs=(), compression_algs=(), signature_algs=(),
                       rekey_bytes=_DEFAULT_REKEY_BYTES,
-                      rekey_seconds=_DEFAULT_REKEY_SECONDS):
+                      rekey_seconds=_DEFAULT_REKEY_SECONDS, options=None):
     """Create an SSH client connection
 
        This function is a coroutine which can be run to create an outbound SSH
@@ -4871,6 +5183,12 @@ def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
        :param rekey_seconds: (optional)
            The maximum time in seconds before the SSH session key is
            renegotiated. This defaults to 1 hour.
+       :param options: (optional)
+           Preloaded options to share between many connections. When
+           this is set, the known hosts, trusted X.509 certificates and
+           paths, client host keys, client keys, agent path, client
+           version, and algorithm lists are taken from it, and the
+           arguments of those names passed here are ignored.
        :type client_factory: `callable`
        :type host: `str`
        :type port: `int`
@@ -4904,24 +5222,32 @@ def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
        :type signature_algs: `list` of `str`
        :type rekey_bytes: `int`
        :type rekey_seconds: `int`
+       :type options: :class:`SSHClientConnectionOptions`
 
        :returns: An :class:`SSHClientConnection` and :class:`SSHClient`
 
     """
 
+    # pylint: disable=protected-access
+
     def conn_factory():
         """Return an SSH client connection handler"""
 
-        return SSHClientConnection(client_factory, loop, client_version,
-                                   x509_trusted_certs, x509_trusted_cert_paths,
-                                   x509_purposes, kex_algs, encryption_algs,
-                                   mac_algs, compression_algs, signature_algs,
-                                   rekey_bytes, rekey_seconds, host, port,
-                                   known_hosts, username, password,
-                                   client_host_keysign, client_host_keys,
-                                   client_host, client_username, client_keys,
-                                   gss_host, gss_delegate_creds, agent,
-                                   agent_path, auth_waiter)
+        return SSHClientConnection(client_factory, loop,
+                                   options._client_version,
+                                   options._x509_trusted_certs,
+                                   options._x509_trusted_cert_paths,
+                                   x509_purposes, options._kex_algs,
+                                   options._encryption_algs, options._mac_algs,
+                                   options._compression_algs,
+                                   options._signature_algs, rekey_bytes,
+                                   rekey_seconds, host, port,
+                                   options._known_hosts, username, password,
+                                   options._client_host_keysign,
+                                   options._client_host_keys, client_host,
+                                   client_username, client_keys, gss_host,
+                                   gss_delegate_creds, agent, agent_path,
+                                   auth_waiter)
 
     if not client_factory:
         client_factory = SSHClient
@@ -4929,45 +5255,26 @@ def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
     if not loop:
         loop = asyncio.get_event_loop()
 
-    client_version = _validate_version(client_version)
-
-    kex_algs, encryption_algs, mac_algs, compression_algs, signature_algs = \
-        _validate_algs(kex_algs, encryption_algs, mac_algs, compression_algs,
-                       signature_algs, x509_trusted_certs is not None)
-
-    if x509_trusted_certs == ():
-        try:
-            x509_trusted_certs = load_certificates(
-                os.path.join(os.path.expanduser('~'), '.ssh', 'ca-bundle.crt'))
-        except OSError:
-            pass
-    elif x509_trusted_certs is not None:
-        x509_trusted_certs = load_certificates(x509_trusted_certs)
-
-    if x509_trusted_cert_paths == ():
-        path = os.path.join(os.path.expanduser('~'), '.ssh', 'crt')
-        if os.path.isdir(path):
-            x509_trusted_cert_paths = [path]
-    elif x509_trusted_cert_paths:
-        for path in x509_trusted_cert_paths:
-            if not os.path.isdir(path):
-                raise ValueError('Path not a directory: ' + str(path))
+    if options:
+        shared_options = True
+    else:
+        options = SSHClientConnectionOptions(
+            known_hosts=known_hosts, x509_trusted_certs=x509_trusted_certs,
+            x509_trusted_cert_paths=x509_trusted_cert_paths,
+            client_host_keysign=client_host_keysign,
+            client_host_keys=client_host_keys, client_keys=client_keys,
+            passphrase=passphrase, agent_path=agent_path,
+            client_version=client_version, kex_algs=kex_algs,
+            encryption_algs=encryption_algs, mac_algs=mac_algs,
+            compression_algs=compression_algs, signature_algs=signature_algs)
+
+        shared_options = False
 
     if username is None:
         username = getpass.getuser()
 
     username = saslprep(username)
 
-    if client_host_keysign:
-        client_host_keysign = find_keysign(client_host_keysign)
-
-        if client_host_keys:
-            client_host_keys = load_public_keys(client_host_keys)
-        else:
-            client_host_keys = load_default_host_public_keys()
-    else:
-        client_host_keys = load_keypairs(client_host_keys, passphrase)
-
     if client_username is None:
         client_username = getpass.getuser()
 
@@ -4976,24 +5283,10 @@ def create_connection(client_factory, host, port=_DEFAULT_PORT, *,
     if gss_host == ():
         gss_host = host
 
-    agent = None
+    client_keys, agent_path = yield from options._get_client_keys(loop)
 
-    if agent_path == ():
-        agent_path = os.environ.get('SSH_AUTH_SOCK', None)
-
-    if client_keys:
-        client_keys = load_keypairs(client_keys, passphrase)
-    elif client_keys == ():
-        if agent_path:
-            agent = yield from connect_agent(agent_path, loop=loop)
-
-            if agent:
-                client_keys = yield from agent.get_keys()
-            else:
-                agent_path = None
-
-        if not client_keys:
-            client_keys = load_default_keypairs(passphrase)
+    # An agent shared through options is closed by their owner instead
+    agent = None if shared_options else options._agent
 
     if not agent_forwarding:
         agent_path = None
@@ -5029,7 +5322,9 @@ def create_server(server_factory, host=None, port=_DEFAULT_PORT, *,
                   loop=None, family=0, flags=socket.AI_PASSIVE, backlog=100,
                   reuse_address=None, server_host_keys=None, passphrase=None,
                   known_client_hosts=None, trust_client_host=False,
-                  authorized_client_keys=None, x509_trusted_certs=(),
+                  authorized_client_keys=None,
+                  authorized_keys_cache_size=_DEFAULT_AUTH_KEYS_CACHE_SIZE,
+                  x509_trusted_certs=(),
                   x509_trusted_cert_paths=(), x509_purposes='secureShellClient',
                   gss_host=(), allow_pty=True, line_editor=True,
                   line_history=_DEFAULT_LINE_HISTORY,
@@ -5097,6 +5392,11 @@ def create_server(server_factory, host=None, port=_DEFAULT_PORT, *,
        :param authorized_client_keys: (optional)
            A list of authorized user and CA public keys which should be
            trusted for certifcate-based client public key authentication.
+       :param authorized_keys_cache_size: (optional)
+           The maximum number of authorized_keys files passed by name
+           to :meth:`SSHServerConnection.set_authorized_keys` to keep
+           parsed, reloading a file only when it is modified, or `0`
+           to read the file again on every call
        :param x509_trusted_certs: (optional)
            A list of certificates which should be trusted for X.509 client
            certificate authentication.  If this argument is explicitly set
@@ -5226,6 +5526,7 @@ def create_server(server_factory, host=None, port=_DEFAULT_PORT, *,
        :type known_client_hosts: *see* :ref:`SpecifyingKnownHosts`
        :type trust_client_host: `bool`
        :type authorized_client_keys: *see* :ref:`SpecifyingAuthorizedKeys`
+       :type authorized_keys_cache_size: `int`
        :type x509_trusted_certs: *see* :ref:`SpecifyingCertificates`
        :type x509_trusted_cert_paths: `list` of `str`
        :type x509_purposes: *see* :ref:`SpecifyingX509Purposes`
@@ -5267,7 +5568,8 @@ def create_server(server_factory, host=None, port=_DEFAULT_PORT, *,
                                    rekey_bytes, rekey_seconds,
                                    server_host_keys, known_client_hosts,
                                    trust_client_host, authorized_client_keys,
-                                   gss_host, allow_pty, line_editor,
+                                   authorized_keys_cache, gss_host,
+                                   allow_pty, line_editor,
                                    line_history, x11_forwarding, x11_auth_path,
                                    agent_forwarding, process_factory,
                                    session_factory, session_encoding,
@@ -5313,6 +5615,9 @@ def create_server(server_factory, host=None, port=_DEFAULT_PORT, *,
     if isinstance(authorized_client_keys, str):
         authorized_client_keys = read_authorized_keys(authorized_client_keys)
 
+    authorized_keys_cache = \
+        create_authorized_keys_cache(authorized_keys_cache_size)
+
     if x509_trusted_certs is not None:
         x509_trusted_certs = load_certificates(x509_trusted_certs)
 
@@ -5354,6 +5659,151 @@ def connect(host, port=_DEFAULT_PORT, **kwargs):
     return conn
 
 
+@asyncio.coroutine
+def _run_on_host(host, command, sem, timeout, check, loop, kwargs):
+    """Connect to a host and run a command on it for run_many"""
+
+    @asyncio.coroutine
+    def _run():
+        """Open the connection and run the command"""
+
+        if isinstance(host, tuple):
+            conn, _ = yield from create_connection(None, *host, loop=loop,
+                                                   **kwargs)
+        else:
+            conn, _ = yield from create_connection(None, host, loop=loop,
+                                                   **kwargs)
+
+        with conn:
+            return (yield from conn.run(command, check=check))
+
+    with (yield from sem):
+        try:
+            result = yield from asyncio.wait_for(_run(), timeout, loop=loop)
+        except (OSError, Error, asyncio.TimeoutError) as exc:
+            result = exc
+
+    return host, result
+
+
+def run_many(hosts, command, *, concurrency=_DEFAULT_RUN_MANY_CONCURRENCY,
+             timeout=None, check=False, progress_handler=None, loop=None,
+             options=None, **kwargs):
+    """Run a command on many hosts and return results as they finish
+
+       This function opens SSH client connections to each of the hosts
+       listed, runs the requested command on each of them, and returns
+       an iterator over the results in the order they complete. Like
+       :func:`asyncio.as_completed`, each item returned by the iterator
+       is a coroutine which must be waited on to get the next result::
+
+           for next_result in asyncssh.run_many(hosts, 'ls'):
+               host, result = yield from next_result
+
+       Each result is a tuple of the host and either an
+       :class:`SSHCompletedProcess` or the exception raised while
+       connecting to that host or running the command there.
+
+       At most `concurrency` connections are open at any one time. If
+       a timeout is set, connecting to each host and running the
+       command on it must complete within that many seconds, or
+       :exc:`asyncio.TimeoutError` is returned as the result for that
+       host.
+
+       Known hosts, trusted certificates, and client keys are loaded
+       once and shared by all of the connections. They can be set by
+       passing in an :class:`SSHClientConnectionOptions` object or by
+       passing the arguments used to create one, which are used to
+       create such an object here. All other keyword arguments are
+       passed to :func:`create_connection` for each host.
+
+       If a progress handler is set, it is called each time a host
+       completes with the host, its result, the number of hosts
+       which have completed so far, and the total number of hosts.
+
+       :param hosts:
+           The hosts to run the command on, each either a hostname or
+           address, or a tuple of a hostname or address and a port
+       :param command:
+           The command to run on each host
+       :param concurrency: (optional)
+           The maximum number of hosts to connect to at once
+       :param timeout: (optional)
+           The number of seconds allowed for each host to finish, or
+           `None` to allow hosts to take any amount of time
+       :param check: (optional)
+           Whether or not to return :exc:`ProcessError` when a non-zero
+           exit status is returned
+       :param progress_handler: (optional)
+           A callable to call when each host completes
+       :param loop: (optional)
+           The event loop to use when running the commands
+       :param options: (optional)
+           Preloaded options to share between the connections
+       :type hosts: `list` of `str` or `tuple`
+       :type command: `str`
+       :type concurrency: `int`
+       :type timeout: `int` or `float`
+       :type check: `bool`
+       :type progress_handler: `callable`
+       :type options: :class:`SSHClientConnectionOptions`
+
+       :returns: An iterator of coroutines returning a tuple of a host
+                 and either an :class:`SSHCompletedProcess` or an
+                 exception
+
+    """
+
+    def _host_done(task):
+        """Report progress when a host completes"""
+
+        nonlocal completed
+
+        completed += 1
+
+        # Unexpected errors are raised to the caller by as_completed
+        if progress_handler and not task.cancelled() and \
+                not task.exception():
+            host, result = task.result()
+            progress_handler(host, result, completed, len(tasks))
+
+    def _all_done(_):
+        """Close the options created here once all hosts complete"""
+
+        options.close()
+
+    if loop is None:
+        loop = asyncio.get_event_loop()
+
+    if options is None:
+        option_args = {name: kwargs.pop(name) for name in _CLIENT_OPTION_ARGS
+                       if name in kwargs}
+        options = SSHClientConnectionOptions(**option_args)
+        close_options = True
+    else:
+        close_options = False
+
+    completed = 0
+    sem = asyncio.Semaphore(concurrency, loop=loop)
+    kwargs['options'] = options
+
+    tasks = [create_task(_run_on_host(host, command, sem, timeout,
+                                      check, loop, kwargs), loop=loop)
+             for host in hosts]
+
+    for task in tasks:
+        task.add_done_callback(_host_done)
+
+    if close_options:
+        if tasks:
+            waiter = asyncio.gather(*tasks, loop=loop, return_exceptions=True)
+            waiter.add_done_callback(_all_done)
+        else:
+            options.close()
+
+    return asyncio.as_completed(tasks, loop=loop)
+
+
 @asyncio.coroutine
 def listen(host=None, port=_DEFAULT_PORT, **kwargs):
     """Start an SSH server
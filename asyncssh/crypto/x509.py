@@ -12,10 +12,13 @@
 
 """A shim around PyCA and PyOpenSSL for X.509 certificates"""
 
+from calendar import timegm
+from collections import OrderedDict
 from datetime import datetime, timezone
 from ipaddress import ip_address
 import re
 import sys
+import time
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.hashes import MD5, SHA1, SHA224
@@ -45,6 +48,15 @@ _hashes = {h.name: h for h in (MD5, SHA1, SHA224, SHA256, SHA384, SHA512)}
 
 _nscomment_oid = x509.ObjectIdentifier('2.16.840.1.113730.1.13')
 
+# Maximum number of successful certificate validations to remember
+_MAX_CACHED_VALIDATIONS = 1024
+
+# Maximum number of trust stores built from different trusted cert sets
+_MAX_CACHED_STORES = 64
+
+_validation_cache = OrderedDict()
+_store_cache = OrderedDict()
+
 if sys.platform == 'win32': # pragma: no cover
     # Windows' datetime.max is year 9999, but timestamps that large don't work
     _gen_time_max = datetime(2999, 12, 31, 23, 59, 59, 999999,
@@ -53,6 +65,24 @@ else:
     _gen_time_max = datetime.max.replace(tzinfo=timezone.utc).timestamp() - 1
 
 
+def _get_x509_store(trust_key, trust_store):
+    """Return an OpenSSL trust store for a set of trusted certificates"""
+
+    x509_store = _store_cache.pop(trust_key, None)
+
+    if x509_store is None:
+        x509_store = crypto.X509Store()
+
+        for c in trust_store:
+            x509_store.add_cert(c.openssl_cert)
+
+        if len(_store_cache) >= _MAX_CACHED_STORES:
+            _store_cache.popitem(last=False)
+
+    _store_cache[trust_key] = x509_store
+    return x509_store
+
+
 def _to_generalized_time(t):
     """Convert a timestamp value to a datetime"""
 
@@ -212,6 +242,7 @@ class X509Certificate:
 
         self.subject = X509Name(cert.subject)
         self.issuer = X509Name(cert.issuer)
+        self.valid_before = timegm(cert.not_valid_after.utctimetuple())
         self.key_data = cert.public_key().public_bytes(
             Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
 
@@ -266,10 +297,21 @@ class X509Certificate:
         if host_principal and host_principal not in self.host_principals:
             raise ValueError('Certificate host principal mismatch')
 
-        x509_store = crypto.X509Store()
+        # Successful chain verifications are remembered until the first
+        # certificate involved in them expires
+        now = time.time()
+        trust_key = frozenset(c.data for c in trust_store)
+        cache_key = (self.data, trust_key)
+        valid_before = _validation_cache.get(cache_key)
 
-        for c in trust_store:
-            x509_store.add_cert(c.openssl_cert)
+        if valid_before is not None:
+            if now < valid_before:
+                _validation_cache.move_to_end(cache_key)
+                return
+
+            del _validation_cache[cache_key]
+
+        x509_store = _get_x509_store(trust_key, trust_store)
 
         try:
             x509_ctx = crypto.X509StoreContext(x509_store, self.openssl_cert)
@@ -277,6 +319,15 @@ class X509Certificate:
         except crypto.X509StoreContextError as exc:
             raise ValueError(str(exc)) from None
 
+        # Trusted certificates which have already expired can't be part
+        # of the chain which was just verified
+        _validation_cache[cache_key] = min(
+            [self.valid_before] +
+            [c.valid_before for c in trust_store if c.valid_before > now])
+
+        if len(_validation_cache) > _MAX_CACHED_VALIDATIONS:
+            _validation_cache.popitem(last=False)
+
 
 def generate_x509_certificate(signing_key, key, subject, issuer, serial,
                               valid_after, valid_before, ca, ca_path_len,
@@ -18,6 +18,7 @@
 
 import binascii
 import hmac
+from collections import OrderedDict
 from hashlib import sha1
 
 try:
@@ -26,13 +27,22 @@ try:
 except ImportError: # pragma: no cover
     _x509_available = False
 
-from .misc import ip_address
+from .misc import FileCache, ip_address
 from .pattern import HostPatternList
 from .public_key import KeyImportError, import_public_key
+from .public_key import import_public_key_data
 from .public_key import import_certificate, import_certificate_subject
 from .public_key import load_public_keys, load_certificates
 
 
+# Limits on the number of lookup results cached by an SSHKnownHosts object
+_MAX_CACHED_MATCHES = 1024
+_MAX_CACHED_HASHES = 1024
+
+# Maximum number of parsed known_hosts files to keep cached
+_MAX_CACHED_FILES = 32
+
+
 def _load_subject_names(names):
     """Load a list of X.509 subject name patterns"""
 
@@ -42,6 +52,56 @@ def _load_subject_names(names):
     return list(map(X509NamePattern, names))
 
 
+class _KnownHostsEntry:
+    """A key, certificate, or subject in a known_hosts file
+
+       The encoding of a public key is checked when the entry is
+       created, but the key itself is only decoded the first time it
+       matches a host, since most keys in a large file are never used.
+       Certificates and subjects are decoded right away.
+
+       KeyImportError is raised if the data isn't a valid public key,
+       certificate, or subject.
+
+    """
+
+    def __init__(self, marker, data):
+        self.marker = marker
+        self._data = data
+        self._decoded = None
+
+        try:
+            import_public_key_data(data)
+            return
+        except KeyImportError:
+            pass
+
+        try:
+            self._decoded = None, import_certificate(data), None
+            return
+        except KeyImportError:
+            if not _x509_available: # pragma: no cover
+                raise
+
+        subject = import_certificate_subject(data)
+        self._decoded = None, None, X509NamePattern(subject)
+
+    def decode(self):
+        """Return the key, certificate, and subject in this entry
+
+           An empty tuple is returned if the key couldn't be decoded.
+
+        """
+
+        if self._decoded is None:
+            try:
+                self._decoded = import_public_key(self._data), None, None
+            except KeyImportError:
+                self._decoded = ()
+
+        return self._decoded
+
+
 class _PlainHost:
     """A plain host entry in a known_hosts file"""
 
@@ -73,26 +133,33 @@ class _HashedHost:
             raise ValueError('Invalid known hosts hash type: %s' %
                              magic) from None
 
-    def _match(self, value):
-        """Return whether this host hash matches a value"""
+    def hash_matches(self, data):
+        """Return whether this host hash matches an encoded value"""
 
-        hosthash = hmac.new(self._salt, value.encode(), sha1).digest()
+        hosthash = hmac.new(self._salt, data, sha1).digest()
         return hosthash == self._hosthash
 
-    def matches(self, host, addr, ip):
-        """Return whether a host or address matches this host hash"""
-
-        # pylint: disable=unused-argument
 
-        return (host and self._match(host)) or (addr and self._match(addr))
+class SSHKnownHosts:
+    """An SSH known hosts list
 
+       The hashed entries matching a host or address are cached, so
+       that the HMAC of each entry isn't recomputed every time that
+       value is looked up. Since each line of a hashed known_hosts
+       file is given its own random salt, an HMAC is still computed
+       for every hashed entry the first time a value is looked up.
+       The results of recent lookups are also cached, so repeated
+       connections to the same hosts don't need to scan the list
+       again.
 
-class SSHKnownHosts:
-    """An SSH known hosts list"""
+    """
 
     def __init__(self, known_hosts):
         self._exact_entries = {}
         self._pattern_entries = []
+        self._hashed_entries = []
+        self._match_cache = OrderedDict()
+        self._hash_cache = OrderedDict()
 
         for line in known_hosts.splitlines():
             line = line.strip()
@@ -113,53 +180,58 @@ class SSHKnownHosts:
                 raise ValueError('Invalid known hosts marker: %s' %
                                  marker) from None
 
-            key = None
-            cert = None
-            subject = None
-
             try:
-                key = import_public_key(data)
+                match = _KnownHostsEntry(marker, data)
             except KeyImportError:
-                try:
-                    cert = import_certificate(data)
-                except KeyImportError:
-                    if not _x509_available: # pragma: no cover
-                        continue
-
-                    try:
-                        subject = import_certificate_subject(data)
-                    except KeyImportError:
-                        # Ignore keys in the file that we're unable to parse
-                        continue
-
-                    subject = X509NamePattern(subject)
+                # Ignore keys in the file that we're unable to parse
+                continue
 
             if any(c in pattern for c in '*?|/!'):
-                self._add_pattern(marker, pattern, key, cert, subject)
+                self._add_pattern(pattern, match)
             else:
-                self._add_exact(marker, pattern, key, cert, subject)
+                self._add_exact(pattern, match)
 
-    def _add_exact(self, marker, pattern, key, cert, subject):
+    def _add_exact(self, pattern, match):
         """Add an exact match entry"""
 
         for entry in pattern.split(','):
             if entry not in self._exact_entries:
                 self._exact_entries[entry] = []
 
-            self._exact_entries[entry].append((marker, key, cert, subject))
+            self._exact_entries[entry].append(match)
 
-    def _add_pattern(self, marker, pattern, key, cert, subject):
+    def _add_pattern(self, pattern, match):
         """Add a pattern match entry"""
 
         if pattern.startswith('|'):
             entry = _HashedHost(pattern)
+            self._hashed_entries.append(entry)
         else:
             entry = _PlainHost(pattern)
 
-        self._pattern_entries.append((entry, (marker, key, cert, subject)))
+        self._pattern_entries.append((entry, match))
 
-    def _match(self, host, addr, port=None):
-        """Find host keys matching specified host, address, and port"""
+    def _match_hashed(self, value):
+        """Return the set of hashed entries matching a host or address"""
+
+        if not value:
+            return frozenset()
+
+        try:
+            matches = self._hash_cache.pop(value)
+        except KeyError:
+            data = value.encode()
+            matches = frozenset(entry for entry in self._hashed_entries
+                                if entry.hash_matches(data))
+
+            if len(self._hash_cache) >= _MAX_CACHED_HASHES:
+                self._hash_cache.popitem(last=False)
+
+        self._hash_cache[value] = matches
+        return matches
+
+    def _match_entries(self, host, addr, port):
+        """Find entries matching specified host, address, and port"""
 
         ip = ip_address(addr) if addr else None
 
@@ -167,11 +239,41 @@ class SSHKnownHosts:
             host = '[{}]:{}'.format(host, port) if host else None
             addr = '[{}]:{}'.format(addr, port) if addr else None
 
+        if self._hashed_entries:
+            hashed = self._match_hashed(host) | self._match_hashed(addr)
+        else:
+            hashed = frozenset()
+
         matches = []
         matches += self._exact_entries.get(host, [])
         matches += self._exact_entries.get(addr, [])
         matches += (match for (entry, match) in self._pattern_entries
-                    if entry.matches(host, addr, ip))
+                    if (entry in hashed if isinstance(entry, _HashedHost)
+                        else entry.matches(host, addr, ip)))
+
+        return matches
+
+    def _match(self, host, addr, port=None):
+        """Find host keys matching specified host, address, and port"""
+
+        cache_key = (host, addr, port)
+
+        try:
+            result = self._match_cache.pop(cache_key)
+        except KeyError:
+            result = self._sort_matches(self._match_entries(host, addr, port))
+
+            if len(self._match_cache) >= _MAX_CACHED_MATCHES:
+                self._match_cache.popitem(last=False)
+
+        self._match_cache[cache_key] = result
+
+        # Return copies so callers can't modify the cached results
+        return tuple(list(keys) for keys in result)
+
+    @staticmethod
+    def _sort_matches(matches):
+        """Sort matching entries into keys, certificates, and subjects"""
 
         host_keys = []
         ca_keys = []
@@ -181,7 +283,15 @@ class SSHKnownHosts:
         x509_subjects = []
         revoked_subjects = []
 
-        for marker, key, cert, subject in matches:
+        for match in matches:
+            decoded = match.decode()
+
+            if not decoded:
+                continue
+
+            marker = match.marker
+            key, cert, subject = decoded
+
             if key:
                 if marker == 'revoked':
                     revoked_keys.append(key)
@@ -203,6 +313,23 @@ class SSHKnownHosts:
         return (host_keys, ca_keys, revoked_keys, x509_certs, revoked_certs,
                 x509_subjects, revoked_subjects)
 
+    def precompute(self, hosts):
+        """Precompute hashed entry lookups for frequently contacted hosts
+
+           This method looks up a list of host names, addresses, or
+           "[host]:port" values against the hashed entries in this
+           known hosts list ahead of time, so that later matches
+           against these values don't need to compute any hashes.
+
+           :param hosts:
+               The host names and addresses to precompute lookups for
+           :type hosts: `list` of `str`
+
+        """
+
+        for host in hosts:
+            self._match_hashed(host)
+
     def match(self, host, addr, port):
         """Match a host, IP address, and port against known_hosts patterns
 
@@ -251,6 +378,7 @@ def import_known_hosts(data):
 
     return SSHKnownHosts(data)
 
+
 def read_known_hosts(filename):
     """Read SSH known hosts from a file
 
@@ -269,6 +397,21 @@ def read_known_hosts(filename):
         return import_known_hosts(f.read())
 
 
+_known_hosts_cache = FileCache(read_known_hosts, _MAX_CACHED_FILES)
+
+
+def read_cached_known_hosts(filename):
+    """Read SSH known hosts from a file, reusing an earlier parse
+
+       The parsed known hosts are shared with other callers reading
+       the same file until it is modified, so this is only used
+       internally where the result is never handed back to the caller.
+
+    """
+
+    return _known_hosts_cache.load(filename)
+
+
 def match_known_hosts(known_hosts, host, addr, port):
     """Match a host, IP address, and port against a known_hosts list
 
@@ -308,7 +451,7 @@ def match_known_hosts(known_hosts, host, addr, port):
     """
 
     if isinstance(known_hosts, str):
-        known_hosts = read_known_hosts(known_hosts)
+        known_hosts = read_cached_known_hosts(known_hosts)
     elif isinstance(known_hosts, bytes):
         known_hosts = import_known_hosts(known_hosts.decode())
 
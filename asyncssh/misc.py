@@ -16,6 +16,7 @@ import asyncio
 import codecs
 import functools
 import ipaddress
+import os
 import platform
 import socket
 
@@ -182,6 +183,51 @@ def async_context_manager(coro):
         return coro
 
 
+class FileCache:
+    """Cache of objects loaded from files, reloaded when files change
+
+       Objects are cached by absolute path and returned again as long
+       as the file's modification time, size, and inode are unchanged.
+       Up to max_entries files are cached, evicting the least recently
+       used one when the cache is full. If max_entries is zero, files
+       are loaded again on every call.
+
+    """
+
+    def __init__(self, loader, max_entries):
+        self._loader = loader
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def load(self, filename):
+        """Return the object loaded from a file, reloading it if changed"""
+
+        path = os.path.abspath(filename)
+        file_stat = os.stat(path)
+        stamp = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
+        cached = self._entries.pop(path, None)
+
+        if cached and cached[0] == stamp:
+            result = cached[1]
+        else:
+            result = self._loader(filename)
+
+            if not self._max_entries:
+                return result
+
+            if len(self._entries) >= self._max_entries:
+                self._entries.popitem(last=False)
+
+        self._entries[path] = (stamp, result)
+        return result
+
+    def clear(self):
+        """Remove all cached objects"""
+
+        self._entries.clear()
+
+
 class Record:
     """General-purpose record type with fixed set of fields"""
 
@@ -273,6 +319,30 @@ class ChannelOpenError(Error):
         super().__init__('Channel Open', code, reason, lang)
 
 
+class SFTPError(Error):
+    """SFTP error
+
+       This exception is raised when an error occurs while processing
+       an SFTP request. Exception codes should be taken from
+       :ref:`SFTP error codes <SFTPErrorCodes>`.
+
+       :param code:
+           Disconnect reason, taken from :ref:`disconnect reason
+           codes <DisconnectReasons>`
+       :param reason:
+           A human-readable reason for the disconnect
+       :param lang:
+           The language the reason is in
+       :type code: `int`
+       :type reason: `str`
+       :type lang: `str`
+
+    """
+
+    def __init__(self, code, reason, lang=DEFAULT_LANG):
+        super().__init__('SFTP', code, reason, lang)
+
+
 class PasswordChangeRequired(Exception):
     """SSH password change required
 
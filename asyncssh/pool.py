@@ -0,0 +1,451 @@
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+"""SSH client connection pool"""
+
+import asyncio
+
+from functools import partial
+
+from .client import SSHClient
+
+from .connection import _DEFAULT_PORT, create_connection
+
+from .misc import ChannelOpenError, create_task
+
+
+# Default limits on how connections in the pool are shared and retained
+_DEFAULT_MAX_CHANNELS = 10
+_DEFAULT_IDLE_TIMEOUT = 300         # 5 minutes
+_DEFAULT_KEEPALIVE_INTERVAL = 60    # 1 minute
+_DEFAULT_KEEPALIVE_TIMEOUT = 15     # 15 seconds
+
+
+class _PoolEntry:
+    """A connection in an SSH connection pool"""
+
+    def __init__(self, key, max_channels):
+        self.key = key
+        self.max_channels = max_channels
+        self.waiter = None
+        self.conn = None
+        self.channels = 0
+        self.last_used = 0
+        self.idle_handle = None
+
+
+class _PoolClient(SSHClient):
+    """SSH client which removes its connection from a pool when closed"""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def connection_lost(self, exc):
+        """Remove this connection from the pool when it is closed"""
+
+        # pylint: disable=protected-access
+        self._pool._discard(self._entry)
+
+
+class SSHConnectionPool:
+    """SSH client connection pool
+
+       This class keeps a set of authenticated SSH client connections
+       open and reuses them to open new sessions, avoiding the cost of
+       setting up a new TCP connection, key exchange, and authentication
+       for every command run against the same host.
+
+       Connections are keyed by host, port, username, and options,
+       where options is an optional :class:`SSHClientConnectionOptions`
+       object. Any other keyword arguments passed when the pool is
+       created are passed to :func:`create_connection` whenever the
+       pool opens a new connection.
+
+       Up to `max_channels` sessions are opened on each connection
+       before another connection to the same host is opened. If the
+       server refuses to open a session on a connection which already
+       has other sessions open, such as when its `MaxSessions` limit
+       is reached, the limit for that connection is lowered and the
+       session is opened on another connection instead.
+
+       Connections which have been idle for more than `idle_timeout`
+       seconds are closed. Before a connection which hasn't been used
+       for `keepalive_interval` seconds is reused, a keepalive global
+       request is sent on it, and the connection is replaced by a new
+       one if no response arrives within `keepalive_timeout` seconds.
+
+       :param loop: (optional)
+           The event loop to use when opening connections, defaulting to
+           the current event loop
+       :param max_channels: (optional)
+           The maximum number of sessions to open at once on each
+           connection
+       :param idle_timeout: (optional)
+           The number of seconds a connection with no open sessions is
+           kept before it is closed, or `None` to keep idle connections
+           open until the pool is closed
+       :param keepalive_interval: (optional)
+           The number of seconds a connection can be unused before it
+           is checked with a keepalive request, or `None` to disable
+           these checks
+       :param keepalive_timeout: (optional)
+           The number of seconds to wait for a keepalive response
+       :type max_channels: `int`
+       :type idle_timeout: `int` or `float`
+       :type keepalive_interval: `int` or `float`
+       :type keepalive_timeout: `int` or `float`
+
+    """
+
+    def __init__(self, *, loop=None, max_channels=_DEFAULT_MAX_CHANNELS,
+                 idle_timeout=_DEFAULT_IDLE_TIMEOUT,
+                 keepalive_interval=_DEFAULT_KEEPALIVE_INTERVAL,
+                 keepalive_timeout=_DEFAULT_KEEPALIVE_TIMEOUT, **kwargs):
+        if max_channels < 1:
+            raise ValueError('max_channels must be at least 1')
+
+        self._loop = loop or asyncio.get_event_loop()
+        self._max_channels = max_channels
+        self._idle_timeout = idle_timeout
+        self._keepalive_interval = keepalive_interval
+        self._keepalive_timeout = keepalive_timeout
+        self._kwargs = kwargs
+        self._entries = {}
+        self._closing = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @asyncio.coroutine
+    def __aenter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __aexit__(self, *exc_info):
+        self.close()
+        yield from self.wait_closed()
+
+    @asyncio.coroutine
+    def _connect(self, entry):
+        """Open a new connection for a pool entry"""
+
+        host, port, username, options = entry.key
+
+        conn, _ = yield from create_connection(
+            lambda: _PoolClient(self, entry), host, port, loop=self._loop,
+            username=username, options=options, **self._kwargs)
+
+        entry.conn = conn
+        return conn
+
+    def _connect_done(self, entry, waiter):
+        """Remove a pool entry if its connection couldn't be opened"""
+
+        if waiter.cancelled() or waiter.exception():
+            self._discard(entry)
+
+    def _discard(self, entry):
+        """Remove a pool entry, typically after its connection closes"""
+
+        entries = self._entries.get(entry.key, [])
+
+        if entry in entries:
+            entries.remove(entry)
+
+            if not entries:
+                del self._entries[entry.key]
+
+        if entry.idle_handle:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+
+    def _close_conn(self, conn):
+        """Close a connection, tracking it until it finishes closing"""
+
+        conn.close()
+
+        task = create_task(conn.wait_closed(), loop=self._loop)
+        task.add_done_callback(self._closing.discard)
+        self._closing.add(task)
+
+    def _evict(self, entry):
+        """Close a connection which has been idle for too long"""
+
+        entry.idle_handle = None
+        self._discard(entry)
+
+        if entry.conn:
+            self._close_conn(entry.conn)
+
+    def _keepalive_due(self, entry):
+        """Return whether a connection has been unused long enough to check"""
+
+        return self._keepalive_interval is not None and entry.last_used and \
+            self._loop.time() - entry.last_used >= self._keepalive_interval
+
+    @asyncio.coroutine
+    def _check_alive(self, entry):
+        """Send a keepalive request, evicting the connection on failure"""
+
+        # pylint: disable=protected-access
+
+        entry.last_used = self._loop.time()
+
+        try:
+            yield from asyncio.wait_for(
+                entry.conn._make_global_request('keepalive@openssh.com'),
+                self._keepalive_timeout, loop=self._loop)
+        except asyncio.TimeoutError:
+            # A late reply to the abandoned request would be taken as
+            # the reply to the next one, so the connection can't be reused
+            self._evict(entry)
+        except:
+            self._evict(entry)
+            raise
+
+    @asyncio.coroutine
+    def _acquire(self, key):
+        """Reserve a session slot on a connection to the requested host"""
+
+        while True:
+            for entry in self._entries.get(key, []):
+                if entry.channels < entry.max_channels:
+                    break
+            else:
+                entry = _PoolEntry(key, self._max_channels)
+                entry.waiter = create_task(self._connect(entry),
+                                           loop=self._loop)
+                entry.waiter.add_done_callback(
+                    partial(self._connect_done, entry))
+                self._entries.setdefault(key, []).append(entry)
+
+            idle = not entry.channels
+            entry.channels += 1
+
+            if entry.idle_handle:
+                entry.idle_handle.cancel()
+                entry.idle_handle = None
+
+            try:
+                yield from asyncio.shield(entry.waiter, loop=self._loop)
+
+                if idle and self._keepalive_due(entry):
+                    # Other requests for this connection made while the
+                    # keepalive is outstanding wait for it to complete
+                    entry.waiter = create_task(self._check_alive(entry),
+                                               loop=self._loop)
+                    yield from asyncio.shield(entry.waiter, loop=self._loop)
+            except:
+                self._release(entry)
+                raise
+
+            # pylint: disable=protected-access
+            if entry.conn._transport is not None and \
+                    entry in self._entries.get(key, []):
+                return entry
+
+            self._release(entry)
+
+            if entry in self._entries.get(key, []):
+                self._evict(entry)
+
+    def _release(self, entry):
+        """Release a session slot reserved on a connection"""
+
+        entry.channels -= 1
+        entry.last_used = self._loop.time()
+
+        if not entry.channels and self._idle_timeout is not None and \
+                entry in self._entries.get(entry.key, []):
+            entry.idle_handle = self._loop.call_later(self._idle_timeout,
+                                                      self._evict, entry)
+
+    @asyncio.coroutine
+    def _release_when_closed(self, entry, session):
+        """Release a session slot when the session using it closes"""
+
+        try:
+            yield from session.wait_closed()
+        finally:
+            self._release(entry)
+
+    @asyncio.coroutine
+    def _open_session(self, host, port, username, options, open_session):
+        """Open a session on a pooled connection to the requested host"""
+
+        key = (host, port, username, options)
+
+        while True:
+            entry = yield from self._acquire(key)
+
+            try:
+                session = yield from open_session(entry.conn)
+            except ChannelOpenError:
+                self._release(entry)
+
+                # If no other sessions are open on this connection, the
+                # failure isn't caused by a limit on open sessions
+                if not entry.channels:
+                    raise
+
+                entry.max_channels = entry.channels
+                continue
+            except:
+                self._release(entry)
+                raise
+
+            create_task(self._release_when_closed(entry, session),
+                        loop=self._loop)
+
+            return session
+
+    @asyncio.coroutine
+    def create_process(self, host, *args, port=_DEFAULT_PORT, username=None,
+                       options=None, **kwargs):
+        """Create a process on a pooled connection
+
+           This method is a coroutine which opens a new session on a
+           connection to the requested host, opening a new connection
+           if needed, and starts a process on it. All arguments other
+           than `host`, `port`, `username`, and `options` are passed
+           to :meth:`SSHClientConnection.create_process`.
+
+           The session slot used by the process is released when the
+           process is closed.
+
+           :param host:
+               The hostname or address to connect to
+           :param port: (optional)
+               The port number to connect to
+           :param username: (optional)
+               Username to authenticate as on the server
+           :param options: (optional)
+               Options to use when opening a connection to this host
+           :type host: `str`
+           :type port: `int`
+           :type username: `str`
+           :type options: :class:`SSHClientConnectionOptions`
+
+           :returns: :class:`SSHClientProcess`
+
+           :raises: :exc:`ChannelOpenError` if the session can't be opened
+
+        """
+
+        return (yield from self._open_session(
+            host, port, username, options,
+            lambda conn: conn.create_process(*args, **kwargs)))
+
+    @asyncio.coroutine
+    def run(self, host, *args, check=False, port=_DEFAULT_PORT,
+            username=None, options=None, **kwargs):
+        """Run a command on a pooled connection and collect its output
+
+           This method is a coroutine wrapper around :meth:`create_process`
+           which runs a process to completion, like
+           :meth:`SSHClientConnection.run`.
+
+           :param host:
+               The hostname or address to connect to
+           :param check: (optional)
+               Whether or not to raise :exc:`ProcessError` when a non-zero
+               exit status is returned
+           :param port: (optional)
+               The port number to connect to
+           :param username: (optional)
+               Username to authenticate as on the server
+           :param options: (optional)
+               Options to use when opening a connection to this host
+           :type host: `str`
+           :type check: `bool`
+           :type port: `int`
+           :type username: `str`
+           :type options: :class:`SSHClientConnectionOptions`
+
+           :returns: :class:`SSHCompletedProcess`
+
+           :raises: | :exc:`ChannelOpenError` if the session can't be opened
+                    | :exc:`ProcessError` if checking non-zero exit status
+
+        """
+
+        process = yield from self.create_process(
+            host, *args, port=port, username=username, options=options,
+            **kwargs)
+
+        return (yield from process.wait(check))
+
+    @asyncio.coroutine
+    def start_sftp_client(self, host, *args, port=_DEFAULT_PORT,
+                          username=None, options=None, **kwargs):
+        """Start an SFTP client on a pooled connection
+
+           This method is a coroutine which opens a new session on a
+           connection to the requested host, opening a new connection
+           if needed, and starts an SFTP client on it. All arguments
+           other than `host`, `port`, `username`, and `options` are
+           passed to :meth:`SSHClientConnection.start_sftp_client`.
+
+           The session slot used by the SFTP client is released when
+           the client exits.
+
+           :param host:
+               The hostname or address to connect to
+           :param port: (optional)
+               The port number to connect to
+           :param username: (optional)
+               Username to authenticate as on the server
+           :param options: (optional)
+               Options to use when opening a connection to this host
+           :type host: `str`
+           :type port: `int`
+           :type username: `str`
+           :type options: :class:`SSHClientConnectionOptions`
+
+           :returns: :class:`SFTPClient`
+
+           :raises: | :exc:`ChannelOpenError` if the session can't be opened
+                    | :exc:`SFTPError` if the SFTP client can't be started
+
+        """
+
+        return (yield from self._open_session(
+            host, port, username, options,
+            lambda conn: conn.start_sftp_client(*args, **kwargs)))
+
+    def close(self):
+        """Close all connections in the pool
+
+           This method closes all connections in the pool, including
+           those with sessions still open on them.
+
+        """
+
+        for entries in list(self._entries.values()):
+            for entry in list(entries):
+                self._discard(entry)
+
+                if entry.conn:
+                    self._close_conn(entry.conn)
+                else:
+                    entry.waiter.cancel()
+
+    @asyncio.coroutine
+    def wait_closed(self):
+        """Wait for all connections closed by the pool to finish closing"""
+
+        while self._closing:
+            yield from asyncio.wait(self._closing, loop=self._loop)
@@ -13,6 +13,7 @@
 """SSH asymmetric encryption handlers"""
 
 import binascii
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import os
 from pathlib import Path, PurePath
@@ -33,7 +34,7 @@ except ImportError: # pragma: no cover
 
 from .asn1 import ASN1DecodeError, BitString, der_encode, der_decode
 from .encryption import get_encryption_params, get_encryption
-from .misc import ip_network
+from .misc import FileCache, ip_network
 from .packet import NameList, String, UInt32, UInt64
 from .packet import PacketDecodeError, SSHPacket
 from .pbe import KeyEncryptionError, pkcs1_encrypt, pkcs8_encrypt
@@ -77,6 +78,12 @@ _OPENSSH_KEY_V1 = b'openssh-key-v1\0'
 _OPENSSH_SALT_LEN = 16
 _OPENSSH_WRAP_LEN = 70
 
+# Maximum number of OpenSSH certificates with verified signatures to remember
+_MAX_VERIFIED_CERTS = 1024
+
+# Maximum number of certificates read from trusted cert paths to remember
+_MAX_CACHED_TRUSTED_CERTS = 1024
+
 
 def _parse_time(t):
     """Parse a time value"""
@@ -1263,6 +1270,8 @@ class SSHOpenSSHCertificate(SSHCertificate):
     _host_option_decoders = {}
     _host_extension_decoders = {}
 
+    _verified_certs = OrderedDict()
+
     def __init__(self, algorithm, key, data, principals, options, signing_key,
                  serial, cert_type, key_id, valid_after, valid_before,
                  comment):
@@ -1328,11 +1337,24 @@ class SSHOpenSSHCertificate(SSHCertificate):
         signature = packet.get_string()
         packet.check_end()
 
-        if not signing_key.verify(data, signature):
+        # The CA signature covers the whole certificate, including its
+        # validity period, so it only needs to be checked once for each
+        # certificate blob. Expiration and revocation are still checked
+        # every time the certificate is validated.
+        cert_data = packet.get_consumed_payload()
+
+        if cert_data in cls._verified_certs:
+            cls._verified_certs.move_to_end(cert_data)
+        elif signing_key.verify(data, signature):
+            cls._verified_certs[cert_data] = True
+
+            if len(cls._verified_certs) > _MAX_VERIFIED_CERTS:
+                cls._verified_certs.popitem(last=False)
+        else:
             raise KeyImportError('Invalid certificate signature')
 
         key = key_handler.make_public(*key_params)
-        data = packet.get_consumed_payload()
+        data = cert_data
 
         try:
             key_id = key_id.decode('utf-8')
@@ -1574,7 +1596,7 @@ class SSHX509Certificate(SSHCertificate):
                     cert_path = Path(path, issuer_hash + '.' + str(idx))
                     idx += 1
 
-                    c = read_certificate(cert_path)
+                    c = _trusted_cert_cache.load(str(cert_path))
 
                     if c.subject != cert.issuer or c in trust_store:
                         continue
@@ -2628,6 +2650,33 @@ def import_certificate_subject(data):
     raise KeyImportError('Invalid certificate subject')
 
 
+def import_public_key_data(data):
+    """Return the encoded key data in an OpenSSH format public key
+
+       This function checks that a public key is in OpenSSH format
+       with a known algorithm and returns its binary key data without
+       decoding the key, so the key can be compared against other
+       keys' public data or decoded later only when it's needed.
+
+    """
+
+    try:
+        data = data.encode('ascii')
+    except UnicodeEncodeError:
+        raise KeyImportError('Invalid encoding for public key') from None
+
+    algorithm, data, _ = _decode_openssh(data.strip())
+
+    if algorithm not in _public_key_alg_map:
+        raise KeyImportError('Unknown key algorithm: %s' %
+                             algorithm.decode('ascii', errors='replace'))
+
+    if not data.startswith(String(algorithm)):
+        raise KeyImportError('Public key algorithm mismatch')
+
+    return data
+
+
 def read_private_key(filename, passphrase=None):
     """Read a private key from a file
 
@@ -2722,6 +2771,9 @@ def read_certificate(filename):
         return import_certificate(f.read())
 
 
+_trusted_cert_cache = FileCache(read_certificate, _MAX_CACHED_TRUSTED_CERTS)
+
+
 def read_private_key_list(filename, passphrase=None):
     """Read a list of private keys from a file
 
@@ -16,6 +16,7 @@
 
 import argparse
 import asyncio
+import hashlib
 import posixpath
 import shlex
 import stat
@@ -304,7 +305,7 @@ class _SCPSource(_SCPHandler):
 
     def __init__(self, fs, reader, writer, preserve, recurse,
                  block_size=SFTP_BLOCK_SIZE, progress_handler=None,
-                 error_handler=None):
+                 error_handler=None, hash_handler=None, hash_alg='sha256'):
         super().__init__(reader, writer, error_handler)
 
         self._fs = fs
@@ -312,6 +313,8 @@ class _SCPSource(_SCPHandler):
         self._recurse = recurse
         self._block_size = block_size
         self._progress_handler = progress_handler
+        self._hash_handler = hash_handler
+        self._hash_alg = hash_alg
 
     @asyncio.coroutine
     def _make_cd_request(self, action, attrs, size, path):
@@ -340,6 +343,8 @@ class _SCPSource(_SCPHandler):
         local_exc = None
         offset = 0
 
+        hash_obj = hashlib.new(self._hash_alg) if self._hash_handler else None
+
         self.logger.info('  Sending file %s, size %d', srcpath, size)
 
         try:
@@ -356,6 +361,9 @@ class _SCPSource(_SCPHandler):
 
                         if not data:
                             raise SCPError(FX_FAILURE, 'Unexpected EOF')
+
+                        if hash_obj:
+                            hash_obj.update(data)
                     except (OSError, SFTPError) as exc:
                         local_exc = exc
 
@@ -379,6 +387,9 @@ class _SCPSource(_SCPHandler):
         if exc:
             raise exc
 
+        if hash_obj:
+            self._hash_handler(srcpath, dstpath, hash_obj.digest())
+
     @asyncio.coroutine
     def _send_dir(self, srcpath, dstpath, attrs):
         """Send directory over SCP"""
@@ -443,7 +454,7 @@ class _SCPSink(_SCPHandler):
 
     def __init__(self, fs, reader, writer, must_be_dir, preserve, recurse,
                  block_size=SFTP_BLOCK_SIZE, progress_handler=None,
-                 error_handler=None):
+                 error_handler=None, hash_handler=None, hash_alg='sha256'):
         super().__init__(reader, writer, error_handler)
 
         self._fs = fs
@@ -452,6 +463,8 @@ class _SCPSink(_SCPHandler):
         self._recurse = recurse
         self._block_size = block_size
         self._progress_handler = progress_handler
+        self._hash_handler = hash_handler
+        self._hash_alg = hash_alg
 
     @asyncio.coroutine
     def _recv_file(self, srcpath, dstpath, size):
@@ -461,6 +474,8 @@ class _SCPSink(_SCPHandler):
         local_exc = None
         offset = 0
 
+        hash_obj = hashlib.new(self._hash_alg) if self._hash_handler else None
+
         self.logger.info('  Receiving file %s, size %d', dstpath, size)
 
         try:
@@ -480,6 +495,9 @@ class _SCPSink(_SCPHandler):
                     except (OSError, SFTPError) as exc:
                         local_exc = exc
 
+                if hash_obj:
+                    hash_obj.update(data)
+
                 offset += len(data)
 
                 if self._progress_handler:
@@ -500,6 +518,9 @@ class _SCPSink(_SCPHandler):
         if exc:
             raise exc
 
+        if hash_obj:
+            self._hash_handler(srcpath, dstpath, hash_obj.digest())
+
     @asyncio.coroutine
     def _recv_dir(self, srcpath, dstpath):
         """Receive a directory over SCP"""
@@ -595,13 +616,15 @@ class _SCPCopier:
 
     def __init__(self, src_reader, src_writer, dst_reader, dst_writer,
                  block_size=SFTP_BLOCK_SIZE, progress_handler=None,
-                 error_handler=None):
+                 error_handler=None, hash_handler=None, hash_alg='sha256'):
         self._source = _SCPHandler(src_reader, src_writer)
         self._sink = _SCPHandler(dst_reader, dst_writer)
         self._logger = self._source.logger
         self._block_size = block_size
         self._progress_handler = progress_handler
         self._error_handler = error_handler
+        self._hash_handler = hash_handler
+        self._hash_alg = hash_alg
 
     @property
     def logger(self):
@@ -647,6 +670,7 @@ class _SCPCopier:
         self.logger.info('  Copying file %s, size %d', path, size)
 
         offset = 0
+        hash_obj = hashlib.new(self._hash_alg) if self._hash_handler else None
 
         while offset < size:
             blocklen = min(size - offset, self._block_size)
@@ -656,6 +680,9 @@ class _SCPCopier:
                 raise SCPError(FX_CONNECTION_LOST, 'Connection lost',
                                fatal=True)
 
+            if hash_obj:
+                hash_obj.update(data)
+
             yield from self._sink.send_data(data)
             offset += len(data)
 
@@ -669,6 +696,8 @@ class _SCPCopier:
 
         if exc:
             self._handle_error(exc)
+        elif hash_obj:
+            self._hash_handler(path, path, hash_obj.digest())
 
     @asyncio.coroutine
     def _copy_files(self):
@@ -749,7 +778,8 @@ class _SCPCopier:
 
 @asyncio.coroutine
 def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
-        block_size=SFTP_BLOCK_SIZE, progress_handler=None, error_handler=None):
+        block_size=SFTP_BLOCK_SIZE, progress_handler=None, error_handler=None,
+        hash_handler=None, hash_alg='sha256'):
     """Copy files using SCP
 
        This function is a coroutine which copies one or more files or
@@ -814,6 +844,14 @@ def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
        the progress_handler will be called consecutively on each file
        being copied.
 
+       If hash_handler is specified, a digest of each file is computed
+       as its data is copied, using the hash algorithm named by hash_alg,
+       which defaults to `'sha256'`. Any algorithm supported by
+       :func:`hashlib.new` can be used. Once a file has been copied, the
+       handler is called with the same paths passed to progress_handler
+       and the digest as `bytes`, so the file doesn't need to be read
+       back to verify it.
+
        If error_handler is specified and an error occurs during the copy,
        this handler will be called with the exception instead of it being
        raised. This is intended to primarily be used when multiple source
@@ -837,11 +875,17 @@ def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
            The function to call to report copy progress
        :param error_handler: (optional)
            The function to call when an error occurs
+       :param hash_handler: (optional)
+           The function to call with a digest of each file
+       :param hash_alg: (optional)
+           The hash algorithm to use when computing digests
        :type preserve: `bool`
        :type recurse: `bool`
        :type block_size: `int`
        :type progress_handler: `callable`
        :type error_handler: `callable`
+       :type hash_handler: `callable`
+       :type hash_alg: `str`
 
        :raises: | :exc:`OSError` if a local file I/O error occurs
                 | :exc:`SFTPError` if the server returns an error
@@ -871,7 +915,8 @@ def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
 
                     copier = _SCPCopier(src_reader, src_writer, dst_reader,
                                         dst_writer, block_size,
-                                        progress_handler, error_handler)
+                                        progress_handler, error_handler,
+                                        hash_handler, hash_alg)
 
                     yield from copier.run()
                 elif srcconn:
@@ -880,7 +925,8 @@ def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
 
                     sink = _SCPSink(LocalFile, reader, writer, must_be_dir,
                                     preserve, recurse, block_size,
-                                    progress_handler, error_handler)
+                                    progress_handler, error_handler,
+                                    hash_handler, hash_alg)
 
                     yield from sink.run(dstpath)
                 elif dstconn:
@@ -889,7 +935,8 @@ def scp(srcpaths, dstpath=None, *, preserve=False, recurse=False,
 
                     source = _SCPSource(LocalFile, reader, writer,
                                         preserve, recurse, block_size,
-                                        progress_handler, error_handler)
+                                        progress_handler, error_handler,
+                                        hash_handler, hash_alg)
 
                     yield from source.run(srcpath)
                 else:
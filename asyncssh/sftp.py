@@ -15,9 +15,13 @@
 """SFTP handlers"""
 
 import asyncio
-from collections import OrderedDict
+import binascii
+import codecs
+from collections import OrderedDict, deque
 import errno
-from fnmatch import fnmatch
+import functools
+import hashlib
+import math
 import os
 from os import SEEK_SET, SEEK_CUR, SEEK_END
 from pathlib import PurePath
@@ -47,17 +51,51 @@ from .constants import FX_OK, FX_EOF, FX_NO_SUCH_FILE, FX_PERMISSION_DENIED
 from .constants import FX_FAILURE, FX_BAD_MESSAGE, FX_NO_CONNECTION
 from .constants import FX_CONNECTION_LOST, FX_OP_UNSUPPORTED
 
-from .misc import Error, Record, async_context_manager, get_symbol_names
-from .misc import hide_empty, plural, to_hex
+from .misc import Error, Record, SFTPError
+from .misc import async_context_manager, async_iterator
+from .misc import get_symbol_names, hide_empty, plural, python35, to_hex
 
-from .packet import Byte, String, UInt32, UInt64, PacketDecodeError
+from .packet import Boolean, Byte, String, UInt32, UInt64, PacketDecodeError
 from .packet import SSHPacket, SSHPacketLogger
 
+from .sftp_delta import _encode_block_sums, _find_matching_blocks
+
+from .sftp_cache import _SFTPAttrCache
+
+from .sftp_glob import _SFTPGlob
+
 SFTP_BLOCK_SIZE = 16384
 
 _SFTP_VERSION = 3
+_INITIAL_SFTP_REQUESTS = 16
+_MIN_SFTP_REQUESTS = 4
+_SFTP_DEPTH_SAMPLES = 32
 _MAX_SFTP_REQUESTS = 128
+_MAX_SFTP_BLOCK_SIZE = 256*1024
+_MAX_SFTP_PACKET_LEN = 256*1024
+_MAX_SFTP_READ_LEN = _MAX_SFTP_PACKET_LEN - 1024
+_MAX_SFTP_WRITE_LEN = _MAX_SFTP_PACKET_LEN - 1024
+_SFTP_PACKET_OVERHEAD = 1024
 _MAX_READDIR_NAMES = 128
+_MAX_RMTREE_REQUESTS = 32
+_COPY_DATA_BLOCK_SIZE = 256*1024
+_MIN_CHECK_FILE_BLOCK_SIZE = 256
+_BLOCK_SUMS_PER_REQUEST = 4096
+_MAX_BLOCK_SUMS_LEN = 16*1024*1024
+_DELTA_TEMP_SUFFIX = b'.delta'
+_MAX_MERGED_WRITES = 64
+_MAX_BULK_ITEMS = 1024
+_MAX_MERGED_WRITE_LEN = 1024*1024
+
+# Whether positional reads and writes are available on this platform
+_positional_io = hasattr(os, 'pread') and hasattr(os, 'pwrite')
+
+# Whether adjacent writes can be merged into a single vectored write
+_vectored_io = _positional_io and hasattr(os, 'pwritev')
+
+# Hash algorithms supported by check-file, in the server's preference order
+_check_file_algs = (b'md5', b'sha1', b'sha224', b'sha256', b'sha384',
+                    b'sha512')
 
 _open_modes = {
     'r':  FXF_READ,
@@ -120,6 +158,76 @@ def _to_local_path(path):
     return path
 
 
+def _get_fd(file_obj):
+    """Return a descriptor usable for positional I/O on a file, if any
+
+       Positional reads and writes are only used on platforms which
+       provide them and on binary files not opened for append, since
+       pwrite() ignores the offset on append-mode descriptors on some
+       systems. None is returned when the caller should fall back to
+       seeking on the file object.
+
+    """
+
+    if not _positional_io:
+        return None
+
+    mode = getattr(file_obj, 'mode', '')
+
+    if not isinstance(mode, str) or 'b' not in mode or 'a' in mode:
+        return None
+
+    try:
+        return file_obj.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _read_at(file_obj, size, offset):
+    """Read data from a file at an offset without using its file position"""
+
+    file_fd = _get_fd(file_obj)
+
+    if file_fd is None:
+        file_obj.seek(offset)
+        return file_obj.read(size)
+    else:
+        return os.pread(file_fd, size, offset)
+
+
+def _write_at(file_obj, data, offset):
+    """Write data to a file at an offset without using its file position"""
+
+    file_fd = _get_fd(file_obj)
+
+    if file_fd is None:
+        file_obj.seek(offset)
+        return file_obj.write(data)
+    else:
+        view = memoryview(data)
+        written = 0
+
+        while written < len(view):
+            written += os.pwrite(file_fd, view[written:], offset + written)
+
+        return written
+
+
+def _write_vectored_at(file_fd, buffers, offset):
+    """Write a list of buffers to a file descriptor at an offset"""
+
+    total = sum(len(data) for data in buffers)
+    written = os.pwritev(file_fd, buffers, offset)
+
+    if written < total:
+        view = memoryview(b''.join(buffers))
+
+        while written < total:
+            written += os.pwrite(file_fd, view[written:], offset + written)
+
+    return total
+
+
 def _setstat(path, attrs):
     """Utility function to set file attributes"""
 
@@ -140,62 +248,16 @@ def _setstat(path, attrs):
 
 
 @asyncio.coroutine
-def _glob(fs, basedir, patlist, result):
-    """Recursively match a glob pattern"""
-
-    pattern, newpatlist = patlist[0], patlist[1:]
-
-    if not pattern and not newpatlist:
-        result.append(basedir)
-        return
-
-    if pattern == b'**':
-        yield from _glob(fs, basedir, newpatlist, result)
-
-    names = yield from fs.listdir(basedir or b'.')
-
-    for name in names:
-        if pattern != name and name in (b'.', b'..'):
-            continue
-
-        if name[:1] == b'.' and not pattern[:1] == b'.':
-            continue
-
-        if fnmatch(name, pattern):
-            if basedir:
-                newbase = posixpath.join(basedir, name)
-            else:
-                newbase = name
-
-            if not newpatlist:
-                result.append(newbase)
-            else:
-                attrs = yield from fs.stat(newbase)
-
-                if stat.S_ISDIR(attrs.permissions):
-                    if pattern == b'**':
-                        yield from _glob(fs, newbase, patlist, result)
-                    else:
-                        yield from _glob(fs, newbase, newpatlist, result)
-
-
-@asyncio.coroutine
-def match_glob(fs, pattern, error_handler=None):
+def match_glob(fs, pattern, error_handler=None, loop=None):
     """Match a glob pattern"""
 
     names = []
 
     try:
         if any(c in pattern for c in b'*?[]'):
-            patlist = pattern.split(b'/')
-
-            if not patlist[0]:
-                basedir = b'/'
-                patlist = patlist[1:]
-            else:
-                basedir = None
-
-            yield from _glob(fs, basedir, patlist, names)
+            ignore_case = fs is LocalFile and sys.platform == 'win32'
+            glob = _SFTPGlob(fs, loop, ignore_case)
+            names = yield from glob.match(pattern)
 
             if not names:
                 raise SFTPError(FX_NO_SUCH_FILE, 'No matches found')
@@ -214,6 +276,26 @@ def match_glob(fs, pattern, error_handler=None):
     return names
 
 
+def _hash_local_file(path, hash_obj, block_size, size=None):
+    """Add the contents of a local file, or the first size bytes, to a hash"""
+
+    with open(_to_local_path(path), 'rb') as f:
+        while size is None or size > 0:
+            data = f.read(block_size if size is None
+                          else min(block_size, size))
+
+            if not data:
+                break
+
+            hash_obj.update(data)
+
+            if size is not None:
+                size -= len(data)
+
+    if size:
+        raise SFTPError(FX_FAILURE, 'Unexpected EOF')
+
+
 class LocalFile:
     """A coroutine wrapper around local file I/O"""
 
@@ -307,6 +389,13 @@ class LocalFile:
 
         return files
 
+    @classmethod
+    @asyncio.coroutine
+    def readdir(cls, path):
+        """Read the names of the files in a local directory as SFTPNames"""
+
+        return [SFTPName(name) for name in (yield from cls.listdir(path))]
+
     @classmethod
     @asyncio.coroutine
     def mkdir(cls, path):
@@ -328,19 +417,37 @@ class LocalFile:
 
         os.symlink(_to_local_path(oldpath), _to_local_path(newpath))
 
+    @classmethod
+    @asyncio.coroutine
+    def remove(cls, path):
+        """Remove a local file"""
+
+        os.remove(_to_local_path(path))
+
+    @classmethod
+    @asyncio.coroutine
+    def posix_rename(cls, oldpath, newpath):
+        """Rename a local file, replacing the new path if it exists"""
+
+        os.replace(_to_local_path(oldpath), _to_local_path(newpath))
+
     @asyncio.coroutine
     def read(self, size, offset):
         """Read data from the local file"""
 
-        self._file.seek(offset)
-        return self._file.read(size)
+        return _read_at(self._file, size, offset)
 
     @asyncio.coroutine
     def write(self, data, offset):
         """Write data to the local file"""
 
-        self._file.seek(offset)
-        return self._file.write(data)
+        return _write_at(self._file, data, offset)
+
+    @asyncio.coroutine
+    def truncate(self, size):
+        """Truncate the local file to the specified size"""
+
+        self._file.truncate(size)
 
     @asyncio.coroutine
     def close(self):
@@ -355,75 +462,265 @@ class _SFTPFileCopier:
        This class parforms an SFTP file copy, initiating multiple
        read and write requests to copy chunks of the file in parallel.
 
+       The number of requests kept in flight is adapted as the copy
+       progresses. Each completed block provides a sample of the round
+       trip time and of the delivery rate seen while that block was
+       outstanding, and the window is sized to cover twice the
+       bandwidth-delay product estimated from the lowest round trip
+       time and the highest delivery rate among the most recent
+       samples. The window shrinks again if the round trip time rises
+       or the delivery rate drops, but is never made smaller than a
+       few requests.
+
+       When resuming, a destination file no larger than the source is
+       kept if the block just before its end matches the same range of
+       the source, and the copy continues from that point rather than
+       starting over.
+
+       If a hash object is provided, the data copied is added to it.
+       Since blocks can complete out of order, blocks which arrive
+       ahead of the next offset to hash are held until the data before
+       them has been hashed.
+
     """
 
-    def __init__(self, loop):
+    def __init__(self, loop, max_requests=_MAX_SFTP_REQUESTS, hash_obj=None):
         self._loop = loop
+        self._max_requests = max_requests
+        self._hash = hash_obj
+        self._hash_offset = 0
+        self._hash_blocks = {}
         self._src = None
         self._dst = None
         self._block_size = 0
         self._bytes_left = 0
         self._offset = 0
+        self._depth = min(_INITIAL_SFTP_REQUESTS, max_requests)
         self._pending = set()
+        self._completed = []
+        self._exc = None
+        self._waiter = None
+        self._delivered = 0
+        self._samples = deque(maxlen=_SFTP_DEPTH_SAMPLES)
 
     @asyncio.coroutine
     def _copy_block(self, offset, size):
         """Copy the next block of the file"""
 
         data = yield from self._src.read(size, offset)
+
+        if self._hash:
+            self._hash_block(offset, data)
+
         yield from self._dst.write(data, offset)
         return size
 
+    def _hash_block(self, offset, data):
+        """Add a block to the hash, in order of offset"""
+
+        self._hash_blocks[offset] = data
+
+        while self._hash_offset in self._hash_blocks:
+            data = self._hash_blocks.pop(self._hash_offset)
+            self._hash.update(data)
+            self._hash_offset += len(data)
+
+    @asyncio.coroutine
+    def _hash_existing(self, localpath, size, block_size):
+        """Hash data kept from a partial copy when resuming"""
+
+        if localpath is not None:
+            # Read the data back from the local side of the copy in an
+            # executor, so a large partial file doesn't block the loop
+            yield from self._loop.run_in_executor(
+                None, _hash_local_file, localpath, self._hash,
+                block_size, size)
+
+            self._hash_offset = size
+            return
+
+        file_obj = self._src
+
+        while self._hash_offset < size:
+            data = yield from file_obj.read(min(block_size,
+                                                size - self._hash_offset),
+                                            self._hash_offset)
+
+            if not data:
+                raise SFTPError(FX_FAILURE, 'Unexpected EOF')
+
+            self._hash.update(data)
+            self._hash_offset += len(data)
+
+    def _update_depth(self, rtt, delivered):
+        """Resize the request window based on a new round trip sample"""
+
+        if rtt <= 0:
+            return
+
+        self._samples.append((rtt, delivered / rtt))
+
+        min_rtt = min(rtt for rtt, _ in self._samples)
+        max_rate = max(rate for _, rate in self._samples)
+
+        bdp = max_rate * min_rtt / self._block_size
+
+        self._depth = max(min(_MIN_SFTP_REQUESTS, self._max_requests),
+                          min(self._max_requests, math.ceil(2 * bdp)))
+
+    def _block_done(self, start, delivered, task):
+        """Record the completion of a block copy"""
+
+        self._pending.discard(task)
+
+        if task.cancelled():
+            return
+
+        exc = task.exception()
+
+        if exc:
+            if not self._exc:
+                self._exc = exc
+        else:
+            size = task.result()
+
+            self._delivered += size
+            self._completed.append(size)
+            self._update_depth(self._loop.time() - start,
+                               self._delivered - delivered)
+
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _next_block(self):
+        """Return a coroutine to copy the next block, or None if done"""
+
+        if not self._bytes_left:
+            return None
+
+        offset = self._offset
+        size = min(self._bytes_left, self._block_size)
+
+        self._offset += size
+        self._bytes_left -= size
+
+        return self._copy_block(offset, size)
+
     def _copy_blocks(self):
         """Create parallel requests to copy blocks from one file to another"""
 
-        while self._bytes_left and len(self._pending) < _MAX_SFTP_REQUESTS:
-            size = min(self._bytes_left, self._block_size)
+        while len(self._pending) < self._depth:
+            coro = self._next_block()
 
-            task = asyncio.Task(self._copy_block(self._offset, size),
-                                loop=self._loop)
+            if not coro:
+                break
+
+            task = asyncio.Task(coro, loop=self._loop)
+            task.add_done_callback(functools.partial(
+                self._block_done, self._loop.time(), self._delivered))
             self._pending.add(task)
 
-            self._offset += size
-            self._bytes_left -= size
+    def _get_reporter(self, srcpath, dstpath, total_bytes, progress_handler):
+        """Return a function to report progress of a copy, if needed"""
+
+        if progress_handler:
+            return lambda bytes_copied: progress_handler(
+                srcpath, dstpath, bytes_copied, total_bytes,
+                self._depth, self._block_size)
+        else:
+            return None
 
     @asyncio.coroutine
-    def copy(self, srcfs, dstfs, srcpath, dstpath, total_bytes,
-             block_size, progress_handler):
-        """Copy a file"""
+    def _resume(self, dstfs, dstpath, total_bytes, block_size):
+        """Open a partial destination file and return where to resume"""
 
         try:
-            self._src = yield from srcfs.open(srcpath, 'rb')
-            self._dst = yield from dstfs.open(dstpath, 'wb')
-            self._block_size = block_size
-            self._bytes_left = total_bytes
+            size = (yield from dstfs.stat(dstpath)).size
+        except (OSError, SFTPError):
+            return 0
+
+        if not size or size > total_bytes:
+            return 0
+
+        self._dst = yield from dstfs.open(dstpath, 'r+b')
+
+        tail = min(size, block_size)
+
+        src_data, dst_data = yield from asyncio.gather(
+            self._src.read(tail, size - tail),
+            self._dst.read(tail, size - tail), loop=self._loop)
+
+        if src_data != dst_data:
+            yield from self._dst.close()
+            self._dst = None
+            return 0
+
+        return size
+
+    @asyncio.coroutine
+    def _run(self, report, bytes_copied=0):
+        """Copy blocks until done, reporting progress as they complete"""
+
+        self._copy_blocks()
+
+        while self._pending or self._completed:
+            if not (self._completed or self._exc):
+                self._waiter = asyncio.Future(loop=self._loop)
+                yield from self._waiter
+                self._waiter = None
+
+            if self._exc:
+                for task in self._pending:
+                    task.cancel()
+
+                raise self._exc
+
+            completed, self._completed = self._completed, []
+
+            if report:
+                for size in completed:
+                    bytes_copied += size
+                    report(bytes_copied)
+
             self._copy_blocks()
 
-            bytes_copied = 0
+    @asyncio.coroutine
+    def copy(self, srcfs, dstfs, srcpath, dstpath, total_bytes,
+             block_size, progress_handler, resume=False):
+        """Copy a file"""
 
-            while self._pending:
-                done, self._pending = yield from asyncio.wait(
-                    self._pending, return_when=asyncio.FIRST_COMPLETED)
+        report = self._get_reporter(srcpath, dstpath, total_bytes,
+                                    progress_handler)
 
-                exceptions = []
+        try:
+            self._src = yield from srcfs.open(srcpath, 'rb')
 
-                for task in done:
-                    exc = task.exception()
+            if resume:
+                self._offset = yield from self._resume(dstfs, dstpath,
+                                                       total_bytes,
+                                                       block_size)
+
+            if self._dst:
+                if self._hash:
+                    if dstfs is LocalFile:
+                        localpath = dstpath
+                    elif srcfs is LocalFile:
+                        localpath = srcpath
+                    else:
+                        localpath = None
 
-                    if exc:
-                        exceptions.append(exc)
-                    elif progress_handler:
-                        bytes_copied += task.result()
-                        progress_handler(srcpath, dstpath,
-                                         bytes_copied, total_bytes)
+                    yield from self._hash_existing(localpath, self._offset,
+                                                   block_size)
 
-                if exceptions:
-                    for task in self._pending:
-                        task.cancel()
+                if report:
+                    report(self._offset)
+            else:
+                self._dst = yield from dstfs.open(dstpath, 'wb')
 
-                    raise exceptions[0]
+            self._block_size = block_size
+            self._bytes_left = total_bytes - self._offset
 
-                self._copy_blocks()
+            yield from self._run(report, self._offset)
         finally:
             if self._src: # pragma: no branch
                 yield from self._src.close()
@@ -432,28 +729,294 @@ class _SFTPFileCopier:
                 yield from self._dst.close()
 
 
-class SFTPError(Error):
-    """SFTP error
+class _SFTPRemoteCopier(_SFTPFileCopier):
+    """SFTP remote file copier
+
+       This class copies a file between two paths on the same SFTP
+       server using the copy-data extension, so that the server copies
+       each block locally and no file data is sent over the connection.
+
+    """
+
+    def __init__(self, loop, handler, max_requests=_MAX_SFTP_REQUESTS):
+        super().__init__(loop, max_requests)
+        self._handler = handler
+
+    @asyncio.coroutine
+    def _copy_block(self, offset, size):
+        """Ask the server to copy the next block of the file"""
+
+        # pylint: disable=protected-access
+        yield from self._handler.copy_data(self._src._handle, offset, size,
+                                           self._dst._handle, offset)
+        return size
+
 
-       This exception is raised when an error occurs while processing
-       an SFTP request. Exception codes should be taken from
-       :ref:`SFTP error codes <SFTPErrorCodes>`.
+class _SFTPDeltaCopier(_SFTPFileCopier):
+    """SFTP delta file copier
 
-       :param code:
-           Disconnect reason, taken from :ref:`disconnect reason
-           codes <DisconnectReasons>`
-       :param reason:
-           A human-readable reason for the disconnect
-       :param lang:
-           The language the reason is in
-       :type code: `int`
-       :type reason: `str`
-       :type lang: `str`
+       This class uploads or downloads a file over an existing copy
+       at the destination, transferring only the data which changed.
+       The server is asked for checksums of each block of the remote
+       file, and the local file is then scanned with a rolling checksum
+       to find data matching those blocks at any offset.
+
+       On a download, the checksums are of the new remote file and any
+       blocks found in the old local file are copied from there rather
+       than read from the server. On an upload, the checksums are of
+       the old remote file and the server copies the matching blocks
+       into place itself, using the copy-data extension.
+
+       When all of the matching data is already at the right offset,
+       only the changed blocks are written, in place. Otherwise, the new
+       file is built in a uniquely named temporary file next to the
+       destination, given the destination's permissions and ownership,
+       and renamed over it when complete. If the server can't replace
+       a file atomically or copy data itself, the whole file is
+       uploaded instead.
+
+       The local file is scanned in a thread from the default executor,
+       so that the event loop isn't blocked while this happens.
 
     """
 
-    def __init__(self, code, reason, lang=DEFAULT_LANG):
-        super().__init__('SFTP', code, reason, lang)
+    def __init__(self, loop, handler, max_requests=_MAX_SFTP_REQUESTS):
+        super().__init__(loop, max_requests)
+        self._handler = handler
+        self._old = None
+        self._remote_copy = False
+        self._ops = deque()
+
+    @asyncio.coroutine
+    def _get_block_sums(self, path, size, block_size):
+        """Get checksums of the full blocks in a remote file"""
+
+        length = size - size % block_size
+        span = max(1, min(_BLOCK_SUMS_PER_REQUEST,
+                          _MAX_BLOCK_SUMS_LEN // block_size)) * block_size
+        offsets = range(0, length, span)
+
+        results = yield from asyncio.gather(
+            *(self._handler.block_sums(path, offset,
+                                       min(span, length - offset), block_size)
+              for offset in offsets), loop=self._loop)
+
+        block_sums = {}
+
+        for offset, result in zip(offsets, results):
+            for i, (weak, strong) in enumerate(result, offset // block_size):
+                block_sums.setdefault(weak, {}).setdefault(strong, i)
+
+        return block_sums
+
+    @staticmethod
+    def _upload_ops(matches, total_bytes, block_size):
+        """Return the operations needed to build an uploaded file"""
+
+        ops = []
+        pos = 0
+
+        for offset, block_num in matches + [(total_bytes, None)]:
+            while pos < offset:
+                size = min(block_size, offset - pos)
+                ops.append((pos, size, None))
+                pos += size
+
+            if block_num is not None:
+                ops.append((offset, block_size, block_num * block_size))
+                pos += block_size
+
+        return ops
+
+    @staticmethod
+    def _download_ops(matches, total_bytes, block_size):
+        """Return the operations needed to build a downloaded file"""
+
+        found = {}
+
+        for offset, block_num in matches:
+            if block_num not in found or offset == block_num * block_size:
+                found[block_num] = offset
+
+        return [(offset, min(block_size, total_bytes - offset),
+                 found.get(offset // block_size))
+                for offset in range(0, total_bytes, block_size)]
+
+    def _next_block(self):
+        """Return a coroutine to copy the next block, or None if done"""
+
+        while self._ops:
+            offset, size, old_offset = self._ops.popleft()
+
+            if old_offset is None:
+                return self._copy_block(offset, size)
+            elif self._old:
+                return self._copy_old_block(offset, size, old_offset)
+            else:
+                # This block is already in place in the destination
+                self._completed.append(size)
+
+        return None
+
+    @asyncio.coroutine
+    def _copy_old_block(self, offset, size, old_offset):
+        """Copy a matching block from the old copy of the file"""
+
+        if self._remote_copy:
+            # pylint: disable=protected-access
+            yield from self._handler.copy_data(self._old._handle, old_offset,
+                                               size, self._dst._handle, offset)
+        else:
+            data = yield from self._old.read(size, old_offset)
+            yield from self._dst.write(data, offset)
+
+        return size
+
+    @staticmethod
+    @asyncio.coroutine
+    def _copy_attrs(dstfs, path, attrs):
+        """Give a new copy of a file the attributes of the file it replaces"""
+
+        # Ownership can only be changed by privileged users, so failing
+        # to change it isn't an error, but it must be set before the
+        # permissions since it can clear setuid and setgid bits
+        try:
+            yield from dstfs.setstat(path, SFTPAttrs(uid=attrs.uid,
+                                                     gid=attrs.gid))
+        except (OSError, SFTPError):
+            pass
+
+        yield from dstfs.setstat(path, SFTPAttrs(
+            permissions=stat.S_IMODE(attrs.permissions)))
+
+    @asyncio.coroutine
+    def copy(self, srcfs, dstfs, srcpath, dstpath, total_bytes,
+             block_size, progress_handler, resume=False):
+        """Copy a file, transferring only the blocks which changed
+
+           The resume argument is accepted for compatibility with the
+           full file copier but ignored, since blocks which are already
+           in place in the destination are never copied again anyway.
+
+        """
+
+        # pylint: disable=unused-argument
+
+        upload = srcfs is LocalFile
+
+        if upload:
+            try:
+                remote_size = (yield from dstfs.stat(dstpath)).size
+            except SFTPError as exc:
+                if exc.code != FX_NO_SUCH_FILE:
+                    raise
+
+                remote_size = None
+
+            localpath, remotepath = srcpath, dstpath
+        else:
+            remote_size = total_bytes
+            localpath, remotepath = dstpath, srcpath
+
+        if remote_size is None or \
+                not os.path.isfile(_to_local_path(localpath)):
+            self._ops = deque(self._upload_ops([], total_bytes, block_size))
+
+            yield from super().copy(srcfs, dstfs, srcpath, dstpath,
+                                    total_bytes, block_size, progress_handler)
+            return
+
+        block_sums = yield from self._get_block_sums(remotepath, remote_size,
+                                                     block_size)
+
+        matches = yield from self._loop.run_in_executor(
+            None, _find_matching_blocks, _to_local_path(localpath),
+            block_size, block_sums)
+
+        if upload:
+            ops = self._upload_ops(matches, total_bytes, block_size)
+        else:
+            ops = self._download_ops(matches, total_bytes, block_size)
+
+        in_place = all(old_offset is None or old_offset == offset
+                       for offset, _, old_offset in ops)
+
+        if not in_place and upload and \
+                not (self._handler.supports_posix_rename and
+                     self._handler.supports_copy_data):
+            # Without an atomic rename, the new file can't be built
+            # separately and moved into place, and without copy-data,
+            # matching blocks would have to be downloaded and uploaded
+            # again, so upload all of it
+            self._ops = deque(self._upload_ops([], total_bytes, block_size))
+
+            yield from super().copy(srcfs, dstfs, srcpath, dstpath,
+                                    total_bytes, block_size, progress_handler)
+            return
+
+        report = self._get_reporter(srcpath, dstpath, total_bytes,
+                                    progress_handler)
+
+        self._block_size = block_size
+        self._ops = deque(ops)
+        self._remote_copy = upload
+
+        tmppath = b''.join((dstpath, b'.', binascii.b2a_hex(os.urandom(8)),
+                            _DELTA_TEMP_SUFFIX))
+
+        created = False
+        done = False
+
+        try:
+            self._src = yield from srcfs.open(srcpath, 'rb')
+
+            if in_place:
+                self._dst = yield from dstfs.open(dstpath, 'r+b')
+            else:
+                attrs = yield from dstfs.stat(dstpath)
+
+                self._old = yield from dstfs.open(dstpath, 'rb')
+                self._dst = yield from dstfs.open(tmppath, 'xb')
+                created = True
+
+            yield from self._run(report)
+
+            if in_place:
+                yield from self._dst.truncate(total_bytes)
+            else:
+                yield from self._copy_attrs(dstfs, tmppath, attrs)
+
+            for f in (self._src, self._old, self._dst):
+                if f:
+                    yield from f.close()
+
+            self._src = self._old = self._dst = None
+
+            if created:
+                yield from dstfs.posix_rename(tmppath, dstpath)
+
+            done = True
+        finally:
+            for f in (self._src, self._old, self._dst):
+                if f:
+                    yield from f.close()
+
+            # Remove the temporary file on any failure, including the
+            # copy being cancelled, so it isn't left at the destination
+            if created and not done:
+                try:
+                    yield from dstfs.remove(tmppath)
+                except (OSError, SFTPError):
+                    pass
+
+
+def _encode_hash_algs(hash_algs):
+    """Encode a list of check-file hash algorithm names"""
+
+    if isinstance(hash_algs, str):
+        hash_algs = [hash_algs]
+
+    return [alg.encode('ascii') for alg in hash_algs]
 
 
 class SFTPAttrs(Record):
@@ -652,28 +1215,75 @@ class SFTPVFSAttrs(Record):
                    result.f_namemax)
 
 
-class SFTPName(Record):
-    """SFTP file name and attributes
+class SFTPLimits(Record):
+    """SFTP server limits
 
-       SFTPName is a simple record class with the following fields:
+       SFTPLimits is a simple record class with the following fields:
 
-         ========= ================================== ==================
-         Field     Description                        Type
-         ========= ================================== ==================
-         filename  Filename                           `str` or `bytes`
-         longname  Expanded form of filename & attrs  `str` or `bytes`
-         attrs     File attributes                    :class:`SFTPAttrs`
-         ========= ================================== ==================
+         ================= ========================================= ======
+         Field             Description                               Type
+         ================= ========================================= ======
+         max_packet_len    Max allowed size of an SFTP packet        uint64
+         max_read_len      Max allowed size of an SFTP read request  uint64
+         max_write_len     Max allowed size of an SFTP write request uint64
+         max_open_handles  Max allowed number of open file handles   uint64
+         ================= ========================================= ======
 
-       A list of these is returned by :meth:`readdir() <SFTPClient.readdir>`
-       in :class:`SFTPClient` when retrieving the contents of a directory.
+       A value of zero in any of these fields means that the server
+       did not specify a limit for it.
 
     """
 
-    __slots__ = OrderedDict((('filename', ''), ('longname', ''),
-                             ('attrs', SFTPAttrs())))
+    # Unfortunately, pylint can't handle attributes defined with setattr
+    # pylint: disable=attribute-defined-outside-init
 
-    def _format(self, k, v):
+    __slots__ = OrderedDict((('max_packet_len', 0), ('max_read_len', 0),
+                             ('max_write_len', 0), ('max_open_handles', 0)))
+
+    def encode(self):
+        """Encode SFTP server limits as bytes in an SSH packet"""
+
+        return b''.join((UInt64(self.max_packet_len),
+                         UInt64(self.max_read_len),
+                         UInt64(self.max_write_len),
+                         UInt64(self.max_open_handles)))
+
+    @classmethod
+    def decode(cls, packet):
+        """Decode bytes in an SSH packet as SFTP server limits"""
+
+        limits = cls()
+
+        limits.max_packet_len = packet.get_uint64()
+        limits.max_read_len = packet.get_uint64()
+        limits.max_write_len = packet.get_uint64()
+        limits.max_open_handles = packet.get_uint64()
+
+        return limits
+
+
+class SFTPName(Record):
+    """SFTP file name and attributes
+
+       SFTPName is a simple record class with the following fields:
+
+         ========= ================================== ==================
+         Field     Description                        Type
+         ========= ================================== ==================
+         filename  Filename                           `str` or `bytes`
+         longname  Expanded form of filename & attrs  `str` or `bytes`
+         attrs     File attributes                    :class:`SFTPAttrs`
+         ========= ================================== ==================
+
+       A list of these is returned by :meth:`readdir() <SFTPClient.readdir>`
+       in :class:`SFTPClient` when retrieving the contents of a directory.
+
+    """
+
+    __slots__ = OrderedDict((('filename', ''), ('longname', ''),
+                             ('attrs', SFTPAttrs())))
+
+    def _format(self, k, v):
         """Convert name fields to more readable values"""
 
         if not v:
@@ -727,7 +1337,14 @@ class SFTPHandler(SSHPacketLogger):
         FXP_STAT:                 FXP_ATTRS,
         FXP_READLINK:             FXP_NAME,
         b'statvfs@openssh.com':   FXP_EXTENDED_REPLY,
-        b'fstatvfs@openssh.com':  FXP_EXTENDED_REPLY
+        b'fstatvfs@openssh.com':  FXP_EXTENDED_REPLY,
+        b'check-file-handle':     FXP_EXTENDED_REPLY,
+        b'check-file-name':       FXP_EXTENDED_REPLY,
+        b'block-sums@asyncssh.com': FXP_EXTENDED_REPLY,
+        b'limits@openssh.com':    FXP_EXTENDED_REPLY,
+        b'stat-many@asyncssh.com': FXP_EXTENDED_REPLY,
+        b'remove-many@asyncssh.com': FXP_EXTENDED_REPLY,
+        b'setstat-many@asyncssh.com': FXP_EXTENDED_REPLY
     }
 
     def __init__(self, reader, writer):
@@ -808,10 +1425,13 @@ class SFTPClientHandler(SFTPHandler):
 
     _extensions = []
 
-    def __init__(self, loop, reader, writer):
+    def __init__(self, loop, reader, writer, cache_ttl=None, cache_size=1024):
         super().__init__(reader, writer)
 
         self._loop = loop
+        self._cache = _SFTPAttrCache(loop, cache_ttl,
+                                     cache_size) if cache_ttl else None
+        self._handle_paths = {}
         self._version = None
         self._next_pktid = 0
         self._requests = {}
@@ -821,6 +1441,109 @@ class SFTPClientHandler(SFTPHandler):
         self._supports_fstatvfs = False
         self._supports_hardlink = False
         self._supports_fsync = False
+        self._supports_copy_data = False
+        self._supports_check_file = False
+        self._supports_block_sums = False
+        self._supports_limits = False
+        self._supports_stat_many = False
+        self._supports_remove_many = False
+        self._supports_setstat_many = False
+        self._limits = SFTPLimits()
+
+    @property
+    def cache(self):
+        """The attribute and directory listing cache, if enabled"""
+
+        return self._cache
+
+    @property
+    def supports_copy_data(self):
+        """Return whether or not the server supports copy-data"""
+
+        return self._supports_copy_data
+
+    @property
+    def supports_block_sums(self):
+        """Return whether or not the server supports block checksums"""
+
+        return self._supports_block_sums
+
+    @property
+    def supports_posix_rename(self):
+        """Return whether or not the server supports POSIX rename"""
+
+        return self._supports_posix_rename
+
+    @property
+    def limits(self):
+        """The limits reported by the server"""
+
+        return self._limits
+
+    def limit_block_size(self, block_size=None):
+        """Return a block size for reads and writes within server limits
+
+           If no block size is requested, the largest size allowed by
+           the server is chosen, up to a maximum of 256 KB. If the server
+           doesn't report its limits, the default of 16 KB is used.
+
+        """
+
+        limits = self._limits
+        max_lens = [max_len for max_len in (limits.max_read_len,
+                                            limits.max_write_len) if max_len]
+
+        if limits.max_packet_len > _SFTP_PACKET_OVERHEAD:
+            max_lens.append(limits.max_packet_len - _SFTP_PACKET_OVERHEAD)
+
+        if not block_size:
+            if self._supports_limits:
+                block_size = _MAX_SFTP_BLOCK_SIZE
+            else:
+                block_size = SFTP_BLOCK_SIZE
+
+        return min([block_size] + max_lens)
+
+    def _invalidate(self, path, recurse=False):
+        """Invalidate cached attributes after a path is changed"""
+
+        if self._cache:
+            self._cache.invalidate(path, recurse)
+
+    def _invalidate_handle(self, handle):
+        """Invalidate cached attributes after an open file is changed"""
+
+        if self._cache and handle in self._handle_paths:
+            self._cache.invalidate(self._handle_paths[handle])
+
+    @asyncio.coroutine
+    def _cached_stat(self, kind, pkttype, path):
+        """Make an SFTP stat or lstat request, using the cache if enabled"""
+
+        if self._cache:
+            attrs = self._cache.get(kind, path)
+
+            if attrs:
+                self.logger.debug1('Using cached %s for %s', kind, path)
+                return attrs
+
+        self.logger.debug1('Sending %s for %s', kind, path)
+
+        attrs = yield from self._make_request(pkttype, String(path))
+
+        if self._cache:
+            self._cache.set(kind, path, attrs)
+
+        return attrs
+
+    def clear_cache(self, path=None):
+        """Clear cached attributes for a path, or the entire cache"""
+
+        if self._cache:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.invalidate(path, recurse=True)
 
     @asyncio.coroutine
     def _cleanup(self, exc):
@@ -1039,6 +1762,21 @@ class SFTPClientHandler(SFTPHandler):
                 self._supports_hardlink = True
             elif name == b'fsync@openssh.com' and data == b'1':
                 self._supports_fsync = True
+            elif name == b'copy-data' and data == b'1':
+                self._supports_copy_data = True
+            elif name in (b'check-file', b'check-file-handle',
+                          b'check-file-name'):
+                self._supports_check_file = True
+            elif name == b'block-sums@asyncssh.com' and data == b'1':
+                self._supports_block_sums = True
+            elif name == b'limits@openssh.com' and data == b'1':
+                self._supports_limits = True
+            elif name == b'stat-many@asyncssh.com' and data == b'1':
+                self._supports_stat_many = True
+            elif name == b'remove-many@asyncssh.com' and data == b'1':
+                self._supports_remove_many = True
+            elif name == b'setstat-many@asyncssh.com' and data == b'1':
+                self._supports_setstat_many = True
 
         if version == 3:
             # Check if the server has a buggy SYMLINK implementation
@@ -1050,6 +1788,27 @@ class SFTPClientHandler(SFTPHandler):
                                    'implementation')
                 self._nonstandard_symlink = True
 
+    @asyncio.coroutine
+    def request_limits(self):
+        """Make an SFTP limits request, if the server supports it"""
+
+        if self._supports_limits:
+            self.logger.debug1('Sending limits request')
+
+            try:
+                packet = yield from self._make_request(b'limits@openssh.com')
+            except SFTPError as exc:
+                self.logger.debug1('Limits request failed: %s', exc.reason)
+                self._supports_limits = False
+                return
+
+            limits = SFTPLimits.decode(packet)
+            packet.check_end()
+
+            self.logger.debug1('Received %s', limits)
+
+            self._limits = limits
+
     @asyncio.coroutine
     def open(self, filename, pflags, attrs):
         """Make an SFTP open request"""
@@ -1057,8 +1816,14 @@ class SFTPClientHandler(SFTPHandler):
         self.logger.debug1('Sending open for %s, mode 0x%02x%s',
                            filename, pflags, hide_empty(attrs))
 
-        return (yield from self._make_request(FXP_OPEN, String(filename),
-                                              UInt32(pflags), attrs.encode()))
+        handle = yield from self._make_request(FXP_OPEN, String(filename),
+                                               UInt32(pflags), attrs.encode())
+
+        if self._cache and pflags & FXF_WRITE:
+            self._handle_paths[handle] = filename
+            self._cache.invalidate(filename)
+
+        return handle
 
     @asyncio.coroutine
     def close(self, handle):
@@ -1066,7 +1831,11 @@ class SFTPClientHandler(SFTPHandler):
 
         self.logger.debug1('Sending close for handle %s', to_hex(handle))
 
-        return (yield from self._make_request(FXP_CLOSE, String(handle)))
+        try:
+            return (yield from self._make_request(FXP_CLOSE, String(handle)))
+        finally:
+            self._invalidate_handle(handle)
+            self._handle_paths.pop(handle, None)
 
     def nonblocking_close(self, handle):
         """Send an SFTP close request without blocking on the response"""
@@ -1077,6 +1846,9 @@ class SFTPClientHandler(SFTPHandler):
         # Used by context managers, since they can't block to wait for a reply
         self._send_request(FXP_CLOSE, String(handle))
 
+        self._invalidate_handle(handle)
+        self._handle_paths.pop(handle, None)
+
     @asyncio.coroutine
     def read(self, handle, offset, length):
         """Make an SFTP read request"""
@@ -1091,9 +1863,20 @@ class SFTPClientHandler(SFTPHandler):
     def write(self, handle, offset, data):
         """Make an SFTP write request"""
 
+        max_len = self._limits.max_write_len
+
+        if max_len and len(data) > max_len:
+            # Split writes which are larger than the server allows
+            yield from asyncio.gather(
+                *(self.write(handle, offset + i, data[i:i+max_len])
+                  for i in range(0, len(data), max_len)), loop=self._loop)
+            return
+
         self.logger.debug1('Sending write for %s at offset %d in handle %s',
                            plural(len(data), 'byte'), offset, to_hex(handle))
 
+        self._invalidate_handle(handle)
+
         return (yield from self._make_request(FXP_WRITE, String(handle),
                                               UInt64(offset), String(data)))
 
@@ -1101,17 +1884,13 @@ class SFTPClientHandler(SFTPHandler):
     def stat(self, path):
         """Make an SFTP stat request"""
 
-        self.logger.debug1('Sending stat for %s', path)
-
-        return (yield from self._make_request(FXP_STAT, String(path)))
+        return (yield from self._cached_stat('stat', FXP_STAT, path))
 
     @asyncio.coroutine
     def lstat(self, path):
         """Make an SFTP lstat request"""
 
-        self.logger.debug1('Sending lstat for %s', path)
-
-        return (yield from self._make_request(FXP_LSTAT, String(path)))
+        return (yield from self._cached_stat('lstat', FXP_LSTAT, path))
 
     @asyncio.coroutine
     def fstat(self, handle):
@@ -1127,8 +1906,11 @@ class SFTPClientHandler(SFTPHandler):
 
         self.logger.debug1('Sending setstat for %s%s', path, hide_empty(attrs))
 
-        return (yield from self._make_request(FXP_SETSTAT, String(path),
-                                              attrs.encode()))
+        try:
+            return (yield from self._make_request(FXP_SETSTAT, String(path),
+                                                  attrs.encode()))
+        finally:
+            self._invalidate(path)
 
     @asyncio.coroutine
     def fsetstat(self, handle, attrs):
@@ -1137,8 +1919,156 @@ class SFTPClientHandler(SFTPHandler):
         self.logger.debug1('Sending fsetstat for handle %s%s',
                            to_hex(handle), hide_empty(attrs))
 
-        return (yield from self._make_request(FXP_FSETSTAT, String(handle),
-                                              attrs.encode()))
+        try:
+            return (yield from self._make_request(FXP_FSETSTAT, String(handle),
+                                                  attrs.encode()))
+        finally:
+            self._invalidate_handle(handle)
+
+    @asyncio.coroutine
+    def _bulk_request(self, request, supported, items, encode, decode,
+                      single, *args):
+        """Make a batched SFTP request, or pipelined single requests
+
+           If the server supports the batched request, items are sent
+           in batches which fit within the server's packet size limit.
+           Otherwise, a single request is made for each item, with up
+           to 128 of them outstanding at a time.
+
+           A list is returned with a result for each item, or an
+           SFTPError for items which failed.
+
+        """
+
+        results = []
+
+        if not supported:
+            for i in range(0, len(items), _MAX_SFTP_REQUESTS):
+                batch = items[i:i+_MAX_SFTP_REQUESTS]
+
+                batch_results = yield from asyncio.gather(
+                    *(single(*item) for item in batch),
+                    loop=self._loop, return_exceptions=True)
+
+                for result in batch_results:
+                    if isinstance(result, Exception) and \
+                            not isinstance(result, SFTPError):
+                        raise result
+
+                results.extend(batch_results)
+
+            return results
+
+        max_len = self._limits.max_packet_len or _MAX_SFTP_PACKET_LEN
+        max_len -= _SFTP_PACKET_OVERHEAD
+        batches = []
+        batch = []
+        batch_len = 0
+
+        for item in items:
+            data = encode(*item)
+
+            if batch and (len(batch) >= _MAX_BULK_ITEMS or
+                          batch_len + len(data) > max_len):
+                batches.append(batch)
+                batch = []
+                batch_len = 0
+
+            batch.append(data)
+            batch_len += len(data)
+
+        if batch:
+            batches.append(batch)
+
+        packets = yield from asyncio.gather(
+            *(self._make_request(request, *(list(args) +
+                                            [UInt32(len(batch))] + batch))
+              for batch in batches), loop=self._loop)
+
+        for batch, packet in zip(batches, packets):
+            count = packet.get_uint32()
+
+            if count != len(batch):
+                raise SFTPError(FX_BAD_MESSAGE, 'Incorrect result count')
+
+            for _ in range(count):
+                code = packet.get_uint32()
+
+                if code == FX_OK:
+                    results.append(decode(packet))
+                    continue
+
+                try:
+                    reason = packet.get_string().decode('utf-8')
+                    lang = packet.get_string().decode('ascii')
+                except UnicodeDecodeError:
+                    raise SFTPError(FX_BAD_MESSAGE,
+                                    'Invalid status message') from None
+
+                results.append(SFTPError(code, reason, lang))
+
+            packet.check_end()
+
+        self.logger.debug1('Received %s', plural(len(results), 'result'))
+
+        return results
+
+    @asyncio.coroutine
+    def stat_many(self, paths, follow_symlinks):
+        """Make SFTP stat or lstat requests for a list of paths"""
+
+        kind = 'stat' if follow_symlinks else 'lstat'
+
+        if self._supports_stat_many:
+            self.logger.debug1('Sending %s-many for %s', kind,
+                               plural(len(paths), 'path'))
+
+        results = yield from self._bulk_request(
+            b'stat-many@asyncssh.com', self._supports_stat_many,
+            [(path,) for path in paths], String, SFTPAttrs.decode,
+            self.stat if follow_symlinks else self.lstat,
+            Boolean(follow_symlinks))
+
+        if self._cache:
+            for path, attrs in zip(paths, results):
+                if isinstance(attrs, SFTPAttrs):
+                    self._cache.set(kind, path, attrs)
+
+        return results
+
+    @asyncio.coroutine
+    def remove_many(self, paths):
+        """Make SFTP remove requests for a list of paths"""
+
+        if self._supports_remove_many:
+            self.logger.debug1('Sending remove-many for %s',
+                               plural(len(paths), 'path'))
+
+        try:
+            return (yield from self._bulk_request(
+                b'remove-many@asyncssh.com', self._supports_remove_many,
+                [(path,) for path in paths], String, lambda packet: None,
+                self.remove))
+        finally:
+            for path in paths:
+                self._invalidate(path)
+
+    @asyncio.coroutine
+    def setstat_many(self, items):
+        """Make SFTP setstat requests for a list of paths and attributes"""
+
+        if self._supports_setstat_many:
+            self.logger.debug1('Sending setstat-many for %s',
+                               plural(len(items), 'path'))
+
+        try:
+            return (yield from self._bulk_request(
+                b'setstat-many@asyncssh.com', self._supports_setstat_many,
+                items, lambda path, attrs: String(path) + attrs.encode(),
+                lambda packet: None, self.setstat))
+        finally:
+            for path, _ in items:
+                self._invalidate(path)
 
     @asyncio.coroutine
     def statvfs(self, path):
@@ -1182,7 +2112,10 @@ class SFTPClientHandler(SFTPHandler):
 
         self.logger.debug1('Sending remove for %s', path)
 
-        return (yield from self._make_request(FXP_REMOVE, String(path)))
+        try:
+            return (yield from self._make_request(FXP_REMOVE, String(path)))
+        finally:
+            self._invalidate(path)
 
     @asyncio.coroutine
     def rename(self, oldpath, newpath):
@@ -1191,8 +2124,12 @@ class SFTPClientHandler(SFTPHandler):
         self.logger.debug1('Sending rename request from %s to %s',
                            oldpath, newpath)
 
-        return (yield from self._make_request(FXP_RENAME, String(oldpath),
-                                              String(newpath)))
+        try:
+            return (yield from self._make_request(FXP_RENAME, String(oldpath),
+                                                  String(newpath)))
+        finally:
+            self._invalidate(oldpath, recurse=True)
+            self._invalidate(newpath, recurse=True)
 
     @asyncio.coroutine
     def posix_rename(self, oldpath, newpath):
@@ -1202,9 +2139,13 @@ class SFTPClientHandler(SFTPHandler):
             self.logger.debug1('Sending POSIX rename request from %s to %s',
                                oldpath, newpath)
 
-            return (yield from self._make_request(b'posix-rename@openssh.com',
-                                                  String(oldpath),
-                                                  String(newpath)))
+            try:
+                return (yield from self._make_request(
+                    b'posix-rename@openssh.com', String(oldpath),
+                    String(newpath)))
+            finally:
+                self._invalidate(oldpath, recurse=True)
+                self._invalidate(newpath, recurse=True)
         else:
             raise SFTPError(FX_OP_UNSUPPORTED, 'POSIX rename not supported')
 
@@ -1230,8 +2171,11 @@ class SFTPClientHandler(SFTPHandler):
 
         self.logger.debug1('Sending mkdir for %s', path)
 
-        return (yield from self._make_request(FXP_MKDIR, String(path),
-                                              attrs.encode()))
+        try:
+            return (yield from self._make_request(FXP_MKDIR, String(path),
+                                                  attrs.encode()))
+        finally:
+            self._invalidate(path)
 
     @asyncio.coroutine
     def rmdir(self, path):
@@ -1239,7 +2183,10 @@ class SFTPClientHandler(SFTPHandler):
 
         self.logger.debug1('Sending rmdir for %s', path)
 
-        return (yield from self._make_request(FXP_RMDIR, String(path)))
+        try:
+            return (yield from self._make_request(FXP_RMDIR, String(path)))
+        finally:
+            self._invalidate(path, recurse=True)
 
     @asyncio.coroutine
     def realpath(self, path):
@@ -1269,7 +2216,10 @@ class SFTPClientHandler(SFTPHandler):
         else:
             args = String(newpath) + String(oldpath)
 
-        return (yield from self._make_request(FXP_SYMLINK, args))
+        try:
+            return (yield from self._make_request(FXP_SYMLINK, args))
+        finally:
+            self._invalidate(newpath)
 
     @asyncio.coroutine
     def link(self, oldpath, newpath):
@@ -1279,9 +2229,13 @@ class SFTPClientHandler(SFTPHandler):
             self.logger.debug1('Sending hardlink request from %s to %s',
                                oldpath, newpath)
 
-            return (yield from self._make_request(b'hardlink@openssh.com',
-                                                  String(oldpath),
-                                                  String(newpath)))
+            try:
+                return (yield from self._make_request(b'hardlink@openssh.com',
+                                                      String(oldpath),
+                                                      String(newpath)))
+            finally:
+                self._invalidate(oldpath)
+                self._invalidate(newpath)
         else:
             raise SFTPError(FX_OP_UNSUPPORTED, 'link not supported')
 
@@ -1292,66 +2246,503 @@ class SFTPClientHandler(SFTPHandler):
         if self._supports_fsync:
             self.logger.debug1('Sending fsync for handle %s', to_hex(handle))
 
-            return (yield from self._make_request(b'fsync@openssh.com',
-                                                  String(handle)))
-        else:
-            raise SFTPError(FX_OP_UNSUPPORTED, 'fsync not supported')
+            return (yield from self._make_request(b'fsync@openssh.com',
+                                                  String(handle)))
+        else:
+            raise SFTPError(FX_OP_UNSUPPORTED, 'fsync not supported')
+
+    @asyncio.coroutine
+    def copy_data(self, read_handle, read_offset, read_length,
+                  write_handle, write_offset):
+        """Make an SFTP copy data request"""
+
+        if self._supports_copy_data:
+            self.logger.debug1('Sending copy-data from handle %s, '
+                               'offset %d, length %d to handle %s, '
+                               'offset %d', to_hex(read_handle),
+                               read_offset, read_length,
+                               to_hex(write_handle), write_offset)
+
+            self._invalidate_handle(write_handle)
+
+            return (yield from self._make_request(b'copy-data',
+                                                  String(read_handle),
+                                                  UInt64(read_offset),
+                                                  UInt64(read_length),
+                                                  String(write_handle),
+                                                  UInt64(write_offset)))
+        else:
+            raise SFTPError(FX_OP_UNSUPPORTED, 'copy-data not supported')
+
+    @asyncio.coroutine
+    def block_sums(self, path, offset, length, block_size):
+        """Make an SFTP block checksums request"""
+
+        if self._supports_block_sums:
+            self.logger.debug1('Sending block-sums for %s, offset %d, '
+                               'length %d, block size %d', path, offset,
+                               length, block_size)
+
+            packet = yield from self._make_request(b'block-sums@asyncssh.com',
+                                                   String(path),
+                                                   UInt64(offset),
+                                                   UInt64(length),
+                                                   UInt32(block_size))
+
+            block_sums = []
+
+            while packet:
+                block_sums.append((packet.get_uint32(), packet.get_bytes(16)))
+
+            self.logger.debug1('Received %s',
+                               plural(len(block_sums), 'block checksum'))
+
+            return block_sums
+        else:
+            raise SFTPError(FX_OP_UNSUPPORTED, 'block-sums not supported')
+
+    @asyncio.coroutine
+    def _check_file(self, request, name, hash_algs, offset,
+                    length, block_size):
+        """Make an SFTP check file request and decode the hashes"""
+
+        if not self._supports_check_file:
+            raise SFTPError(FX_OP_UNSUPPORTED, 'check-file not supported')
+
+        packet = yield from self._make_request(request, String(name),
+                                               String(b','.join(hash_algs)),
+                                               UInt64(offset),
+                                               UInt64(length),
+                                               UInt32(block_size))
+
+        if packet.get_string() != b'check-file':
+            raise SFTPError(FX_BAD_MESSAGE, 'Invalid check-file reply')
+
+        try:
+            alg = packet.get_string().decode('ascii')
+            hash_len = hashlib.new(alg).digest_size
+        except (UnicodeDecodeError, ValueError):
+            raise SFTPError(FX_BAD_MESSAGE,
+                            'Unknown check-file hash algorithm') from None
+
+        data = packet.get_remaining_payload()
+
+        if len(data) % hash_len:
+            raise SFTPError(FX_BAD_MESSAGE, 'Invalid check-file hash length')
+
+        hashes = [data[i:i+hash_len] for i in range(0, len(data), hash_len)]
+
+        self.logger.debug1('Received %s using %s',
+                           plural(len(hashes), 'hash', 'es'), alg)
+
+        return alg, hashes
+
+    @asyncio.coroutine
+    def check_file_handle(self, handle, hash_algs, offset, length,
+                          block_size):
+        """Make an SFTP check file handle request"""
+
+        self.logger.debug1('Sending check-file-handle for handle %s',
+                           to_hex(handle))
+
+        return (yield from self._check_file(b'check-file-handle', handle,
+                                            hash_algs, offset, length,
+                                            block_size))
+
+    @asyncio.coroutine
+    def check_file_name(self, path, hash_algs, offset, length, block_size):
+        """Make an SFTP check file name request"""
+
+        self.logger.debug1('Sending check-file-name for %s', path)
+
+        return (yield from self._check_file(b'check-file-name', path,
+                                            hash_algs, offset, length,
+                                            block_size))
+
+    def exit(self):
+        """Handle a request to close the SFTP session"""
+
+        if self._writer:
+            self._writer.write_eof()
+
+    @asyncio.coroutine
+    def wait_closed(self):
+        """Wait for this SFTP session to close"""
+
+        if self._writer:
+            yield from self._writer.channel.wait_closed()
+
+
+class _SFTPReadAhead:
+    """Pipelined read requests for reading a remote file in order
+
+       Read requests are sent ahead of the data being consumed, with
+       the request window doubling as each block is consumed, up to
+       max_requests. Reads at explicit offsets each use their own
+       read-ahead, so that they can run in parallel on the same file.
+
+    """
+
+    def __init__(self, loop, handler, handle, block_size, max_requests):
+        self._loop = loop
+        self._handler = handler
+        self._handle = handle
+        self._block_size = block_size
+        self._max_requests = max_requests
+
+        self._reqs = deque()
+        self._buf = b''
+        self.pos = None
+        self._next = None
+        self._window = 1
+
+    @staticmethod
+    def _read_done(task):
+        """Retrieve the result of a read request which may be discarded"""
+
+        if not task.cancelled():
+            task.exception()
+
+    def reset(self):
+        """Discard any read-ahead data and outstanding read requests"""
+
+        for _, _, task in self._reqs:
+            task.cancel()
+
+        self._reqs.clear()
+        self._buf = b''
+        self.pos = None
+        self._next = None
+        self._window = 1
+
+    def _send_reads(self):
+        """Send read requests to fill the read-ahead window"""
+
+        while len(self._reqs) < self._window:
+            task = asyncio.Task(self._handler.read(self._handle, self._next,
+                                                   self._block_size),
+                                loop=self._loop)
+            task.add_done_callback(self._read_done)
+
+            self._reqs.append((self._next, self._block_size, task))
+            self._next += self._block_size
+
+    def start(self, size, offset):
+        """Prepare read-ahead for a read at the requested offset
+
+           If the read doesn't continue where the last one left off,
+           outstanding read-ahead is discarded and the request window
+           is reset to cover only the data requested. The window then
+           doubles as each block is consumed, up to max_requests.
+
+        """
+
+        if offset != self.pos:
+            self.reset()
+            self.pos = self._next = offset
+
+            if size is not None and size > 0:
+                self._window = min(-(-size // self._block_size),
+                                   self._max_requests)
+
+    @asyncio.coroutine
+    def read_chunk(self, size):
+        """Return the next chunk of read-ahead data, up to size bytes
+
+           Data is returned as a memoryview, which is empty at EOF.
+
+        """
+
+        if not self._buf:
+            self._send_reads()
+            req_offset, req_size, task = self._reqs.popleft()
+
+            try:
+                result = yield from task
+            except SFTPError as exc:
+                pos = self.pos
+                self.reset()
+
+                if exc.code != FX_EOF:
+                    raise
+
+                self.pos = self._next = pos
+                return memoryview(b'')
+
+            if len(result) < req_size:
+                # Short read -- restart read-ahead after the data returned
+                for _, _, pending in self._reqs:
+                    pending.cancel()
+
+                self._reqs.clear()
+                self._next = req_offset + len(result)
+
+            self._buf = memoryview(result)
+            self._window = min(2 * self._window, self._max_requests)
+
+        if size is None or size < 0 or size >= len(self._buf):
+            result, self._buf = self._buf, b''
+        else:
+            result = self._buf[:size]
+            self._buf = self._buf[size:]
+
+        self.pos += len(result)
+        return result
+
+
+class SFTPClientFile:
+    """SFTP client remote file object
+
+       This class represents an open file on a remote SFTP server. It
+       is opened with the :meth:`open() <SFTPClient.open>` method on the
+       :class:`SFTPClient` class and provides methods to read and write
+       data and get and set attributes on the open file.
+
+       If a block size was specified when the file was opened, reads
+       and writes are buffered. Sequential reads trigger read-ahead,
+       keeping up to the requested maximum number of read requests
+       outstanding. Reads at an explicit offset and unbuffered reads
+       of the rest of the file are also pipelined, but each of them
+       uses its own requests, so they can safely be run in parallel.
+       Writes are coalesced into block-sized write
+       requests which are sent without waiting for their responses.
+       Buffered writes are flushed when the file is closed or synced,
+       and when file data or attributes are read. Errors from writes
+       which have not yet completed are reported on the next call
+       which writes or flushes data. Files opened for writing with
+       buffering must be closed by calling :meth:`close` or by using
+       them as an async context manager, so that the result of these
+       writes can be reported. Using them as a non-async context
+       manager raises an error.
+
+       On Python 3.5 and later, this class can also be used as an
+       async iterator, returning file data a block at a time starting
+       at the current file position, using pipelined read requests.
+
+    """
+
+    def __init__(self, loop, handler, handle, appending, encoding, errors,
+                 block_size=None, max_requests=_MAX_SFTP_REQUESTS,
+                 writable=False):
+        self._loop = loop
+        self._handler = handler
+        self._handle = handle
+        self._appending = appending
+        self._encoding = encoding
+        self._errors = errors
+        self._offset = None if appending else 0
+        self._block_size = block_size
+        self._max_requests = max_requests
+        self._read_block_size = handler.limit_block_size(block_size)
+        self._read_ahead = self._new_read_ahead()
+        self._decoder = None
+
+        self._write_behind = bool(block_size) and writable
+        self._write_reqs = set()
+        self._write_buf = bytearray()
+        self._write_offset = None
+        self._write_exc = None
+
+    def __enter__(self):
+        """Allow SFTPClientFile to be used as a context manager"""
+
+        if self._write_behind:
+            # Buffered writes can't be flushed when a non-async context
+            # manager exits, so refuse to act as one rather than losing
+            # data which has already been accepted
+            self._handler.nonblocking_close(self._handle)
+            self._handle = None
+
+            raise ValueError('Files opened for buffered writes must be '
+                             'used with async with')
+
+        return self
+
+    def __exit__(self, *exc_info):
+        """Automatically close the file when used as a context manager"""
+
+        if self._handle:
+            self._reset_reads()
+            self._handler.nonblocking_close(self._handle)
+            self._handle = None
+
+    @asyncio.coroutine
+    def __aenter__(self):
+        """Allow SFTPClientFile to be used as an async context manager"""
+
+        return self
+
+    @asyncio.coroutine
+    def __aexit__(self, *exc_info):
+        """Wait for file close when used as an async context manager"""
+
+        yield from self.close()
+
+    if python35:
+        @async_iterator
+        def __aiter__(self):
+            """Allow SFTPClientFile to be an async iterator"""
+
+            return self
+
+        @asyncio.coroutine
+        def __anext__(self):
+            """Return one block at a time when used as an async iterator"""
+
+            data = yield from self._read_block()
+
+            if data:
+                return data
+            else:
+                raise StopAsyncIteration
+
+    def _new_read_ahead(self):
+        """Return a new read-ahead pipeline for this file"""
+
+        return _SFTPReadAhead(self._loop, self._handler, self._handle,
+                              self._read_block_size, self._max_requests)
+
+    def _reset_reads(self):
+        """Discard any sequential read-ahead data and read requests"""
+
+        self._read_ahead.reset()
+        self._decoder = None
+
+    @asyncio.coroutine
+    def _pipelined_read(self, size, offset, shared, consume):
+        """Read data using pipelined read-ahead requests
+
+           Each chunk of data is passed to consume as it arrives. Only
+           sequential buffered reads share the file's read-ahead. Other
+           reads use their own, discarding any requests sent beyond
+           the data requested once they complete.
+
+        """
+
+        read_ahead = self._read_ahead if shared else self._new_read_ahead()
+        read_ahead.start(size, offset)
+
+        try:
+            while size is None or size != 0:
+                result = yield from read_ahead.read_chunk(size)
+
+                if not result:
+                    break
+
+                consume(result)
+
+                if size is not None and size > 0:
+                    size -= len(result)
+        finally:
+            if not shared:
+                read_ahead.reset()
+
+    def _check_write_error(self):
+        """Raise any error returned by an earlier buffered write"""
+
+        exc, self._write_exc = self._write_exc, None
+
+        if exc:
+            raise exc
+
+    def _write_done(self, task):
+        """Record the completion of a buffered write request"""
+
+        self._write_reqs.discard(task)
+
+        if not task.cancelled():
+            exc = task.exception()
+
+            if exc and not self._write_exc:
+                self._write_exc = exc
+
+    def _send_writes(self, flush):
+        """Send write requests for buffered data
+
+           Only full blocks of data are sent unless flush is set.
+
+        """
+
+        while (len(self._write_buf) >= self._block_size or
+               (flush and self._write_buf)):
+            data = bytes(self._write_buf[:self._block_size])
+            del self._write_buf[:self._block_size]
+
+            task = asyncio.Task(self._handler.write(self._handle,
+                                                    self._write_offset, data),
+                                loop=self._loop)
+            task.add_done_callback(self._write_done)
+
+            self._write_reqs.add(task)
+            self._write_offset += len(data)
+
+    @asyncio.coroutine
+    def _buffered_write(self, data, offset):
+        """Coalesce data into block-sized write requests"""
+
+        self._check_write_error()
+        self._reset_reads()
+
+        if (self._write_buf and not self._appending and
+                offset != self._write_offset + len(self._write_buf)):
+            self._send_writes(True)
 
-    def exit(self):
-        """Handle a request to close the SFTP session"""
+        if not self._write_buf:
+            self._write_offset = offset
 
-        if self._writer:
-            self._writer.write_eof()
+        self._write_buf.extend(data)
+        self._send_writes(False)
 
-    @asyncio.coroutine
-    def wait_closed(self):
-        """Wait for this SFTP session to close"""
+        while len(self._write_reqs) >= self._max_requests:
+            yield from asyncio.wait(self._write_reqs, loop=self._loop,
+                                    return_when=asyncio.FIRST_COMPLETED)
 
-        if self._writer:
-            yield from self._writer.channel.wait_closed()
+    @asyncio.coroutine
+    def _flush(self):
+        """Send any buffered writes and wait for them to complete"""
 
+        if self._block_size:
+            self._send_writes(True)
 
-class SFTPClientFile:
-    """SFTP client remote file object
+            if self._write_reqs:
+                yield from asyncio.wait(self._write_reqs, loop=self._loop)
 
-       This class represents an open file on a remote SFTP server. It
-       is opened with the :meth:`open() <SFTPClient.open>` method on the
-       :class:`SFTPClient` class and provides methods to read and write
-       data and get and set attributes on the open file.
+            self._check_write_error()
 
-    """
+    @asyncio.coroutine
+    def _read_block(self):
+        """Return the next block of file data for async iteration"""
 
-    def __init__(self, handler, handle, appending, encoding, errors):
-        self._handler = handler
-        self._handle = handle
-        self._appending = appending
-        self._encoding = encoding
-        self._errors = errors
-        self._offset = None if appending else 0
+        if self._handle is None:
+            raise ValueError('I/O operation on closed file')
 
-    def __enter__(self):
-        """Allow SFTPClientFile to be used as a context manager"""
+        yield from self._flush()
 
-        return self
+        if self._offset is None:
+            return b''
 
-    def __exit__(self, *exc_info):
-        """Automatically close the file when used as a context manager"""
+        self._read_ahead.start(None, self._offset)
 
-        if self._handle:
-            self._handler.nonblocking_close(self._handle)
-            self._handle = None
+        if self._encoding and not self._decoder:
+            self._decoder = codecs.getincrementaldecoder(self._encoding)(
+                self._errors)
 
-    @asyncio.coroutine
-    def __aenter__(self):
-        """Allow SFTPClientFile to be used as an async context manager"""
+        decoder = self._decoder
 
-        return self
+        while True:
+            data = yield from self._read_ahead.read_chunk(None)
+            self._offset = self._read_ahead.pos
 
-    @asyncio.coroutine
-    def __aexit__(self, *exc_info):
-        """Wait for file close when used as an async context manager"""
+            if decoder:
+                result = decoder.decode(data, not data)
 
-        yield from self.close()
+                if result or not data:
+                    return result
+            elif len(data) == len(data.obj):
+                # Return the full read response without copying it
+                return data.obj
+            else:
+                return data.tobytes()
 
     @asyncio.coroutine
     def _end(self):
@@ -1398,6 +2789,10 @@ class SFTPClientFile:
         if self._handle is None:
             raise ValueError('I/O operation on closed file')
 
+        yield from self._flush()
+
+        shared = offset is None and self._block_size
+
         if offset is None:
             offset = self._offset
 
@@ -1405,22 +2800,11 @@ class SFTPClientFile:
             # We're appending and haven't seeked backward in the file
             # since the last write, so there's no data to return
             data = b''
-        elif size is None or size < 0:
+        elif self._block_size or size is None or size < 0:
             data = []
-
-            try:
-                while True:
-                    result = yield from self._handler.read(self._handle,
-                                                           offset,
-                                                           SFTP_BLOCK_SIZE)
-                    data.append(result)
-                    offset += len(result)
-                    self._offset = offset
-            except SFTPError as exc:
-                if exc.code != FX_EOF:
-                    raise
-
+            yield from self._pipelined_read(size, offset, shared, data.append)
             data = b''.join(data)
+            self._offset = offset + len(data)
         else:
             data = b''
 
@@ -1437,6 +2821,63 @@ class SFTPClientFile:
 
         return data
 
+    @asyncio.coroutine
+    def readinto(self, buffer, offset=None):
+        """Read data from the remote file into a buffer
+
+           This method reads up to `len(buffer)` bytes of data from
+           the remote file directly into a caller-supplied writable
+           buffer such as a `bytearray` or `memoryview`. The reads
+           are pipelined, with data from each response copied into
+           the buffer as it arrives. Data is always read as bytes,
+           even if an encoding was set when the file was opened.
+
+           If offset is specified, the read will be performed starting
+           at that offset rather than the current file position.
+
+           :param buffer:
+               The buffer to read data into
+           :param offset: (optional)
+               The offset from the beginning of the file to begin reading
+           :type buffer: `bytearray` or `memoryview`
+           :type offset: `int`
+
+           :returns: number of bytes read, which is 0 when at EOF
+
+           :raises: | :exc:`ValueError` if the file has been closed
+                    | :exc:`SFTPError` if the server returns an error
+
+        """
+
+        if self._handle is None:
+            raise ValueError('I/O operation on closed file')
+
+        yield from self._flush()
+
+        shared = offset is None and self._block_size
+
+        if offset is None:
+            offset = self._offset
+
+        if offset is None:
+            return 0
+
+        def _copy_data(data):
+            """Copy data into the buffer as it arrives"""
+
+            nonlocal pos
+
+            view[pos:pos+len(data)] = data
+            pos += len(data)
+
+        view = memoryview(buffer).cast('B')
+        pos = 0
+
+        yield from self._pipelined_read(len(view), offset, shared, _copy_data)
+
+        self._offset = offset + pos
+        return pos
+
     @asyncio.coroutine
     def write(self, data, offset=None):
         """Write data to the remote file
@@ -1477,7 +2918,12 @@ class SFTPClientFile:
         if self._encoding:
             data = data.encode(self._encoding, self._errors)
 
-        yield from self._handler.write(self._handle, offset, data)
+        if self._block_size:
+            yield from self._buffered_write(data, offset)
+        else:
+            self._reset_reads()
+            yield from self._handler.write(self._handle, offset, data)
+
         self._offset = None if self._appending else offset + len(data)
         return len(data)
 
@@ -1550,6 +2996,8 @@ class SFTPClientFile:
         if self._handle is None:
             raise ValueError('I/O operation on closed file')
 
+        yield from self._flush()
+
         return (yield from self._handler.fstat(self._handle))
 
     @asyncio.coroutine
@@ -1569,6 +3017,7 @@ class SFTPClientFile:
         if self._handle is None:
             raise ValueError('I/O operation on closed file')
 
+        yield from self._flush()
         yield from self._handler.fsetstat(self._handle, attrs)
 
     @asyncio.coroutine
@@ -1591,6 +3040,30 @@ class SFTPClientFile:
 
         return (yield from self._handler.fstatvfs(self._handle))
 
+    @asyncio.coroutine
+    def check_file(self, hash_algs='sha256', offset=0, length=0,
+                   block_size=0):
+        """Get hashes of the remote file computed by the server
+
+           This method asks the server to hash the contents of the
+           currently open file. Any buffered writes are flushed first.
+           See :meth:`SFTPClient.check_file` for a description of the
+           arguments and return value.
+
+           :raises: :exc:`SFTPError` if the server doesn't support this
+                    extension or returns an error
+
+        """
+
+        if self._handle is None:
+            raise ValueError('I/O operation on closed file')
+
+        yield from self._flush()
+
+        return (yield from self._handler.check_file_handle(
+            self._handle, _encode_hash_algs(hash_algs), offset,
+            length, block_size))
+
     @asyncio.coroutine
     def truncate(self, size=None):
         """Truncate the remote file to the specified size
@@ -1681,15 +3154,27 @@ class SFTPClientFile:
         if self._handle is None:
             raise ValueError('I/O operation on closed file')
 
+        yield from self._flush()
         yield from self._handler.fsync(self._handle)
 
     @asyncio.coroutine
     def close(self):
-        """Close the remote file"""
+        """Close the remote file
+
+           If writes are being buffered, any remaining data is written
+           before the file is closed, and an error is raised if any
+           of the buffered writes failed.
+
+        """
 
         if self._handle:
-            yield from self._handler.close(self._handle)
-            self._handle = None
+            self._reset_reads()
+
+            try:
+                yield from self._flush()
+            finally:
+                yield from self._handler.close(self._handle)
+                self._handle = None
 
 
 class SFTPClient:
@@ -1700,6 +3185,17 @@ class SFTPClient:
        <SSHClientConnection.start_sftp_client>` method on the
        :class:`SSHClientConnection` class.
 
+       If a cache time to live was specified when the client was
+       started, the results of getting file attributes and reading
+       directories are cached for that long, and reused by later calls
+       for the same path. This includes the checks made by methods
+       such as :meth:`exists`, :meth:`isdir`, and :meth:`getsize`, and
+       the attribute lookups done while copying files. Cached entries
+       are invalidated when this client changes the corresponding path,
+       but changes made by other clients may not be seen until the
+       entries expire. The cache can also be explicitly cleared by
+       calling :meth:`clear_cache`.
+
     """
 
     def __init__(self, loop, handler, path_encoding, path_errors):
@@ -1738,6 +3234,19 @@ class SFTPClient:
 
         return self._handler.logger
 
+    @property
+    def limits(self):
+        """The limits reported by the SFTP server
+
+           If the server supports the limits@openssh.com extension,
+           this is an :class:`SFTPLimits` object containing the maximum
+           packet size, read and write lengths, and number of open
+           handles it allows. Otherwise, all of these values are zero.
+
+        """
+
+        return self._handler.limits
+
     def encode(self, path):
         """Encode path name using configured path encoding
 
@@ -1803,12 +3312,79 @@ class SFTPClient:
             else:
                 raise
 
+    @asyncio.coroutine
+    def _rmtree(self, path, sem, error_handler):
+        """Recursively remove a remote directory and its contents"""
+
+        def _report(exc):
+            """Report an error, or raise it if there's no error handler"""
+
+            if error_handler:
+                error_handler(exc)
+            else:
+                raise exc
+
+        @asyncio.coroutine
+        def _remove_files(filepaths):
+            """Remove the files in this directory"""
+
+            with (yield from sem):
+                results = yield from self._handler.remove_many(filepaths)
+
+            for result in results:
+                if result:
+                    _report(result)
+
+        try:
+            with (yield from sem):
+                names = yield from self.readdir(path)
+        except SFTPError as exc:
+            _report(exc)
+            return
+
+        filepaths = []
+        subdirs = []
+
+        for name in names:
+            if name.filename in (b'.', b'..'):
+                continue
+
+            filepath = posixpath.join(path, name.filename)
+            mode = name.attrs.permissions
+
+            if mode is None:
+                mode = yield from self._mode(filepath, statfunc=self.lstat)
+
+            if stat.S_ISDIR(mode):
+                subdirs.append(filepath)
+            else:
+                filepaths.append(filepath)
+
+        tasks = [self._rmtree(subdir, sem, error_handler)
+                 for subdir in subdirs]
+
+        if filepaths:
+            tasks.append(_remove_files(filepaths))
+
+        # Wait for all of the removals to finish before raising an
+        # error, so nothing is still being removed after rmtree returns
+        results = yield from asyncio.gather(*tasks, loop=self._loop,
+                                            return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        try:
+            with (yield from sem):
+                yield from self._handler.rmdir(path)
+        except SFTPError as exc:
+            _report(exc)
+
     @asyncio.coroutine
     def _glob(self, fs, patterns, error_handler):
         """Begin a new glob pattern match"""
 
-        # pylint: disable=no-self-use
-
         if isinstance(patterns, (str, bytes, PurePath)):
             patterns = [patterns]
 
@@ -1818,7 +3394,8 @@ class SFTPClient:
             if not pattern:
                 continue
 
-            names = yield from match_glob(fs, fs.encode(pattern), error_handler)
+            names = yield from match_glob(fs, fs.encode(pattern),
+                                          error_handler, self._loop)
 
             if isinstance(pattern, (str, PurePath)):
                 names = [fs.decode(name) for name in names]
@@ -1827,9 +3404,66 @@ class SFTPClient:
 
         return result
 
+    @asyncio.coroutine
+    def _copy_file(self, srcfs, dstfs, srcpath, dstpath, size,
+                   block_size, progress_handler, delta, resume,
+                   hash_handler, hash_alg):
+        """Copy a file, letting the server copy the data when possible"""
+
+        if hash_handler:
+            hash_obj = hashlib.new(hash_alg)
+
+            yield from self._copy_file_data(srcfs, dstfs, srcpath, dstpath,
+                                            size, block_size, progress_handler,
+                                            delta, resume, hash_obj)
+
+            hash_handler(srcpath, dstpath, hash_obj.digest())
+        else:
+            yield from self._copy_file_data(srcfs, dstfs, srcpath, dstpath,
+                                            size, block_size, progress_handler,
+                                            delta, resume)
+
+    @asyncio.coroutine
+    def _copy_file_data(self, srcfs, dstfs, srcpath, dstpath, size,
+                        block_size, progress_handler, delta, resume,
+                        hash_obj=None):
+        """Copy the data in a file using the best available method"""
+
+        if srcfs is self and dstfs is self and \
+                self._handler.supports_copy_data and not hash_obj:
+            try:
+                yield from _SFTPRemoteCopier(self._loop, self._handler).copy(
+                    srcfs, dstfs, srcpath, dstpath, size,
+                    block_size, progress_handler, resume)
+                return
+            except SFTPError as exc:
+                if exc.code != FX_OP_UNSUPPORTED:
+                    raise
+
+                self.logger.info('    Server-side copy failed, copying '
+                                 'data through client')
+        elif delta and self._handler.supports_block_sums:
+            yield from _SFTPDeltaCopier(self._loop, self._handler).copy(
+                srcfs, dstfs, srcpath, dstpath, size,
+                block_size, progress_handler)
+
+            if hash_obj:
+                localpath = srcpath if srcfs is LocalFile else dstpath
+
+                yield from self._loop.run_in_executor(
+                    None, _hash_local_file, localpath, hash_obj, block_size)
+
+            return
+
+        yield from _SFTPFileCopier(self._loop, hash_obj=hash_obj).copy(
+            srcfs, dstfs, srcpath, dstpath, size, block_size,
+            progress_handler, resume)
+
     @asyncio.coroutine
     def _copy(self, srcfs, dstfs, srcpath, dstpath, preserve, recurse,
-              follow_symlinks, block_size, progress_handler, error_handler):
+              follow_symlinks, block_size, progress_handler, error_handler,
+              delta=False, resume=False, hash_handler=None,
+              hash_alg='sha256'):
         """Copy a file, directory, or symbolic link"""
 
         if follow_symlinks:
@@ -1861,7 +3495,9 @@ class SFTPClient:
                     yield from self._copy(srcfs, dstfs, srcfile,
                                           dstfile, preserve, recurse,
                                           follow_symlinks, block_size,
-                                          progress_handler, error_handler)
+                                          progress_handler, error_handler,
+                                          delta, resume, hash_handler,
+                                          hash_alg)
 
                 self.logger.info('  Finished copy of directory %s to %s',
                                  srcpath, dstpath)
@@ -1876,9 +3512,10 @@ class SFTPClient:
             else:
                 self.logger.info('  Copying file %s to %s', srcpath, dstpath)
 
-                yield from _SFTPFileCopier(self._loop).copy(
-                    srcfs, dstfs, srcpath, dstpath, srcattrs.size,
-                    block_size, progress_handler)
+                yield from self._copy_file(srcfs, dstfs, srcpath, dstpath,
+                                           srcattrs.size, block_size,
+                                           progress_handler, delta, resume,
+                                           hash_handler, hash_alg)
 
             if preserve:
                 attrs = yield from srcfs.stat(srcpath)
@@ -1902,9 +3539,26 @@ class SFTPClient:
     @asyncio.coroutine
     def _begin_copy(self, srcfs, dstfs, srcpaths, dstpath, preserve,
                     recurse, follow_symlinks, block_size,
-                    progress_handler, error_handler):
+                    progress_handler, error_handler, delta=False,
+                    resume=False, hash_handler=None, hash_alg='sha256',
+                    progress_details=False):
         """Begin a new file upload, download, or copy"""
 
+        block_size = self._handler.limit_block_size(block_size)
+
+        # Copiers always report request window details, so drop them
+        # unless the caller asked for them
+        if progress_handler and not progress_details:
+            report = progress_handler
+
+            def _report_without_details(srcpath, dstpath, bytes_copied,
+                                        total_bytes, *_):
+                """Report progress without request window details"""
+
+                report(srcpath, dstpath, bytes_copied, total_bytes)
+
+            progress_handler = _report_without_details
+
         dst_isdir = dstpath is None or (yield from dstfs.isdir(dstpath))
 
         if dstpath:
@@ -1929,12 +3583,15 @@ class SFTPClient:
 
             yield from self._copy(srcfs, dstfs, srcfile, dstfile, preserve,
                                   recurse, follow_symlinks, block_size,
-                                  progress_handler, error_handler)
+                                  progress_handler, error_handler, delta,
+                                  resume, hash_handler, hash_alg)
 
     @asyncio.coroutine
     def get(self, remotepaths, localpath=None, *, preserve=False,
-            recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-            progress_handler=None, error_handler=None):
+            recurse=False, follow_symlinks=False, block_size=None,
+            progress_handler=None, error_handler=None, delta=False,
+            resume=False, hash_handler=None, hash_alg='sha256',
+            progress_details=False):
         """Download remote files
 
            This method downloads one or more files or directories from
@@ -1968,7 +3625,10 @@ class SFTPClient:
            watch out for links that result in loops.
 
            The block_size value controls the size of read and write
-           operations issued to download the files. It defaults to 16 KB.
+           operations issued to download the files. By default, the largest
+           size allowed by the server's limits is used, up to 256 KB.
+           If the server doesn't report its limits, it defaults to 16 KB.
+           Larger values are reduced to fit within the server's limits.
 
            If progress_handler is specified, it will be called after
            each block of a file is successfully downloaded. The arguments
@@ -1978,6 +3638,42 @@ class SFTPClient:
            recurse is set to `True`, the progress_handler will be
            called consecutively on each file being downloaded.
 
+           If progress_details is `True`, the progress_handler will
+           also be passed the number of read and write requests
+           currently allowed to be outstanding and the block size in
+           use. The number of outstanding requests is adjusted during
+           the transfer based on the measured round trip time and
+           throughput.
+
+           If delta is `True` and a file being downloaded already
+           exists locally, only the parts of it which have changed are
+           transferred. The server is asked for checksums of each block
+           of the remote file and the local file is scanned for data
+           matching those blocks, which is then reused rather than being
+           downloaded again. Data which moved to a different offset is
+           also found. This requires a server which supports the
+           block-sums@asyncssh.com extension. Otherwise, or if the local
+           file doesn't exist, the entire file is downloaded.
+
+           If resume is `True` and a partial copy of a file being
+           downloaded already exists at the destination, the transfer
+           picks up where it left off rather than starting over. The
+           destination is kept if it is no larger than the source and
+           its last block matches the data at the same offset in the
+           source. The remaining data is then appended to it. Otherwise,
+           the entire file is downloaded. If delta is also set and the
+           server supports it, delta transfer is used instead.
+
+           If hash_handler is specified, a digest of each file is
+           computed as its data is downloaded, using the hash algorithm
+           named by hash_alg, which defaults to `'sha256'`. Any
+           algorithm supported by :func:`hashlib.new` can be used. Once
+           a file has been downloaded, the handler is called with the
+           source path, destination path, and the digest as `bytes`,
+           so the file doesn't need to be read back to verify it. When a
+           delta transfer is done, the digest is computed from the new
+           local file.
+
            If error_handler is specified and an error occurs during
            the download, this handler will be called with the exception
            instead of it being raised. This is intended to primarily be
@@ -2002,8 +3698,19 @@ class SFTPClient:
                The block size to use for file reads and writes
            :param progress_handler: (optional)
                The function to call to report download progress
+           :param progress_details: (optional)
+               Whether or not to pass request window details to the
+               progress handler
            :param error_handler: (optional)
                The function to call when an error occurs
+           :param delta: (optional)
+               Whether or not to only transfer data which has changed
+           :param resume: (optional)
+               Whether or not to resume partially transferred files
+           :param hash_handler: (optional)
+               The function to call with a digest of each file
+           :param hash_alg: (optional)
+               The hash algorithm to use when computing digests
            :type remotepaths:
                :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`,
                or a sequence of these
@@ -2014,7 +3721,12 @@ class SFTPClient:
            :type follow_symlinks: `bool`
            :type block_size: `int`
            :type progress_handler: `callable`
+           :type progress_details: `bool`
            :type error_handler: `callable`
+           :type delta: `bool`
+           :type resume: `bool`
+           :type hash_handler: `callable`
+           :type hash_alg: `str`
 
            :raises: | :exc:`OSError` if a local file I/O error occurs
                     | :exc:`SFTPError` if the server returns an error
@@ -2027,12 +3739,15 @@ class SFTPClient:
         yield from self._begin_copy(self, LocalFile, remotepaths, localpath,
                                     preserve, recurse, follow_symlinks,
                                     block_size, progress_handler,
-                                    error_handler)
+                                    error_handler, delta, resume,
+                                    hash_handler, hash_alg, progress_details)
 
     @asyncio.coroutine
     def put(self, localpaths, remotepath=None, *, preserve=False,
-            recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-            progress_handler=None, error_handler=None):
+            recurse=False, follow_symlinks=False, block_size=None,
+            progress_handler=None, error_handler=None, delta=False,
+            resume=False, hash_handler=None, hash_alg='sha256',
+            progress_details=False):
         """Upload local files
 
            This method uploads one or more files or directories to the
@@ -2066,7 +3781,10 @@ class SFTPClient:
            watch out for links that result in loops.
 
            The block_size value controls the size of read and write
-           operations issued to upload the files. It defaults to 16 KB.
+           operations issued to upload the files. By default, the largest
+           size allowed by the server's limits is used, up to 256 KB.
+           If the server doesn't report its limits, it defaults to 16 KB.
+           Larger values are reduced to fit within the server's limits.
 
            If progress_handler is specified, it will be called after
            each block of a file is successfully uploaded. The arguments
@@ -2076,6 +3794,44 @@ class SFTPClient:
            recurse is set to `True`, the progress_handler will be
            called consecutively on each file being uploaded.
 
+           If progress_details is `True`, the progress_handler will
+           also be passed the number of read and write requests
+           currently allowed to be outstanding and the block size in
+           use. The number of outstanding requests is adjusted during
+           the transfer based on the measured round trip time and
+           throughput.
+
+           If delta is `True` and a file being uploaded already exists
+           on the remote system, only the parts of it which have changed
+           are transferred. The server is asked for checksums of each
+           block of the existing remote file and the local file is
+           scanned for data matching those blocks, which the server then
+           reuses rather than the data being uploaded again. Data which
+           moved to a different offset is also found, and is copied on
+           the server using the copy-data extension if available. This
+           requires a server which supports the block-sums@asyncssh.com
+           extension. Otherwise, or if the remote file doesn't exist,
+           the entire file is uploaded.
+
+           If resume is `True` and a partial copy of a file being
+           uploaded already exists at the destination, the transfer
+           picks up where it left off rather than starting over. The
+           destination is kept if it is no larger than the source and
+           its last block matches the data at the same offset in the
+           source. The remaining data is then appended to it. Otherwise,
+           the entire file is uploaded. If delta is also set and the
+           server supports it, delta transfer is used instead.
+
+           If hash_handler is specified, a digest of each file is
+           computed as its data is uploaded, using the hash algorithm
+           named by hash_alg, which defaults to `'sha256'`. Any
+           algorithm supported by :func:`hashlib.new` can be used. Once
+           a file has been uploaded, the handler is called with the
+           source path, destination path, and the digest as `bytes`,
+           so the file doesn't need to be read back to verify it. When a
+           delta transfer is done, the digest is computed from the
+           local file.
+
            If error_handler is specified and an error occurs during
            the upload, this handler will be called with the exception
            instead of it being raised. This is intended to primarily be
@@ -2100,8 +3856,19 @@ class SFTPClient:
                The block size to use for file reads and writes
            :param progress_handler: (optional)
                The function to call to report upload progress
+           :param progress_details: (optional)
+               Whether or not to pass request window details to the
+               progress handler
            :param error_handler: (optional)
                The function to call when an error occurs
+           :param delta: (optional)
+               Whether or not to only transfer data which has changed
+           :param resume: (optional)
+               Whether or not to resume partially transferred files
+           :param hash_handler: (optional)
+               The function to call with a digest of each file
+           :param hash_alg: (optional)
+               The hash algorithm to use when computing digests
            :type localpaths:
                :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`,
                or a sequence of these
@@ -2112,7 +3879,12 @@ class SFTPClient:
            :type follow_symlinks: `bool`
            :type block_size: `int`
            :type progress_handler: `callable`
+           :type progress_details: `bool`
            :type error_handler: `callable`
+           :type delta: `bool`
+           :type resume: `bool`
+           :type hash_handler: `callable`
+           :type hash_alg: `str`
 
            :raises: | :exc:`OSError` if a local file I/O error occurs
                     | :exc:`SFTPError` if the server returns an error
@@ -2125,12 +3897,14 @@ class SFTPClient:
         yield from self._begin_copy(LocalFile, self, localpaths, remotepath,
                                     preserve, recurse, follow_symlinks,
                                     block_size, progress_handler,
-                                    error_handler)
+                                    error_handler, delta, resume,
+                                    hash_handler, hash_alg, progress_details)
 
     @asyncio.coroutine
     def copy(self, srcpaths, dstpath=None, *, preserve=False,
-             recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-             progress_handler=None, error_handler=None):
+             recurse=False, follow_symlinks=False, block_size=None,
+             progress_handler=None, error_handler=None, resume=False,
+             hash_handler=None, hash_alg='sha256', progress_details=False):
         """Copy remote files to a new location
 
            This method copies one or more files or directories on the
@@ -2164,7 +3938,17 @@ class SFTPClient:
            watch out for links that result in loops.
 
            The block_size value controls the size of read and write
-           operations issued to copy the files. It defaults to 16 KB.
+           operations issued to copy the files. By default, the largest
+           size allowed by the server's limits is used, up to 256 KB.
+           If the server doesn't report its limits, it defaults to 16 KB.
+           Larger values are reduced to fit within the server's limits.
+
+           If the server supports the copy-data extension, the data
+           in each file is copied by the server itself rather than
+           being read back to the client and written out again. The
+           block_size value then controls the size of the copy requests
+           sent to the server. If the server rejects these requests,
+           the data is copied through the client instead.
 
            If progress_handler is specified, it will be called after
            each block of a file is successfully copied. The arguments
@@ -2174,6 +3958,31 @@ class SFTPClient:
            recurse is set to `True`, the progress_handler will be
            called consecutively on each file being copied.
 
+           If progress_details is `True`, the progress_handler will
+           also be passed the number of read and write requests
+           currently allowed to be outstanding and the block size in
+           use. The number of outstanding requests is adjusted during
+           the transfer based on the measured round trip time and
+           throughput.
+
+           If resume is `True` and a partial copy of a file being
+           copied already exists at the destination, the transfer
+           picks up where it left off rather than starting over. The
+           destination is kept if it is no larger than the source and
+           its last block matches the data at the same offset in the
+           source. The remaining data is then appended to it. Otherwise,
+           the entire file is copied.
+
+           If hash_handler is specified, a digest of each file is
+           computed as its data is copied, using the hash algorithm
+           named by hash_alg, which defaults to `'sha256'`. Any
+           algorithm supported by :func:`hashlib.new` can be used. Once
+           a file has been copied, the handler is called with the
+           source path, destination path, and the digest as `bytes`,
+           so the file doesn't need to be read back to verify it. File data
+           is copied through the client rather than by the server when
+           a hash is requested.
+
            If error_handler is specified and an error occurs during
            the copy, this handler will be called with the exception
            instead of it being raised. This is intended to primarily be
@@ -2198,8 +4007,17 @@ class SFTPClient:
                The block size to use for file reads and writes
            :param progress_handler: (optional)
                The function to call to report copy progress
+           :param progress_details: (optional)
+               Whether or not to pass request window details to the
+               progress handler
            :param error_handler: (optional)
                The function to call when an error occurs
+           :param resume: (optional)
+               Whether or not to resume partially copied files
+           :param hash_handler: (optional)
+               The function to call with a digest of each file
+           :param hash_alg: (optional)
+               The hash algorithm to use when computing digests
            :type srcpaths:
                :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`,
                or a sequence of these
@@ -2210,7 +4028,11 @@ class SFTPClient:
            :type follow_symlinks: `bool`
            :type block_size: `int`
            :type progress_handler: `callable`
+           :type progress_details: `bool`
            :type error_handler: `callable`
+           :type resume: `bool`
+           :type hash_handler: `callable`
+           :type hash_alg: `str`
 
            :raises: | :exc:`OSError` if a local file I/O error occurs
                     | :exc:`SFTPError` if the server returns an error
@@ -2222,12 +4044,17 @@ class SFTPClient:
 
         yield from self._begin_copy(self, self, srcpaths, dstpath, preserve,
                                     recurse, follow_symlinks, block_size,
-                                    progress_handler, error_handler)
+                                    progress_handler, error_handler,
+                                    resume=resume, hash_handler=hash_handler,
+                                    hash_alg=hash_alg,
+                                    progress_details=progress_details)
 
     @asyncio.coroutine
     def mget(self, remotepaths, localpath=None, *, preserve=False,
-             recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-             progress_handler=None, error_handler=None):
+             recurse=False, follow_symlinks=False, block_size=None,
+             progress_handler=None, error_handler=None, delta=False,
+             resume=False, hash_handler=None, hash_alg='sha256',
+             progress_details=False):
         """Download remote files with glob pattern match
 
            This method downloads files and directories from the remote
@@ -2247,12 +4074,15 @@ class SFTPClient:
         yield from self._begin_copy(self, LocalFile, matches, localpath,
                                     preserve, recurse, follow_symlinks,
                                     block_size, progress_handler,
-                                    error_handler)
+                                    error_handler, delta, resume,
+                                    hash_handler, hash_alg, progress_details)
 
     @asyncio.coroutine
     def mput(self, localpaths, remotepath=None, *, preserve=False,
-             recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-             progress_handler=None, error_handler=None):
+             recurse=False, follow_symlinks=False, block_size=None,
+             progress_handler=None, error_handler=None, delta=False,
+             resume=False, hash_handler=None, hash_alg='sha256',
+             progress_details=False):
         """Upload local files with glob pattern match
 
            This method uploads files and directories to the remote
@@ -2272,12 +4102,14 @@ class SFTPClient:
         yield from self._begin_copy(LocalFile, self, matches, remotepath,
                                     preserve, recurse, follow_symlinks,
                                     block_size, progress_handler,
-                                    error_handler)
+                                    error_handler, delta, resume,
+                                    hash_handler, hash_alg, progress_details)
 
     @asyncio.coroutine
     def mcopy(self, srcpaths, dstpath=None, *, preserve=False,
-              recurse=False, follow_symlinks=False, block_size=SFTP_BLOCK_SIZE,
-              progress_handler=None, error_handler=None):
+              recurse=False, follow_symlinks=False, block_size=None,
+              progress_handler=None, error_handler=None, resume=False,
+              hash_handler=None, hash_alg='sha256', progress_details=False):
         """Download remote files with glob pattern match
 
            This method copies files and directories on the remote
@@ -2296,7 +4128,10 @@ class SFTPClient:
 
         yield from self._begin_copy(self, self, matches, dstpath, preserve,
                                     recurse, follow_symlinks, block_size,
-                                    progress_handler, error_handler)
+                                    progress_handler, error_handler,
+                                    resume=resume, hash_handler=hash_handler,
+                                    hash_alg=hash_alg,
+                                    progress_details=progress_details)
 
     @asyncio.coroutine
     def glob(self, patterns, error_handler=None):
@@ -2345,7 +4180,8 @@ class SFTPClient:
 
     @async_context_manager
     def open(self, path, pflags_or_mode=FXF_READ, attrs=SFTPAttrs(),
-             encoding='utf-8', errors='strict'):
+             encoding='utf-8', errors='strict', block_size=None,
+             max_requests=_MAX_SFTP_REQUESTS):
         """Open a remote file
 
            This method opens a remote file and returns an
@@ -2404,6 +4240,17 @@ class SFTPClient:
            file if it needs to be created. Otherwise, this argument is
            ignored.
 
+           If block_size is specified, reads and writes on the file are
+           buffered. Sequential reads are served from read requests of
+           this size issued ahead of the current position, and writes
+           are coalesced into write requests of this size which are
+           sent without waiting for earlier writes to complete. The
+           max_requests value limits how many of these requests can
+           be outstanding at once. Buffered writes are flushed when
+           the file is closed or synced. Files opened for writing with
+           a block size must be closed with :meth:`close()
+           <SFTPClientFile.close>` or used as an async context manager.
+
            :param path:
                The name of the remote file to open
            :param pflags_or_mode: (optional)
@@ -2417,11 +4264,18 @@ class SFTPClient:
                The error-handling mode if an invalid Unicode byte
                sequence is detected, defaulting to 'strict' which
                raises an exception
+           :param block_size: (optional)
+               The block size to use for buffered reads and writes
+           :param max_requests: (optional)
+               The maximum number of buffered read or write requests
+               to have outstanding at once
            :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
            :type pflags_or_mode: `int` or `str`
            :type attrs: :class:`SFTPAttrs`
            :type encoding: `str`
            :type errors: `str`
+           :type block_size: `int`
+           :type max_requests: `int`
 
            :returns: An :class:`SFTPClientFile` to use to access the file
 
@@ -2441,8 +4295,10 @@ class SFTPClient:
         path = self.compose_path(path)
         handle = yield from self._handler.open(path, pflags, attrs)
 
-        return SFTPClientFile(self._handler, handle, pflags & FXF_APPEND,
-                              encoding, errors)
+        return SFTPClientFile(self._loop, self._handler, handle,
+                              pflags & FXF_APPEND, encoding, errors,
+                              block_size, max_requests,
+                              bool(pflags & (FXF_WRITE | FXF_APPEND)))
 
     @asyncio.coroutine
     def stat(self, path):
@@ -2513,6 +4369,67 @@ class SFTPClient:
         path = self.compose_path(path)
         yield from self._handler.setstat(path, attrs)
 
+    @asyncio.coroutine
+    def bulk(self, operation, items):
+        """Perform the same operation on multiple remote paths
+
+           This method gets attributes of, sets attributes on, or
+           removes a list of remote files or directories. If the server
+           supports the matching AsyncSSH stat-many@asyncssh.com,
+           setstat-many@asyncssh.com, or remove-many@asyncssh.com
+           extension, many paths are sent in each request. Otherwise,
+           a pipelined request is sent for each path.
+
+           The following operations are supported:
+
+             ========= ======================================= ===========
+             Operation Items                                   Result
+             ========= ======================================= ===========
+             stat      Paths to get attributes of, following   SFTPAttrs
+                       symbolic links
+             lstat     Paths to get attributes of, without     SFTPAttrs
+                       following symbolic links
+             setstat   Pairs of a path and the SFTPAttrs to    `None`
+                       set on it
+             remove    Paths of files or symbolic links to     `None`
+                       remove
+             ========= ======================================= ===========
+
+           Unlike the single-path methods such as :meth:`stat`, errors
+           for individual paths don't raise an exception. Instead, the
+           :exc:`SFTPError` for that path is returned in place of its
+           result.
+
+           :param operation:
+               The operation to perform
+           :param items:
+               The paths, or path and attribute pairs, to operate on
+           :type operation: `str`
+           :type items: `list`
+
+           :returns: A `list` containing the result or an
+                     :exc:`SFTPError` for each item
+
+           :raises: | :exc:`ValueError` if the operation is not supported
+                    | :exc:`SFTPError` if the server returns an error
+                      for the request as a whole
+
+        """
+
+        if operation in ('stat', 'lstat'):
+            paths = [self.compose_path(path) for path in items]
+            follow_symlinks = operation == 'stat'
+            return (yield from self._handler.stat_many(paths, follow_symlinks))
+        elif operation == 'setstat':
+            items = [(self.compose_path(path), attrs)
+                     for path, attrs in items]
+            return (yield from self._handler.setstat_many(items))
+        elif operation == 'remove':
+            paths = [self.compose_path(path) for path in items]
+            return (yield from self._handler.remove_many(paths))
+        else:
+            raise ValueError('Unsupported bulk operation: %r' % operation)
+
     @asyncio.coroutine
     def statvfs(self, path):
         """Get attributes of a remote file system
@@ -2535,6 +4452,50 @@ class SFTPClient:
         path = self.compose_path(path)
         return (yield from self._handler.statvfs(path))
 
+    @asyncio.coroutine
+    def check_file(self, path, hash_algs='sha256', offset=0, length=0,
+                   block_size=0):
+        """Get hashes of a remote file computed by the server
+
+           This method asks the server to hash the contents of a remote
+           file, using the check-file extension. This allows a remote
+           file to be compared against a local copy without transferring
+           the file data. If a block size is specified, a separate hash
+           is returned for each block of that size in the range being
+           hashed. Otherwise, a single hash of the whole range is returned.
+
+           :param path:
+               The path of the remote file to hash
+           :param hash_algs: (optional)
+               The name of the hash algorithm to use, or a list of
+               algorithm names in order of preference
+           :param offset: (optional)
+               The offset in the file to start hashing at
+           :param length: (optional)
+               The number of bytes to hash, or 0 to hash until the end
+               of the file
+           :param block_size: (optional)
+               The size of the blocks to hash separately, or 0 to
+               return a single hash, which must be at least 256
+               if specified
+           :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
+           :type hash_algs: `str` or `list` of `str`
+           :type offset: `int`
+           :type length: `int`
+           :type block_size: `int`
+
+           :returns: A tuple of the name of the hash algorithm chosen
+                     by the server and a `list` of `bytes` hash values
+
+           :raises: :exc:`SFTPError` if the server doesn't support this
+                    extension or returns an error
+
+        """
+
+        path = self.compose_path(path)
+        return (yield from self._handler.check_file_name(
+            path, _encode_hash_algs(hash_algs), offset, length, block_size))
+
     @asyncio.coroutine
     def truncate(self, path, size):
         """Truncate a remote file to the specified size
@@ -2832,6 +4793,10 @@ class SFTPClient:
            path is provided, it defaults to the current remote working
            directory.
 
+           If attribute caching is enabled, the attributes returned
+           are also added to the cache, allowing later calls to get
+           attributes of these names to avoid a request to the server.
+
            :param path: (optional)
                The path of the remote directory to read
            :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
@@ -2843,24 +4808,44 @@ class SFTPClient:
 
         """
 
-        names = []
-
         dirpath = self.compose_path(path)
-        handle = yield from self._handler.opendir(dirpath)
+        cache = self._handler.cache
+        names = cache.get('readdir', dirpath) if cache else None
 
-        try:
-            while True:
-                names.extend((yield from self._handler.readdir(handle)))
-        except SFTPError as exc:
-            if exc.code != FX_EOF:
-                raise
-        finally:
-            yield from self._handler.close(handle)
+        if names is None:
+            names = []
+            handle = yield from self._handler.opendir(dirpath)
+
+            try:
+                while True:
+                    names.extend((yield from self._handler.readdir(handle)))
+            except SFTPError as exc:
+                if exc.code != FX_EOF:
+                    raise
+            finally:
+                yield from self._handler.close(handle)
+
+            if cache:
+                cache.set('readdir', dirpath, names)
+
+                for name in names:
+                    permissions = name.attrs.permissions
+
+                    if permissions is not None and \
+                            name.filename not in (b'.', b'..'):
+                        namepath = name.filename if dirpath == b'.' else \
+                            posixpath.join(dirpath, name.filename)
+                        cache.set('lstat', namepath, name.attrs)
+
+                        if not stat.S_ISLNK(permissions):
+                            cache.set('stat', namepath, name.attrs)
 
         if isinstance(path, str):
-            for name in names:
-                name.filename = self.decode(name.filename)
-                name.longname = self.decode(name.longname)
+            names = [SFTPName(self.decode(name.filename),
+                              self.decode(name.longname), name.attrs)
+                     for name in names]
+        else:
+            names = list(names)
 
         return names
 
@@ -2896,34 +4881,174 @@ class SFTPClient:
            :param path:
                The path of where the new remote directory should be created
            :param attrs: (optional)
-               The file attributes to use when creating the directory
+               The file attributes to use when creating the directory
+           :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
+           :type attrs: :class:`SFTPAttrs`
+
+           :raises: :exc:`SFTPError` if the server returns an error
+
+        """
+
+        path = self.compose_path(path)
+        yield from self._handler.mkdir(path, attrs)
+
+    @asyncio.coroutine
+    def rmdir(self, path):
+        """Remove a remote directory
+
+           This method removes a remote directory. The directory
+           must be empty for the removal to succeed.
+
+           :param path:
+               The path of the remote directory to remove
+           :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
+
+           :raises: :exc:`SFTPError` if the server returns an error
+
+        """
+
+        path = self.compose_path(path)
+        yield from self._handler.rmdir(path)
+
+    @asyncio.coroutine
+    def makedirs(self, path, attrs=SFTPAttrs(), exist_ok=False):
+        """Create a remote directory, including any missing parents
+
+           This method creates a remote directory at the specified
+           path, along with any parent directories which don't exist
+           yet. The attributes provided are used for every directory
+           created. Rather than checking each parent one at a time,
+           all of them are checked at once, as with :meth:`bulk`.
+
+           If the directory already exists, an error is returned unless
+           exist_ok is set to `True`. An error is always returned if
+           the path or one of its parents exists but isn't a directory.
+
+           :param path:
+               The path of the remote directory to create
+           :param attrs: (optional)
+               The file attributes to use when creating the directories
+           :param exist_ok: (optional)
+               Whether or not to succeed if the directory already exists
            :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
            :type attrs: :class:`SFTPAttrs`
+           :type exist_ok: `bool`
 
            :raises: :exc:`SFTPError` if the server returns an error
 
         """
 
         path = self.compose_path(path)
-        yield from self._handler.mkdir(path, attrs)
-
-    @asyncio.coroutine
-    def rmdir(self, path):
-        """Remove a remote directory
+        curpath = b'/' if path.startswith(b'/') else b''
+        prefixes = []
+
+        for part in path.split(b'/'):
+            if part:
+                curpath = posixpath.join(curpath, part)
+                prefixes.append(curpath)
+
+        results = yield from self._handler.stat_many(prefixes, True)
+        created = False
+
+        for prefix, result in zip(prefixes, results):
+            if isinstance(result, SFTPError):
+                try:
+                    yield from self._handler.mkdir(prefix, attrs)
+                except SFTPError:
+                    # Allow for the directory being created concurrently
+                    if not (yield from self.isdir(prefix)):
+                        raise
+                else:
+                    created = True
+            elif not stat.S_ISDIR(result.permissions):
+                raise SFTPError(FX_FAILURE, '%s is not a directory' %
+                                prefix.decode('utf-8', errors='replace'))
+
+        if not created and not exist_ok:
+            raise SFTPError(FX_FAILURE, '%s already exists' %
+                            path.decode('utf-8', errors='replace'))
+
+    @asyncio.coroutine
+    def rmtree(self, path, error_handler=None):
+        """Recursively delete a remote directory tree
+
+           This method removes all of the files and subdirectories in
+           a remote directory, and then the directory itself. Symbolic
+           links inside the tree are removed rather than followed, and
+           an error is returned if the path itself is a symbolic link.
+
+           The attributes returned by :meth:`readdir` are used to tell
+           subdirectories apart from other names. Subdirectories are
+           processed in parallel, and the files in each directory are
+           removed together, as with :meth:`bulk`, with up to 32
+           requests outstanding at a time. Each directory is removed
+           once everything inside it has been removed.
 
-           This method removes a remote directory. The directory
-           must be empty for the removal to succeed.
+           If error_handler is specified and an error occurs during
+           the removal, this handler will be called with the exception
+           instead of it being raised. The error handler can raise an
+           exception if it wants the removal to completely stop.
+           Otherwise, after an error, the removal will continue with
+           the rest of the tree.
 
            :param path:
-               The path of the remote directory to remove
+               The path of the remote directory tree to remove
+           :param error_handler: (optional)
+               The function to call when an error occurs
            :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
+           :type error_handler: `callable`
 
            :raises: :exc:`SFTPError` if the server returns an error
 
         """
 
         path = self.compose_path(path)
-        yield from self._handler.rmdir(path)
+
+        # Cached listings may be missing names added since they were
+        # read, which would cause removing the directories to fail
+        self._handler.clear_cache(path)
+
+        try:
+            attrs = yield from self._handler.lstat(path)
+        except SFTPError as exc:
+            if error_handler:
+                error_handler(exc)
+                return
+            else:
+                raise
+
+        if stat.S_ISLNK(attrs.permissions):
+            exc = SFTPError(FX_FAILURE,
+                            'Cannot remove a symbolic link as a tree')
+
+            if error_handler:
+                error_handler(exc)
+                return
+            else:
+                raise exc
+
+        sem = asyncio.Semaphore(_MAX_RMTREE_REQUESTS, loop=self._loop)
+        yield from self._rmtree(path, sem, error_handler)
+
+    def clear_cache(self, path=None):
+        """Clear cached file attributes and directory listings
+
+           This method removes entries from the attribute and directory
+           listing cache, if one is enabled. If a path is specified,
+           only entries for that path, its parent directory, and any
+           paths below it are removed. Otherwise, the entire cache is
+           cleared.
+
+           :param path: (optional)
+               The remote path to remove cached entries for
+           :type path: :class:`PurePath <pathlib.PurePath>`, `str`, or `bytes`
+
+        """
+
+        if path is not None:
+            path = self.compose_path(path)
+
+        self._handler.clear_cache(path)
 
     @asyncio.coroutine
     def realpath(self, path):
@@ -3081,7 +5206,15 @@ class SFTPServerHandler(SFTPHandler):
 
     _extensions = [(b'posix-rename@openssh.com', b'1'),
                    (b'hardlink@openssh.com', b'1'),
-                   (b'fsync@openssh.com', b'1')]
+                   (b'fsync@openssh.com', b'1'),
+                   (b'copy-data', b'1'),
+                   (b'check-file-handle', b'1'),
+                   (b'check-file-name', b'1'),
+                   (b'block-sums@asyncssh.com', b'1'),
+                   (b'limits@openssh.com', b'1'),
+                   (b'stat-many@asyncssh.com', b'1'),
+                   (b'remove-many@asyncssh.com', b'1'),
+                   (b'setstat-many@asyncssh.com', b'1')]
 
     if hasattr(os, 'statvfs'): # pragma: no branch
         _extensions += [(b'statvfs@openssh.com', b'2'),
@@ -3096,12 +5229,22 @@ class SFTPServerHandler(SFTPHandler):
         self._next_handle = 0
         self._file_handles = {}
         self._dir_handles = {}
+        self._loop = reader.channel.get_loop()
+        self._write_handle = None
+        self._write_fd = None
+        self._write_offset = 0
+        self._write_len = 0
+        self._write_pktids = []
+        self._write_data = []
+        self._write_flusher = None
 
     @asyncio.coroutine
     def _cleanup(self, exc):
         """Clean up this SFTP server session"""
 
         if self._server: # pragma: no branch
+            self._try_flush_writes()
+
             for file_obj in self._file_handles.values():
                 result = self._server.close(file_obj)
 
@@ -3121,6 +5264,134 @@ class SFTPServerHandler(SFTPHandler):
 
         yield from super()._cleanup(exc)
 
+    def _queue_write(self, pktid, packet):
+        """Queue a write to be merged with adjacent writes on its handle
+
+           Writes are only queued when the SFTP server uses the default
+           write method on a local file which supports positional I/O.
+           Writes to consecutive offsets in the same handle are merged
+           into a single vectored write. The merged write is performed
+           and its status replies are sent before any other request is
+           processed, or as soon as no more requests are available.
+
+           This method returns whether the write was queued. If not,
+           the packet is left unconsumed so it can be processed normally.
+
+        """
+
+        if not _vectored_io or type(self._server).write is not SFTPServer.write:
+            return False
+
+        try:
+            packet = SSHPacket(packet.get_remaining_payload())
+            handle = packet.get_string()
+            offset = packet.get_uint64()
+            data = packet.get_string()
+            packet.check_end()
+        except PacketDecodeError:
+            return False
+
+        file_obj = self._file_handles.get(handle)
+        file_fd = _get_fd(file_obj) if file_obj else None
+
+        if file_fd is None:
+            return False
+
+        if self._write_pktids and \
+                (handle != self._write_handle or
+                 offset != self._write_offset + self._write_len or
+                 len(self._write_pktids) >= _MAX_MERGED_WRITES):
+            self._flush_writes()
+
+        self.logger.debug1('Received write for %s at offset %d in handle %s',
+                           plural(len(data), 'byte'), offset, to_hex(handle))
+
+        if not self._write_pktids:
+            self._write_handle = handle
+            self._write_fd = file_fd
+            self._write_offset = offset
+            self._write_len = 0
+
+        self._write_pktids.append(pktid)
+        self._write_data.append(data)
+        self._write_len += len(data)
+
+        if self._write_len >= _MAX_MERGED_WRITE_LEN:
+            self._flush_writes()
+        elif not self._write_flusher:
+            self._write_flusher = self._loop.call_soon(self._try_flush_writes)
+
+        return True
+
+    def _flush_writes(self):
+        """Perform queued writes and send status replies for them"""
+
+        if self._write_flusher:
+            self._write_flusher.cancel()
+            self._write_flusher = None
+
+        pktids = self._write_pktids
+
+        if not pktids:
+            return
+
+        buffers = self._write_data
+        self._write_pktids = []
+        self._write_data = []
+
+        self.logger.debug2('Writing %s at offset %d in handle %s from %s',
+                           plural(self._write_len, 'byte'), self._write_offset,
+                           to_hex(self._write_handle),
+                           plural(len(pktids), 'request'))
+
+        try:
+            _write_vectored_at(self._write_fd, buffers, self._write_offset)
+        except OSError as exc:
+            result = self._encode_os_error(exc)
+        else:
+            self.logger.debug1('Sending OK for %s',
+                               plural(len(pktids), 'write'))
+
+            result = UInt32(FX_OK) + String('') + String('')
+
+        for pktid in pktids:
+            self.send_packet(FXP_STATUS, pktid, UInt32(pktid), result)
+
+    def _try_flush_writes(self):
+        """Flush queued writes, ignoring a lost connection
+
+           If the connection is lost, the receive loop will see this
+           and clean up the session, so there's nothing more to do here.
+
+        """
+
+        self._write_flusher = None
+
+        try:
+            self._flush_writes()
+        except SFTPError:
+            pass
+
+    def _encode_os_error(self, exc):
+        """Return an SFTP status reply for a local OS error"""
+
+        reason = exc.strerror or str(exc)
+
+        if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+            self.logger.debug1('Sending no such file error: %s', reason)
+
+            code = FX_NO_SUCH_FILE
+        elif exc.errno == errno.EACCES:
+            self.logger.debug1('Sending permission denied: %s', reason)
+
+            code = FX_PERMISSION_DENIED
+        else:
+            self.logger.debug1('Sending failure: %s', reason)
+
+            code = FX_FAILURE
+
+        return UInt32(code) + String(reason) + String(DEFAULT_LANG)
+
     def _get_next_handle(self):
         """Get the next available unique file handle number"""
 
@@ -3136,6 +5407,11 @@ class SFTPServerHandler(SFTPHandler):
     def _process_packet(self, pkttype, pktid, packet):
         """Process incoming SFTP requests"""
 
+        if pkttype == FXP_WRITE and self._queue_write(pktid, packet):
+            return
+
+        self._flush_writes()
+
         # pylint: disable=broad-except
         try:
             if pkttype == FXP_EXTENDED:
@@ -3170,6 +5446,9 @@ class SFTPServerHandler(SFTPHandler):
 
                 result = (UInt32(len(result)) +
                           b''.join(name.encode() for name in result))
+            elif isinstance(result, bytes):
+                # Extended replies which were encoded by their handler
+                pass
             else:
                 if isinstance(result, os.stat_result):
                     result = SFTPAttrs.from_local(result)
@@ -3178,7 +5457,9 @@ class SFTPServerHandler(SFTPHandler):
 
                 if isinstance(result, SFTPAttrs):
                     self.logger.debug1('Sending %s', result)
-                elif isinstance(result, SFTPVFSAttrs): # pragma: no branch
+                elif isinstance(result, SFTPVFSAttrs):
+                    self.logger.debug1('Sending %s', result)
+                elif isinstance(result, SFTPLimits): # pragma: no branch
                     self.logger.debug1('Sending %s', result)
 
                 result = result.encode()
@@ -3206,22 +5487,7 @@ class SFTPServerHandler(SFTPHandler):
                       String(DEFAULT_LANG))
         except OSError as exc:
             return_type = FXP_STATUS
-            reason = exc.strerror or str(exc)
-
-            if exc.errno in (errno.ENOENT, errno.ENOTDIR):
-                self.logger.debug1('Sending no such file error: %s', reason)
-
-                code = FX_NO_SUCH_FILE
-            elif exc.errno == errno.EACCES:
-                self.logger.debug1('Sending permission denied: %s', reason)
-
-                code = FX_PERMISSION_DENIED
-            else:
-                self.logger.debug1('Sending failure: %s', reason)
-
-                code = FX_FAILURE
-
-            result = UInt32(code) + String(reason) + String(DEFAULT_LANG)
+            result = self._encode_os_error(exc)
         except Exception as exc: # pragma: no cover
             return_type = FXP_STATUS
             reason = 'Uncaught exception: %s' % str(exc)
@@ -3288,6 +5554,10 @@ class SFTPServerHandler(SFTPHandler):
         self.logger.debug1('Received read for %s at offset %d in handle %s',
                            plural(length, 'byte'), offset, to_hex(handle))
 
+        # Return a short read rather than a response larger than the
+        # read limit reported to the client
+        length = min(length, _MAX_SFTP_READ_LEN)
+
         file_obj = self._file_handles.get(handle)
 
         if file_obj:
@@ -3697,6 +5967,345 @@ class SFTPServerHandler(SFTPHandler):
         else:
             raise SFTPError(FX_FAILURE, 'Invalid file handle')
 
+    @asyncio.coroutine
+    def _process_copy_data(self, packet):
+        """Process an incoming SFTP copy data request"""
+
+        read_handle = packet.get_string()
+        read_offset = packet.get_uint64()
+        read_length = packet.get_uint64()
+        write_handle = packet.get_string()
+        write_offset = packet.get_uint64()
+        packet.check_end()
+
+        self.logger.debug1('Received copy-data from handle %s, '
+                           'offset %d, length %d to handle %s, '
+                           'offset %d', to_hex(read_handle), read_offset,
+                           read_length, to_hex(write_handle), write_offset)
+
+        src = self._file_handles.get(read_handle)
+        dst = self._file_handles.get(write_handle)
+
+        if not src or not dst:
+            raise SFTPError(FX_FAILURE, 'Invalid file handle')
+
+        if read_handle == write_handle and \
+                (not read_length or
+                 (read_offset < write_offset + read_length and
+                  write_offset < read_offset + read_length)):
+            raise SFTPError(FX_FAILURE, 'Overlapping copy not supported')
+
+        copy_to_eof = not read_length
+
+        while copy_to_eof or read_length:
+            size = _COPY_DATA_BLOCK_SIZE
+
+            if not copy_to_eof:
+                size = min(size, read_length)
+
+            data = self._server.read(src, read_offset, size)
+
+            if asyncio.iscoroutine(data):
+                data = yield from data
+
+            if not data:
+                break
+
+            result = self._server.write(dst, write_offset, data)
+
+            if asyncio.iscoroutine(result):
+                yield from result
+
+            read_offset += len(data)
+            write_offset += len(data)
+
+            if not copy_to_eof:
+                read_length -= len(data)
+
+            # Copies have no length limit, so give other sessions a
+            # chance to run between blocks
+            yield from asyncio.sleep(0, loop=self._loop)
+
+    @asyncio.coroutine
+    def _check_file(self, file_obj, hash_algs, offset, length, block_size):
+        """Hash a range of an open file for a check-file request"""
+
+        alg = next((alg for alg in hash_algs.split(b',')
+                    if alg in _check_file_algs), None)
+
+        if alg is None:
+            raise SFTPError(FX_OP_UNSUPPORTED, 'No supported hash algorithm')
+
+        if block_size and block_size < _MIN_CHECK_FILE_BLOCK_SIZE:
+            raise SFTPError(FX_FAILURE, 'Invalid block size')
+
+        hash_name = alg.decode('ascii')
+        hash_obj = hashlib.new(hash_name)
+        hash_to_eof = not length
+        hashed = 0
+        hashes = []
+
+        while hash_to_eof or length:
+            size = SFTP_BLOCK_SIZE
+
+            if block_size:
+                size = min(size, block_size - hashed)
+
+            if not hash_to_eof:
+                size = min(size, length)
+
+            data = self._server.read(file_obj, offset, size)
+
+            if asyncio.iscoroutine(data):
+                data = yield from data
+
+            if not data:
+                break
+
+            hash_obj.update(data)
+            hashed += len(data)
+            offset += len(data)
+
+            if not hash_to_eof:
+                length -= len(data)
+
+            if hashed == block_size:
+                hashes.append(hash_obj.digest())
+                hash_obj = hashlib.new(hash_name)
+                hashed = 0
+
+            # Hashed ranges have no length limit, so give other sessions
+            # a chance to run between blocks
+            yield from asyncio.sleep(0, loop=self._loop)
+
+        if hashed or not block_size:
+            hashes.append(hash_obj.digest())
+
+        self.logger.debug1('Sending %s using %s',
+                           plural(len(hashes), 'hash', 'es'), hash_name)
+
+        return String(b'check-file') + String(alg) + b''.join(hashes)
+
+    @asyncio.coroutine
+    def _process_check_file_handle(self, packet):
+        """Process an incoming SFTP check file handle request"""
+
+        handle = packet.get_string()
+        hash_algs = packet.get_string()
+        offset = packet.get_uint64()
+        length = packet.get_uint64()
+        block_size = packet.get_uint32()
+        packet.check_end()
+
+        self.logger.debug1('Received check-file-handle for handle %s, '
+                           'algs %s', to_hex(handle), hash_algs)
+
+        file_obj = self._file_handles.get(handle)
+
+        if file_obj:
+            return (yield from self._check_file(file_obj, hash_algs, offset,
+                                                length, block_size))
+        else:
+            raise SFTPError(FX_FAILURE, 'Invalid file handle')
+
+    @asyncio.coroutine
+    def _process_check_file_name(self, packet):
+        """Process an incoming SFTP check file name request"""
+
+        path = packet.get_string()
+        hash_algs = packet.get_string()
+        offset = packet.get_uint64()
+        length = packet.get_uint64()
+        block_size = packet.get_uint32()
+        packet.check_end()
+
+        self.logger.debug1('Received check-file-name for %s, algs %s',
+                           path, hash_algs)
+
+        file_obj = self._server.open(path, FXF_READ, SFTPAttrs())
+
+        if asyncio.iscoroutine(file_obj):
+            file_obj = yield from file_obj
+
+        try:
+            return (yield from self._check_file(file_obj, hash_algs, offset,
+                                                length, block_size))
+        finally:
+            result = self._server.close(file_obj)
+
+            if asyncio.iscoroutine(result):
+                yield from result
+
+    @asyncio.coroutine
+    def _process_limits(self, packet):
+        """Process an incoming SFTP limits request"""
+
+        # pylint: disable=no-self-use
+
+        packet.check_end()
+
+        self.logger.debug1('Received limits request')
+
+        return SFTPLimits(_MAX_SFTP_PACKET_LEN, _MAX_SFTP_READ_LEN,
+                          _MAX_SFTP_WRITE_LEN, 0)
+
+    @asyncio.coroutine
+    def _process_block_sums(self, packet):
+        """Process an incoming SFTP block checksums request"""
+
+        path = packet.get_string()
+        offset = packet.get_uint64()
+        length = packet.get_uint64()
+        block_size = packet.get_uint32()
+        packet.check_end()
+
+        self.logger.debug1('Received block-sums for %s, offset %d, '
+                           'length %d, block size %d', path, offset,
+                           length, block_size)
+
+        if not _MIN_CHECK_FILE_BLOCK_SIZE <= block_size <= \
+                _MAX_BLOCK_SUMS_LEN:
+            raise SFTPError(FX_FAILURE, 'Invalid block size')
+
+        # Limit how much is read and hashed for a single request, so
+        # that it can't tie up the server indefinitely
+        max_length = _MAX_BLOCK_SUMS_LEN - _MAX_BLOCK_SUMS_LEN % block_size
+
+        if not length or length > max_length:
+            length = max_length
+
+        file_obj = self._server.open(path, FXF_READ, SFTPAttrs())
+
+        if asyncio.iscoroutine(file_obj):
+            file_obj = yield from file_obj
+
+        try:
+            blocks = []
+
+            while length:
+                size = min(block_size, length)
+                block = b''
+
+                while len(block) < size:
+                    data = self._server.read(file_obj, offset + len(block),
+                                             size - len(block))
+
+                    if asyncio.iscoroutine(data):
+                        data = yield from data
+
+                    if not data:
+                        break
+
+                    block += data
+
+                if not block:
+                    break
+
+                blocks.append(block)
+                offset += len(block)
+                length -= len(block)
+
+                if len(block) < size:
+                    break
+
+                yield from asyncio.sleep(0, loop=self._loop)
+        finally:
+            result = self._server.close(file_obj)
+
+            if asyncio.iscoroutine(result):
+                yield from result
+
+        self.logger.debug1('Sending %s', plural(len(blocks), 'block checksum'))
+
+        return (yield from self._loop.run_in_executor(
+            None, _encode_block_sums, blocks))
+
+    @asyncio.coroutine
+    def _run_bulk_item(self, method, *args):
+        """Call an SFTP server method for one item of a batched request
+
+           The encoded result is returned after an FX_OK status code,
+           or an error status is returned if the method raises an
+           exception.
+
+        """
+
+        try:
+            result = method(*args)
+
+            if asyncio.iscoroutine(result):
+                result = yield from result
+        except SFTPError as exc:
+            return UInt32(exc.code) + String(exc.reason) + String(exc.lang)
+        except NotImplementedError:
+            return (UInt32(FX_OP_UNSUPPORTED) +
+                    String('Operation not supported: %s' % method.__name__) +
+                    String(DEFAULT_LANG))
+        except OSError as exc:
+            return self._encode_os_error(exc)
+
+        if isinstance(result, os.stat_result):
+            result = SFTPAttrs.from_local(result)
+
+        return UInt32(FX_OK) + (result.encode() if result else b'')
+
+    @asyncio.coroutine
+    def _process_stat_many(self, packet):
+        """Process an incoming SFTP stat-many request"""
+
+        follow_symlinks = packet.get_boolean()
+        paths = [packet.get_string() for _ in range(packet.get_uint32())]
+        packet.check_end()
+
+        self.logger.debug1('Received %s-many for %s',
+                           'stat' if follow_symlinks else 'lstat',
+                           plural(len(paths), 'path'))
+
+        method = self._server.stat if follow_symlinks else self._server.lstat
+        results = [UInt32(len(paths))]
+
+        for path in paths:
+            results.append((yield from self._run_bulk_item(method, path)))
+
+        return b''.join(results)
+
+    @asyncio.coroutine
+    def _process_remove_many(self, packet):
+        """Process an incoming SFTP remove-many request"""
+
+        paths = [packet.get_string() for _ in range(packet.get_uint32())]
+        packet.check_end()
+
+        self.logger.debug1('Received remove-many for %s',
+                           plural(len(paths), 'path'))
+
+        results = [UInt32(len(paths))]
+
+        for path in paths:
+            results.append((yield from self._run_bulk_item(self._server.remove,
+                                                           path)))
+
+        return b''.join(results)
+
+    @asyncio.coroutine
+    def _process_setstat_many(self, packet):
+        """Process an incoming SFTP setstat-many request"""
+
+        items = [(packet.get_string(), SFTPAttrs.decode(packet))
+                 for _ in range(packet.get_uint32())]
+        packet.check_end()
+
+        self.logger.debug1('Received setstat-many for %s',
+                           plural(len(items), 'path'))
+
+        results = [UInt32(len(items))]
+
+        for path, attrs in items:
+            results.append((yield from self._run_bulk_item(
+                self._server.setstat, path, attrs)))
+
+        return b''.join(results)
+
     _packet_handlers = {
         FXP_OPEN:                     _process_open,
         FXP_CLOSE:                    _process_close,
@@ -3720,7 +6329,15 @@ class SFTPServerHandler(SFTPHandler):
         b'statvfs@openssh.com':       _process_statvfs,
         b'fstatvfs@openssh.com':      _process_fstatvfs,
         b'hardlink@openssh.com':      _process_link,
-        b'fsync@openssh.com':         _process_fsync
+        b'fsync@openssh.com':         _process_fsync,
+        b'copy-data':                 _process_copy_data,
+        b'check-file-handle':         _process_check_file_handle,
+        b'check-file-name':           _process_check_file_name,
+        b'block-sums@asyncssh.com':   _process_block_sums,
+        b'limits@openssh.com':        _process_limits,
+        b'stat-many@asyncssh.com':    _process_stat_many,
+        b'remove-many@asyncssh.com':  _process_remove_many,
+        b'setstat-many@asyncssh.com': _process_setstat_many
     }
 
     @asyncio.coroutine
@@ -4115,8 +6732,7 @@ class SFTPServer:
 
         """
 
-        file_obj.seek(offset)
-        return file_obj.read(size)
+        return _read_at(file_obj, size, offset)
 
     def write(self, file_obj, offset, data):
         """Write data to an open file
@@ -4137,8 +6753,7 @@ class SFTPServer:
 
         """
 
-        file_obj.seek(offset)
-        return file_obj.write(data)
+        return _write_at(file_obj, data, offset)
 
     def lstat(self, path):
         """Get attributes of a file, directory, or symlink
@@ -4575,6 +7190,13 @@ class SFTPServerFile:
 
         return files
 
+    @asyncio.coroutine
+    def readdir(self, path):
+        """Read the names and any attributes of files in a directory"""
+
+        return [name if isinstance(name, SFTPName) else SFTPName(name)
+                for name in (yield from self.listdir(path))]
+
     @asyncio.coroutine
     def open(self, path, mode='rb'):
         """Open a file"""
@@ -4621,10 +7243,11 @@ class SFTPServerFile:
 
 
 @asyncio.coroutine
-def start_sftp_client(conn, loop, reader, writer, path_encoding, path_errors):
+def start_sftp_client(conn, loop, reader, writer, path_encoding, path_errors,
+                      cache_ttl=None, cache_size=1024):
     """Start an SFTP client"""
 
-    handler = SFTPClientHandler(loop, reader, writer)
+    handler = SFTPClientHandler(loop, reader, writer, cache_ttl, cache_size)
 
     handler.logger.info('Starting SFTP client')
 
@@ -4632,6 +7255,8 @@ def start_sftp_client(conn, loop, reader, writer, path_encoding, path_errors):
 
     conn.create_task(handler.recv_packets(), handler.logger)
 
+    yield from handler.request_limits()
+
     return SFTPClient(loop, handler, path_encoding, path_errors)
 
 
@@ -0,0 +1,89 @@
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+"""SFTP attribute and directory listing cache"""
+
+from collections import OrderedDict
+import copy
+import posixpath
+
+
+class _SFTPAttrCache:
+    """SFTP attribute and directory listing cache
+
+       This class caches the results of stat, lstat, and readdir calls
+       made by an SFTP client, keyed by the path which was requested.
+       Entries expire after a fixed time to live, and the least recently
+       used entries are evicted when the cache reaches its maximum size.
+       Values are copied when they are added and returned, so callers
+       which modify them don't affect later lookups.
+
+    """
+
+    def __init__(self, loop, ttl, max_entries):
+        self._loop = loop
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, kind, path):
+        """Return a cached value, or None if it is missing or expired"""
+
+        key = (kind, path)
+        entry = self._entries.get(key)
+
+        if entry:
+            expiry, value = entry
+
+            if expiry > self._loop.time():
+                self._entries.move_to_end(key)
+                return copy.deepcopy(value)
+
+            del self._entries[key]
+
+        return None
+
+    def set(self, kind, path, value):
+        """Add a value to the cache, evicting old entries if needed"""
+
+        key = (kind, path)
+
+        self._entries[key] = (self._loop.time() + self._ttl,
+                              copy.deepcopy(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, path, recurse=False):
+        """Invalidate cached entries for a path and its parent directory
+
+           If recurse is set, entries for paths below this one are
+           also invalidated, for when a directory is renamed or removed.
+
+        """
+
+        for entry_path in (path, posixpath.dirname(path) or b'.'):
+            for kind in ('stat', 'lstat', 'readdir'):
+                self._entries.pop((kind, entry_path), None)
+
+        if recurse:
+            prefix = path.rstrip(b'/') + b'/'
+
+            for key in [key for key in self._entries
+                        if key[1].startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all entries from the cache"""
+
+        self._entries.clear()
@@ -0,0 +1,149 @@
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+"""SFTP delta transfer block matching"""
+
+import hashlib
+import itertools
+
+from .packet import UInt32
+
+
+_DELTA_READ_SIZE = 1024*1024
+
+
+def _weak_checksum(data):
+    """Return the two halves of an rsync-style rolling checksum of data"""
+
+    return sum(data) & 0xffff, sum(itertools.accumulate(data)) & 0xffff
+
+
+def _encode_block_sums(blocks):
+    """Return the encoded weak and strong checksums of a list of blocks"""
+
+    block_sums = []
+
+    for block in blocks:
+        a, b = _weak_checksum(block)
+        block_sums.append(UInt32(a | (b << 16)) + hashlib.md5(block).digest())
+
+    return b''.join(block_sums)
+
+
+def _roll_match(data, start, end, block_size, block_sums):
+    """Find the first block matching a remote block after an offset
+
+       This function slides a rolling checksum one byte at a time from
+       the block at start through the block at end in data, returning
+       the offset and remote block number of the first match after
+       start, or None if there isn't one.
+
+    """
+
+    a, b = _weak_checksum(data[start:start+block_size])
+
+    for offset in range(start + 1, end + 1):
+        out = data[offset-1]
+        a = (a - out + data[offset+block_size-1]) & 0xffff
+        b = (b - block_size * out + a) & 0xffff
+
+        strong_sums = block_sums.get(a | (b << 16))
+
+        if strong_sums:
+            block = data[offset:offset+block_size]
+            block_num = strong_sums.get(hashlib.md5(block).digest())
+
+            if block_num is not None:
+                return offset, block_num
+
+    return None
+
+
+def _find_matching_blocks(path, block_size, block_sums):
+    """Find data in a local file matching blocks of a remote file
+
+       This function scans a local file looking for data at any offset
+       which matches one of the remote blocks whose checksums are
+       provided. The block checksums should be a dict mapping weak
+       checksums to a dict of strong checksums and block numbers. A
+       list of non-overlapping matches is returned, as tuples of the
+       offset in the local file and the block number of the matching
+       remote block.
+
+       Each block following the last match is first looked up directly
+       by its strong checksum, which is computed in C, so unchanged or
+       shifted runs of blocks are matched at close to the speed of the
+       hash. Only when that fails is a rolling checksum slid through
+       the next block's worth of offsets, so the slower byte-by-byte
+       scan is limited to data which actually changed.
+
+       The file is read in chunks rather than being mapped into
+       memory, so a file being truncated during the scan can't crash
+       the process.
+
+    """
+
+    matches = []
+
+    if not block_sums:
+        return matches
+
+    strong_blocks = {}
+
+    for strong_sums in block_sums.values():
+        for strong, block_num in strong_sums.items():
+            strong_blocks.setdefault(strong, block_num)
+
+    chunk = bytearray(max(_DELTA_READ_SIZE, 2 * block_size))
+    data = bytearray()
+    base = 0
+    pos = 0
+    eof = False
+
+    with open(path, 'rb') as f:
+        while True:
+            start = pos - base
+
+            if not eof and len(data) - start < 2 * block_size:
+                del data[:start]
+                base = pos
+
+                with memoryview(chunk) as view:
+                    datalen = f.readinto(view)
+
+                    if datalen:
+                        data += view[:datalen]
+                    else:
+                        eof = True
+
+                continue
+
+            if len(data) - start < block_size:
+                break
+
+            block = data[start:start+block_size]
+            block_num = strong_blocks.get(hashlib.md5(block).digest())
+
+            if block_num is None:
+                end = min(start + block_size - 1, len(data) - block_size)
+                match = _roll_match(data, start, end, block_size, block_sums)
+
+                if match:
+                    start, block_num = match
+                else:
+                    pos = base + end + 1
+                    continue
+
+            matches.append((base + start, block_num))
+            pos = base + start + block_size
+
+    return matches
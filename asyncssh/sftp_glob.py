@@ -0,0 +1,174 @@
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+"""SFTP glob pattern matching"""
+
+import asyncio
+import fnmatch
+import itertools
+import posixpath
+import re
+import stat
+
+from .misc import SFTPError
+
+
+_MAX_GLOB_REQUESTS = 32
+
+
+class _SFTPGlob:
+    """SFTP glob matcher
+
+       This class matches a glob pattern against the names in a local
+       or remote file system. Each component of the pattern is compiled
+       once, and components without wildcards are looked up directly
+       rather than by reading the directory containing them.
+
+       The attributes returned when reading a directory are used to
+       decide which names are directories, only falling back to a stat
+       of the name for symbolic links and names returned without
+       attributes. Subdirectories which need to be searched are read
+       in parallel, while still returning matches in the order they
+       were found in each directory.
+
+       If ignore_case is set, names are matched without regard to case,
+       as :func:`fnmatch.fnmatch` does for local paths on Windows.
+
+    """
+
+    def __init__(self, fs, loop=None, ignore_case=False):
+        self._fs = fs
+        self._loop = loop
+        self._sem = asyncio.Semaphore(_MAX_GLOB_REQUESTS, loop=loop)
+        self._flags = re.IGNORECASE if ignore_case else 0
+
+    def _compile(self, pattern):
+        """Compile a glob pattern into a list of component matchers"""
+
+        patlist = []
+
+        for component in pattern.split(b'/'):
+            if any(c in component for c in b'*?['):
+                regex = fnmatch.translate(component.decode('latin-1'))
+                matcher = re.compile(regex.encode('latin-1'),
+                                     self._flags).match
+            else:
+                matcher = None
+
+            patlist.append((component, matcher))
+
+        return patlist
+
+    @asyncio.coroutine
+    def _readdir(self, path):
+        """Read a directory, limiting the number of parallel requests"""
+
+        with (yield from self._sem):
+            return (yield from self._fs.readdir(path))
+
+    @asyncio.coroutine
+    def _match_subdir(self, path, attrs, patlist):
+        """Continue matching in a path if it is a directory"""
+
+        if attrs.permissions is None or stat.S_ISLNK(attrs.permissions):
+            attrs = yield from self._fs.stat(path)
+
+        if stat.S_ISDIR(attrs.permissions):
+            return (yield from self._match(path, patlist))
+        else:
+            return []
+
+    @asyncio.coroutine
+    def _match(self, basedir, patlist):
+        """Recursively match a compiled glob pattern"""
+
+        if not patlist:
+            return [basedir]
+
+        (pattern, matcher), newpatlist = patlist[0], patlist[1:]
+
+        if not pattern and not newpatlist:
+            return [basedir]
+
+        if not matcher:
+            newbase = posixpath.join(basedir, pattern) if basedir else pattern
+
+            # A final component only has to exist, so symbolic links
+            # match even if their target doesn't exist
+            try:
+                if newpatlist:
+                    attrs = yield from self._fs.stat(newbase)
+                else:
+                    attrs = yield from self._fs.lstat(newbase)
+            except (OSError, SFTPError):
+                return []
+
+            if not newpatlist:
+                return [newbase]
+            elif stat.S_ISDIR(attrs.permissions):
+                return (yield from self._match(newbase, newpatlist))
+            else:
+                return []
+
+        parts = []
+        subdirs = []
+
+        if pattern == b'**':
+            subpatlist = patlist
+            parts.append([])
+            subdirs.append((parts[-1], self._match(basedir, newpatlist)))
+        else:
+            subpatlist = newpatlist
+
+        for name in (yield from self._readdir(basedir or b'.')):
+            filename = name.filename
+
+            if pattern != filename and filename in (b'.', b'..'):
+                continue
+
+            if filename[:1] == b'.' and not pattern[:1] == b'.':
+                continue
+
+            if matcher(filename):
+                if basedir:
+                    newbase = posixpath.join(basedir, filename)
+                else:
+                    newbase = filename
+
+                if not newpatlist:
+                    parts.append([newbase])
+                else:
+                    parts.append([])
+                    subdirs.append((parts[-1],
+                                    self._match_subdir(newbase, name.attrs,
+                                                       subpatlist)))
+
+        if subdirs:
+            results = yield from asyncio.gather(
+                *(coro for _, coro in subdirs), loop=self._loop)
+
+            for (part, _), result in zip(subdirs, results):
+                part.extend(result)
+
+        return list(itertools.chain.from_iterable(parts))
+
+    @asyncio.coroutine
+    def match(self, pattern):
+        """Match a glob pattern, returning a list of matching paths"""
+
+        if pattern[:1] == b'/':
+            basedir = b'/'
+            pattern = pattern[1:]
+        else:
+            basedir = None
+
+        return (yield from self._match(basedir, self._compile(pattern)))
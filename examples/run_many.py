@@ -0,0 +1,37 @@
+#!/usr/bin/env python3.5
+#
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+import asyncio, asyncssh
+
+async def run_multiple_clients():
+    # Put your lists of hosts here
+    hosts = 5 * ['localhost']
+
+    for next_result in asyncssh.run_many(hosts, 'ls abc', concurrency=2,
+                                         timeout=30):
+        host, result = await next_result
+
+        if isinstance(result, Exception):
+            print('Host %s failed: %s' % (host, str(result)))
+        elif result.exit_status != 0:
+            print('Host %s exited with status %s:' %
+                  (host, result.exit_status))
+            print(result.stderr, end='')
+        else:
+            print('Host %s succeeded:' % host)
+            print(result.stdout, end='')
+
+        print(75*'-')
+
+asyncio.get_event_loop().run_until_complete(run_multiple_clients())
@@ -143,6 +143,67 @@ class _TestAuthorizedKeys(TempDirTestCase):
 
         self.build_keys([None], from_file=True)
 
+    def test_file_cache(self):
+        """Test reloading an authorized_keys file only when it changes"""
+
+        cache = asyncssh.auth_keys.create_authorized_keys_cache(1)
+
+        self.build_keys([None], from_file=True)
+        auth_keys = cache.load('authorized_keys')
+        self.assertIs(cache.load('authorized_keys'), auth_keys)
+        self.assertIsNot(asyncssh.read_authorized_keys('authorized_keys'),
+                         auth_keys)
+
+        self.build_keys(['cert-authority'], from_file=True)
+        auth_keys = cache.load('authorized_keys')
+        self.assertIsNone(auth_keys.validate(self.imported_keylist[0],
+                                             '1.2.3.4'))
+        self.assertIsNotNone(auth_keys.validate(self.imported_keylist[1],
+                                                '1.2.3.4', ca=True))
+
+    def test_file_cache_disabled(self):
+        """Test reloading an authorized_keys file with caching disabled"""
+
+        cache = asyncssh.auth_keys.create_authorized_keys_cache(0)
+
+        self.build_keys([None], from_file=True)
+        self.assertIsNot(cache.load('authorized_keys'),
+                         cache.load('authorized_keys'))
+
+    def test_duplicate_keys(self):
+        """Test matching options on several entries for the same key"""
+
+        auth_keys = asyncssh.import_authorized_keys(
+            'from="2.3.4.5",command="a" ' + self.keylist[0] +
+            self.keylist[1] + 'from="1.2.3.4",command="b" ' +
+            self.keylist[0])
+
+        result = auth_keys.validate(self.imported_keylist[0], '1.2.3.4')
+        self.assertEqual(result['command'], 'b')
+
+        result = auth_keys.validate(self.imported_keylist[0], '2.3.4.5')
+        self.assertEqual(result['command'], 'a')
+
+        self.assertIsNone(auth_keys.validate(self.imported_keylist[2],
+                                             '1.2.3.4'))
+
+    @unittest.skipUnless(x509_available, 'X.509 not available')
+    def test_x509_entry_order(self):
+        """Test that the first matching X.509 entry is returned"""
+
+        auth_keys = asyncssh.import_authorized_keys(
+            'command="a" x509v3-ssh-rsa subject=CN=cert0\n' +
+            'command="b" ' + self.certlist[0] +
+            'command="c" ' + self.certlist[1])
+
+        result, _ = auth_keys.validate_x509(self.imported_certlist[0],
+                                            '1.2.3.4')
+        self.assertEqual(result['command'], 'a')
+
+        result, _ = auth_keys.validate_x509(self.imported_certlist[1],
+                                            '1.2.3.4')
+        self.assertEqual(result['command'], 'c')
+
     @unittest.skipUnless(x509_available, 'X.509 not available')
     def test_subject_match(self):
         """Test match on X.509 subject name"""
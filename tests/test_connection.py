@@ -31,6 +31,7 @@ from asyncssh.compression import get_compression_algs
 from asyncssh.crypto.cipher import GCMCipher
 from asyncssh.encryption import get_encryption_algs
 from asyncssh.kex import get_kex_algs
+from asyncssh.known_hosts import read_cached_known_hosts
 from asyncssh.mac import _HMAC, _mac_handler, get_mac_algs
 from asyncssh.packet import Boolean, NameList, String, UInt32
 
@@ -428,6 +429,44 @@ class _TestConnection(ServerTestCase):
 
         yield from conn.wait_closed()
 
+    @asynctest
+    def test_shared_options(self):
+        """Test connecting with preloaded options shared by connections"""
+
+        with patch('asyncssh.connection.read_cached_known_hosts',
+                   wraps=read_cached_known_hosts) as read_known_hosts, \
+                patch('asyncssh.connection.connect_agent',
+                      wraps=asyncssh.connect_agent) as connect_agent:
+            options = asyncssh.SSHClientConnectionOptions()
+
+            try:
+                results = yield from asyncio.gather(
+                    *(self.create_connection(None, options=options)
+                      for _ in range(3)), loop=self.loop)
+
+                for conn, _ in results:
+                    conn.close()
+                    yield from conn.wait_closed()
+
+                with (yield from self.connect(options=options)) as conn:
+                    pass
+
+                yield from conn.wait_closed()
+
+                self.assertEqual(connect_agent.call_count, 1)
+
+                options.close()
+
+                with (yield from self.connect(options=options)) as conn:
+                    pass
+
+                yield from conn.wait_closed()
+            finally:
+                options.close()
+
+        self.assertEqual(read_known_hosts.call_count, 1)
+        self.assertEqual(connect_agent.call_count, 2)
+
     @asynctest
     def test_untrusted_known_hosts_key(self):
         """Test untrusted server host key"""
@@ -491,6 +530,59 @@ class _TestConnection(ServerTestCase):
 
                 yield from conn.wait_closed()
 
+    @asynctest
+    def test_kexinit_cache(self):
+        """Test reusing KEXINIT data and algorithm choices"""
+
+        choices = []
+        choose_alg = asyncssh.connection.SSHConnection._choose_alg
+
+        def _counting_choose_alg(self, *args):
+            """Count the algorithm choices which weren't cached"""
+
+            choices.append(args[0])
+            return choose_alg(self, *args)
+
+        @asyncio.coroutine
+        def _negotiate(**kwargs):
+            """Return the algorithms negotiated on a new connection"""
+
+            with (yield from self.connect(**kwargs)) as conn:
+                algs = tuple(conn.get_extra_info(name) for name in
+                             ('send_cipher', 'send_mac', 'send_compression',
+                              'recv_cipher', 'recv_mac', 'recv_compression'))
+
+            yield from conn.wait_closed()
+            return algs
+
+        asyncssh.connection._kexinit_cache.clear()
+        asyncssh.connection._alg_choice_cache.clear()
+
+        with patch('asyncssh.connection.SSHConnection._choose_alg',
+                   _counting_choose_alg):
+            for kwargs in ({}, {'encryption_algs': ['aes128-ctr']}):
+                with self.subTest(**kwargs):
+                    del choices[:]
+
+                    fresh_algs = yield from _negotiate(**kwargs)
+                    self.assertEqual(len(choices), 14)
+
+                    cached_algs = yield from _negotiate(**kwargs)
+                    self.assertEqual(len(choices), 14)
+                    self.assertEqual(cached_algs, fresh_algs)
+
+            self.assertEqual(fresh_algs[0], 'aes128-ctr')
+
+            asyncssh.connection._alg_choice_cache.clear()
+            del choices[:]
+
+            with patch('asyncssh.connection._MAX_CACHED_PEER_KEXINIT_LEN',
+                       0):
+                yield from _negotiate()
+
+            self.assertEqual(len(choices), 14)
+            self.assertEqual(len(asyncssh.connection._alg_choice_cache), 0)
+
     @asynctest
     def test_empty_kex_algs(self):
         """Test connecting with an empty list of key exchange algorithms"""
@@ -1209,6 +1209,25 @@ class _TestSetAuthorizedKeys(ServerTestCase):
 
         yield from conn.wait_closed()
 
+    @asynctest
+    def test_authorized_keys_cache(self):
+        """Test authorized_keys file is parsed once for many connections"""
+
+        # Force a reload of the file, in case an earlier test cached it
+        mtime = os.stat('authorized_keys').st_mtime
+        os.utime('authorized_keys', (mtime + 1, mtime + 1))
+
+        with patch('asyncssh.auth_keys.import_authorized_keys',
+                   wraps=asyncssh.import_authorized_keys) as import_keys:
+            for _ in range(3):
+                with (yield from self.connect(username='ckey',
+                                              client_keys='ckey')) as conn:
+                    pass
+
+                yield from conn.wait_closed()
+
+        self.assertEqual(import_keys.call_count, 1)
+
     @asynctest
     def test_cert_principals(self):
         """Test certificate principals check"""
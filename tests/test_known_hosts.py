@@ -16,6 +16,7 @@ import binascii
 import hashlib
 import hmac
 import os
+from unittest.mock import patch
 
 import asyncssh
 
@@ -265,3 +266,95 @@ class _TestKnownHosts(TempDirTestCase):
 
         self.check_hosts((['host'], [], [], [], [], [], []),
                          ([0], [], [], [], [], [], []), as_tuple=True)
+
+    def test_hashed_lookup_cache(self):
+        """Test caching of hashed entry lookups"""
+
+        known_hosts = ''.join('%s %s' % (_hash(host), key) for host, key in
+                              zip(('host', '1.2.3.4', 'other'),
+                                  self.keylists[0]))
+
+        known_hosts = asyncssh.import_known_hosts(known_hosts)
+
+        with patch('asyncssh.known_hosts.hmac.new',
+                   wraps=hmac.new) as hmac_new:
+            for _ in range(2):
+                self.check_match(known_hosts, ([0, 1], [], [], [], [], [], []))
+
+        # One hash per entry for each of host, addr, and their port forms
+        self.assertEqual(hmac_new.call_count, 12)
+
+    def test_hashed_file_order(self):
+        """Test hashed and plain pattern entries are matched in file order"""
+
+        known_hosts = asyncssh.import_known_hosts(
+            '%s %s' % (_hash('host'), self.keylists[0][0]) +
+            'h* %s' % self.keylists[0][1] +
+            '%s %s' % (_hash('1.2.3.4'), self.keylists[0][2]))
+
+        self.check_match(known_hosts, ([0, 1, 2], [], [], [], [], [], []))
+
+    def test_precompute(self):
+        """Test precomputing hashed entry lookups"""
+
+        known_hosts = asyncssh.import_known_hosts(
+            '%s %s' % (_hash('host'), self.keylists[0][0]))
+
+        known_hosts.precompute(['host', '[host]:22', '1.2.3.4',
+                                '[1.2.3.4]:22'])
+
+        with patch('asyncssh.known_hosts.hmac.new',
+                   wraps=hmac.new) as hmac_new:
+            self.check_match(known_hosts, ([0], [], [], [], [], [], []))
+
+        self.assertEqual(hmac_new.call_count, 0)
+
+    def test_lazy_decode(self):
+        """Test that only matching entries are decoded"""
+
+        known_hosts = ''.join('%s %s' % (host, key) for host, key in
+                              zip(('host', 'other1', 'other2'),
+                                  self.keylists[0]))
+
+        with patch('asyncssh.known_hosts.import_public_key',
+                   wraps=asyncssh.import_public_key) as import_public_key:
+            known_hosts = asyncssh.import_known_hosts(known_hosts)
+            self.assertEqual(import_public_key.call_count, 0)
+
+            self.check_match(known_hosts, ([0], [], [], [], [], [], []))
+            self.check_match(known_hosts, ([0], [], [], [], [], [], []),
+                             port=2222)
+            self.assertEqual(import_public_key.call_count, 1)
+
+    def test_invalid_key_match(self):
+        """Test matching a line with an invalid key"""
+
+        # pylint: disable=protected-access
+
+        known_hosts = asyncssh.import_known_hosts('host yyy\n')
+        self.assertEqual(known_hosts._exact_entries, {})
+
+        self.check_match(b'host yyy\n', ([], [], [], [], [], [], []))
+
+        bad_key = binascii.b2a_base64(b'\0\0\0\x07ssh-rsa').decode()
+        self.check_match(('host ssh-rsa ' + bad_key).encode(),
+                         ([], [], [], [], [], [], []))
+
+    def test_file_cache(self):
+        """Test reloading a known_hosts file only when it changes"""
+
+        read_cached_known_hosts = asyncssh.known_hosts.read_cached_known_hosts
+
+        with open('known_hosts', 'w') as f:
+            f.write('host ' + self.keylists[0][0])
+
+        known_hosts = read_cached_known_hosts('known_hosts')
+        self.assertIs(read_cached_known_hosts('known_hosts'), known_hosts)
+        self.assertIsNot(asyncssh.read_known_hosts('known_hosts'),
+                         known_hosts)
+
+        with open('known_hosts', 'a') as f:
+            f.write('host ' + self.keylists[0][1])
+
+        known_hosts = read_cached_known_hosts('known_hosts')
+        self.check_match(known_hosts, ([0, 1], [], [], [], [], [], []))
@@ -0,0 +1,271 @@
+# Copyright (c) 2018 by Ron Frederick <ronf@timeheart.net>.
+# All rights reserved.
+#
+# This program and the accompanying materials are made available under
+# the terms of the Eclipse Public License v1.0 which accompanies this
+# distribution and is available at:
+#
+#     http://www.eclipse.org/legal/epl-v10.html
+#
+# Contributors:
+#     Ron Frederick - initial implementation, API, and documentation
+
+"""Unit tests for AsyncSSH connection pool"""
+
+import asyncio
+from unittest.mock import patch
+
+import asyncssh
+from asyncssh.stream import SSHServerStreamSession
+
+from .server import Server, ServerTestCase
+from .util import asynctest
+
+
+_MAX_SESSIONS = 2
+
+
+class _PoolServer(Server):
+    """Server which counts connections and limits sessions per connection"""
+
+    connections = 0
+
+    def __init__(self):
+        super().__init__()
+        self._sessions = 0
+
+    def connection_made(self, conn):
+        """Count new connections"""
+
+        super().connection_made(conn)
+        _PoolServer.connections += 1
+
+    def session_requested(self):
+        """Refuse sessions beyond the per-connection limit"""
+
+        if self._sessions >= _MAX_SESSIONS:
+            return False
+
+        self._sessions += 1
+        return SSHServerStreamSession(self._handle_session,
+                                      asyncssh.SFTPServer, False)
+
+    @asyncio.coroutine
+    def _handle_session(self, stdin, stdout, stderr):
+        """Run a test command"""
+
+        # pylint: disable=unused-argument
+
+        command = stdout.channel.get_command()
+
+        if command == 'sleep':
+            yield from asyncio.sleep(0.1)
+
+        stdout.write(command)
+
+        self._sessions -= 1
+        stdout.close()
+
+
+class _TestPool(ServerTestCase):
+    """Unit tests for AsyncSSH connection pool"""
+
+    @classmethod
+    @asyncio.coroutine
+    def start_server(cls):
+        """Start an SSH server for the tests to use"""
+
+        return (yield from cls.create_server(_PoolServer))
+
+    def setUp(self):
+        _PoolServer.connections = 0
+
+    def _pool(self, **kwargs):
+        """Return a connection pool for the test server"""
+
+        return asyncssh.SSHConnectionPool(loop=self.loop, **kwargs)
+
+    @asyncio.coroutine
+    def _run(self, pool, command):
+        """Run a command against the test server"""
+
+        return (yield from pool.run(self._server_addr, command,
+                                    port=self._server_port))
+
+    @asyncio.coroutine
+    def _run_many(self, pool, count, command='sleep'):
+        """Run several commands against the test server at once"""
+
+        results = yield from asyncio.gather(
+            *[self._run(pool, command) for _ in range(count)],
+            loop=self.loop)
+
+        self.assertEqual([result.stdout for result in results],
+                         count * [command])
+
+    @asynctest
+    def test_reuse(self):
+        """Test reusing a connection for several commands"""
+
+        with self._pool() as pool:
+            for _ in range(3):
+                result = yield from self._run(pool, 'echo')
+                self.assertEqual(result.stdout, 'echo')
+
+        self.assertEqual(_PoolServer.connections, 1)
+
+    @asynctest
+    def test_max_channels(self):
+        """Test opening more connections when a channel limit is reached"""
+
+        with self._pool(max_channels=1) as pool:
+            yield from self._run_many(pool, 2)
+
+        self.assertEqual(_PoolServer.connections, 2)
+
+    @asynctest
+    def test_max_sessions(self):
+        """Test opening more connections when sessions are refused"""
+
+        with self._pool() as pool:
+            yield from self._run_many(pool, 5)
+
+        self.assertEqual(_PoolServer.connections, 3)
+
+    @asynctest
+    def test_process_and_sftp(self):
+        """Test creating a process and an SFTP client from a pool"""
+
+        with self._pool() as pool:
+            process = yield from pool.create_process(
+                self._server_addr, 'echo', port=self._server_port)
+            result = yield from process.wait()
+            self.assertEqual(result.stdout, 'echo')
+
+            sftp = yield from pool.start_sftp_client(
+                self._server_addr, port=self._server_port)
+            self.assertTrue((yield from sftp.isdir('.')))
+            sftp.exit()
+            yield from sftp.wait_closed()
+
+            yield from self._run(pool, 'echo')
+
+        self.assertEqual(_PoolServer.connections, 1)
+
+    @asynctest
+    def test_idle_timeout(self):
+        """Test closing a connection after it is idle"""
+
+        with self._pool(idle_timeout=0.1) as pool:
+            yield from self._run(pool, 'echo')
+            yield from asyncio.sleep(0.5, loop=self.loop)
+            yield from self._run(pool, 'echo')
+
+        self.assertEqual(_PoolServer.connections, 2)
+
+    @asynctest
+    def test_closed_connections_released(self):
+        """Test connections closed by the pool aren't held after closing"""
+
+        with self._pool(idle_timeout=0.1) as pool:
+            for _ in range(3):
+                yield from self._run(pool, 'echo')
+                yield from asyncio.sleep(0.5, loop=self.loop)
+
+            self.assertEqual(pool._closing, set())
+
+        yield from pool.wait_closed()
+        self.assertEqual(pool._closing, set())
+
+    @asynctest
+    def test_keepalive(self):
+        """Test checking an unused connection before reusing it"""
+
+        with self._pool(keepalive_interval=0) as pool:
+            yield from self._run(pool, 'echo')
+            yield from self._run(pool, 'echo')
+
+        self.assertEqual(_PoolServer.connections, 1)
+
+    @asynctest
+    def test_keepalive_timeout(self):
+        """Test replacing a connection which doesn't answer a keepalive"""
+
+        @asyncio.coroutine
+        def _no_response(self, request, *args):
+            """Don't return a response to a global request"""
+
+            # pylint: disable=unused-argument
+
+            yield from asyncio.sleep(1, loop=self._loop)
+
+        with self._pool(keepalive_interval=0, keepalive_timeout=0.05) as pool:
+            yield from self._run(pool, 'echo')
+
+            conns = [entry.conn for entries in pool._entries.values()
+                     for entry in entries]
+
+            with patch('asyncssh.connection.SSHClientConnection.'
+                       '_make_global_request', _no_response):
+                yield from self._run_many(pool, 2)
+
+            for conn in conns:
+                yield from asyncio.wait_for(conn.wait_closed(), 1,
+                                            loop=self.loop)
+
+        self.assertEqual(_PoolServer.connections, 2)
+
+    @asynctest
+    def test_closed_connection(self):
+        """Test replacing a connection which was closed"""
+
+        with self._pool() as pool:
+            yield from self._run(pool, 'echo')
+
+            conns = [entry.conn for entries in pool._entries.values()
+                     for entry in entries]
+
+            for conn in conns:
+                conn.close()
+                yield from conn.wait_closed()
+
+            yield from self._run(pool, 'echo')
+
+        self.assertEqual(_PoolServer.connections, 2)
+
+    @asynctest
+    def test_connect_error(self):
+        """Test failing to open a pooled connection"""
+
+        with self._pool(client_keys=None, agent_path=None) as pool:
+            with self.assertRaises(asyncssh.DisconnectError):
+                yield from pool.run(self._server_addr, 'echo',
+                                    port=self._server_port, username='user')
+
+            self.assertEqual(pool._entries, {})
+
+    @asynctest
+    def test_session_refused(self):
+        """Test a session refused on a connection with no other sessions"""
+
+        with patch('tests.test_pool._MAX_SESSIONS', 0):
+            with self._pool() as pool:
+                with self.assertRaises(asyncssh.ChannelOpenError):
+                    yield from self._run(pool, 'echo')
+
+    @asynctest
+    def test_async_context_manager(self):
+        """Test using a connection pool as an async context manager"""
+
+        pool = self._pool()
+        yield from pool.__aenter__()
+        yield from self._run(pool, 'echo')
+        yield from pool.__aexit__(None, None, None)
+
+        self.assertEqual(pool._entries, {})
+
+    def test_invalid_max_channels(self):
+        """Test an invalid channel limit"""
+
+        with self.assertRaises(ValueError):
+            self._pool(max_channels=0)
@@ -13,14 +13,17 @@
 """Unit tests for AsyncSSH process API"""
 
 import asyncio
+import gc
 import io
 import os
 from pathlib import Path
 import socket
 import sys
 import unittest
+from unittest.mock import patch
 
 import asyncssh
+from asyncssh.known_hosts import read_cached_known_hosts
 
 from .server import ServerTestCase
 from .util import asynctest, echo
@@ -1256,3 +1259,131 @@ class _TestProcessSocketPair(_TestProcess):
 
         self.assertEqual(stdout_data.decode(), data)
         self.assertEqual(stderr_data.decode(), data)
+
+
+class _TestRunMany(_TestProcess):
+    """Unit tests for running a command on many hosts"""
+
+    @asyncio.coroutine
+    def _run_many(self, command, count=3, **kwargs):
+        """Run a command on the test server several times"""
+
+        hosts = count * [(self._server_addr, self._server_port)]
+
+        results = []
+
+        for next_result in asyncssh.run_many(hosts, command, loop=self.loop,
+                                             **kwargs):
+            results.append((yield from next_result))
+
+        return results
+
+    @asynctest
+    def test_run_many(self):
+        """Test running a command on many hosts"""
+
+        progress = []
+
+        def _progress(host, result, completed, total):
+            """Record progress as each host completes"""
+
+            progress.append((host, result, completed, total))
+
+        with patch('asyncssh.connection.read_cached_known_hosts',
+                   wraps=read_cached_known_hosts) as read_known_hosts:
+            results = yield from self._run_many('exit_status', concurrency=2,
+                                                progress_handler=_progress)
+
+        self.assertEqual(read_known_hosts.call_count, 1)
+        self.assertEqual(len(results), 3)
+
+        for host, result in results:
+            self.assertEqual(host, (self._server_addr, self._server_port))
+            self.assertEqual(result.exit_status, 1)
+            self.assertEqual(result.stderr, 'Exiting with status 1')
+
+        self.assertEqual([p[2:] for p in progress], [(1, 3), (2, 3), (3, 3)])
+
+    @asynctest
+    def test_run_many_check(self):
+        """Test running a command on many hosts with exit status checking"""
+
+        results = yield from self._run_many('exit_status', check=True)
+
+        for _, result in results:
+            self.assertIsInstance(result, asyncssh.ProcessError)
+
+    @asynctest
+    def test_run_many_timeout(self):
+        """Test a timeout running a command on many hosts"""
+
+        results = yield from self._run_many('delay', timeout=0.1)
+
+        for _, result in results:
+            self.assertIsInstance(result, asyncio.TimeoutError)
+
+    @asynctest
+    def test_run_many_connect_error(self):
+        """Test a connection failure running a command on many hosts"""
+
+        results = yield from self._run_many('env', count=1, username='user',
+                                            client_keys=None, agent_path=None)
+
+        self.assertIsInstance(results[0][1], asyncssh.DisconnectError)
+
+    @asynctest
+    def test_run_many_unexpected_error(self):
+        """Test an unexpected exception running a command on many hosts"""
+
+        @asyncio.coroutine
+        def _fail(*args, **kwargs):
+            """Raise an exception which isn't returned as a result"""
+
+            # pylint: disable=unused-argument
+
+            raise ValueError('Unexpected error')
+
+        def _record_error(loop, context):
+            """Record errors reported to the event loop"""
+
+            # pylint: disable=unused-argument
+
+            errors.append(context)
+
+        errors = []
+        progress = []
+        self.loop.set_exception_handler(_record_error)
+
+        try:
+            with patch('asyncssh.connection.create_connection', _fail):
+                with self.assertRaises(ValueError):
+                    yield from self._run_many(
+                        'env', count=1,
+                        progress_handler=lambda *args: progress.append(args))
+
+            yield from asyncio.sleep(0.1, loop=self.loop)
+            gc.collect()
+        finally:
+            self.loop.set_exception_handler(None)
+
+        self.assertEqual(progress, [])
+        self.assertEqual(errors, [])
+
+    @asynctest
+    def test_run_many_options(self):
+        """Test running a command on many hosts with shared options"""
+
+        options = asyncssh.SSHClientConnectionOptions()
+
+        results = yield from self._run_many('env', options=options)
+
+        for _, result in results:
+            self.assertEqual(result.stdout, '')
+
+        options.close()
+
+    def test_run_many_no_hosts(self):
+        """Test running a command on an empty list of hosts"""
+
+        self.assertEqual(list(asyncssh.run_many([], 'env', loop=self.loop)),
+                         [])
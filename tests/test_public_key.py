@@ -26,6 +26,8 @@ from pathlib import Path
 import shutil
 import subprocess
 import sys
+import unittest
+from unittest.mock import patch
 
 import asyncssh
 
@@ -34,7 +36,7 @@ from asyncssh.asn1 import TaggedDERObject
 from asyncssh.packet import MPInt, String, UInt32
 from asyncssh.pbe import pkcs1_decrypt
 from asyncssh.public_key import CERT_TYPE_USER, CERT_TYPE_HOST, SSHKey
-from asyncssh.public_key import SSHX509CertificateChain
+from asyncssh.public_key import SSHOpenSSHCertificate, SSHX509CertificateChain
 from asyncssh.public_key import decode_ssh_certificate
 from asyncssh.public_key import get_public_key_algs, get_certificate_algs
 from asyncssh.public_key import get_x509_certificate_algs
@@ -1951,6 +1953,60 @@ class _TestPublicKeyTopLevel(TempDirTestCase):
         with self.assertRaises(asyncssh.KeyImportError):
             asyncssh.read_public_key_list('list')
 
+    def test_certificate_signature_cache(self):
+        """Test only verifying an OpenSSH certificate signature once"""
+
+        ca_key = asyncssh.generate_private_key('ecdsa-sha2-nistp256')
+        user_key = asyncssh.generate_private_key('ecdsa-sha2-nistp256')
+
+        cert = ca_key.generate_user_certificate(user_key, 'name')
+        cert_data = cert.public_data
+
+        # pylint: disable=protected-access
+        SSHOpenSSHCertificate._verified_certs.clear()
+
+        with patch.object(SSHKey, 'verify', return_value=True) as verify:
+            for _ in range(3):
+                cert = decode_ssh_certificate(cert_data)
+                self.assertEqual(cert.public_data, cert_data)
+
+        self.assertEqual(verify.call_count, 1)
+
+    @unittest.skipUnless(x509_available, 'X.509 not available')
+    def test_trusted_cert_path_cache(self):
+        """Test caching certificates read from trusted cert paths"""
+
+        ca_key = asyncssh.generate_private_key('ecdsa-sha2-nistp256')
+        other_key = asyncssh.generate_private_key('ecdsa-sha2-nistp256')
+        user_key = asyncssh.generate_private_key('ecdsa-sha2-nistp256')
+
+        cert = ca_key.generate_x509_user_certificate(user_key, 'OU=user',
+                                                     'OU=root')
+
+        os.mkdir('cert_path')
+        root_path = os.path.join('cert_path', cert.issuer_hash + '.0')
+
+        root = ca_key.generate_x509_ca_certificate(ca_key, 'OU=root')
+        root.write_certificate(root_path)
+
+        with patch('asyncssh.public_key.import_certificate',
+                   wraps=asyncssh.import_certificate) as import_cert:
+            for _ in range(3):
+                self.assertIsNone(cert.validate_chain([], [], ['cert_path'],
+                                                      'any', None, None))
+
+            self.assertEqual(import_cert.call_count, 1)
+
+            root = other_key.generate_x509_ca_certificate(other_key,
+                                                          'OU=root')
+            root.write_certificate('new_root')
+            os.replace('new_root', root_path)
+
+            with self.assertRaises(ValueError):
+                cert.validate_chain([], [], ['cert_path'], 'any', None, None)
+
+            self.assertEqual(import_cert.call_count, 2)
+
     def test_pad_error(self):
         """Test for missing RFC 1423 padding on PBE decrypt"""
 
@@ -13,14 +13,17 @@
 """Unit tests for AsyncSSH SFTP client and server"""
 
 import asyncio
+import binascii
 import errno
 import functools
+import hashlib
 import os
 from pathlib import Path
 import posixpath
 import shutil
 import stat
 import sys
+import threading
 import time
 import unittest
 from unittest.mock import patch
@@ -29,19 +32,48 @@ import asyncssh
 
 from asyncssh import SFTPError, SFTPAttrs, SFTPVFSAttrs, SFTPName, SFTPServer
 from asyncssh import SEEK_CUR, SEEK_END
-from asyncssh import FXP_INIT, FXP_VERSION, FXP_OPEN, FXP_CLOSE
+from asyncssh import FXP_INIT, FXP_VERSION, FXP_OPEN, FXP_CLOSE, FXP_OPENDIR
+from asyncssh import FXP_STAT
 from asyncssh import FXP_STATUS, FXP_HANDLE, FXP_DATA, FILEXFER_ATTR_UNDEFINED
-from asyncssh import FX_OK, FX_PERMISSION_DENIED, FX_FAILURE
+from asyncssh import FX_OK, FX_NO_SUCH_FILE, FX_PERMISSION_DENIED, FX_FAILURE
+from asyncssh import FX_OP_UNSUPPORTED
 from asyncssh import scp
 
 from asyncssh.misc import python35
 from asyncssh.packet import SSHPacket, String, UInt32
-from asyncssh.sftp import LocalFile, SFTPHandler, SFTPServerHandler
+from asyncssh.sftp import LocalFile, SFTPHandler, SFTPClientHandler
+from asyncssh.sftp import SFTPServerHandler, match_glob
+from asyncssh.sftp_glob import _SFTPGlob
 
 from .server import ServerTestCase
 from .util import asynctest
 
 
+def _count_transfers(method):
+    """Patch an SFTP client request to count the bytes it transfers"""
+
+    orig_method = getattr(SFTPClientHandler, method)
+    transfers = []
+
+    def _counting_method(self, handle, offset, data_or_length):
+        """Record the size of a read or write before making it"""
+
+        if isinstance(data_or_length, int):
+            transfers.append(data_or_length)
+        else:
+            transfers.append(len(data_or_length))
+
+        return orig_method(self, handle, offset, data_or_length)
+
+    return patch.object(SFTPClientHandler, method, _counting_method), transfers
+
+
+def _random_text(size):
+    """Return random text of the requested size"""
+
+    return binascii.b2a_hex(os.urandom(size // 2)).decode('ascii')
+
+
 def remove(files):
     """Remove files and directories"""
 
@@ -124,6 +156,15 @@ class _IOErrorSFTPServer(SFTPServer):
             super().write(file_obj, offset, data)
 
 
+class _ShortReadSFTPServer(SFTPServer):
+    """Return short reads which don't fill the requested size"""
+
+    def read(self, file_obj, offset, size):
+        """Read at most 1000 bytes from an open file"""
+
+        return super().read(file_obj, offset, min(size, 1000))
+
+
 class _NotImplSFTPServer(SFTPServer):
     """Return an error that a request is not implemented"""
 
@@ -133,6 +174,12 @@ class _NotImplSFTPServer(SFTPServer):
 
         raise NotImplementedError
 
+    @asyncio.coroutine
+    def remove(self, path):
+        """Return that removing files isn't implemented"""
+
+        raise NotImplementedError
+
 
 class _LongnameSFTPServer(SFTPServer):
     """Return a fixed set of files in response to a listdir request"""
@@ -457,44 +504,778 @@ class _CheckSFTP(ServerTestCase):
     def _check_link(self, link, target):
         """Check if a symlink points to the right target"""
 
-        self.assertEqual(os.readlink(link), target)
+        self.assertEqual(os.readlink(link), target)
+
+
+class _TestSFTP(_CheckSFTP):
+    """Unit tests for AsyncSSH SFTP client and server"""
+
+    # pylint: disable=too-many-public-methods
+
+    @classmethod
+    @asyncio.coroutine
+    def start_server(cls):
+        """Start an SFTP server for the tests to use"""
+
+        return (yield from cls.create_server(sftp_factory=True))
+
+    @sftp_test
+    def test_copy(self, sftp):
+        """Test copying a file over SFTP"""
+
+        for method in ('get', 'put', 'copy'):
+            with self.subTest(method=method):
+                try:
+                    self._create_file('src')
+                    yield from getattr(sftp, method)('src', 'dst')
+                    self._check_file('src', 'dst')
+                finally:
+                    remove('src dst')
+
+    @sftp_test
+    def test_copy_progress(self, sftp):
+        """Test copying a file over SFTP with progress reporting"""
+
+        def _report_progress(srcpath, dstpath, bytes_copied, total_bytes):
+            """Monitor progress of copy"""
+
+            # pylint: disable=unused-argument
+
+            reports.append(bytes_copied)
+
+        for method in ('get', 'put', 'copy'):
+            reports = []
+
+            with self.subTest(method=method):
+                try:
+                    self._create_file('src', 100000*'a')
+                    yield from getattr(sftp, method)(
+                        'src', 'dst', block_size=8192,
+                        progress_handler=_report_progress)
+                    self._check_file('src', 'dst')
+
+                    self.assertEqual(len(reports), 13)
+                    self.assertEqual(reports[-1], 100000)
+                finally:
+                    remove('src dst')
+
+    @sftp_test
+    def test_copy_progress_details(self, sftp):
+        """Test copying a file with request window details reported"""
+
+        def _report_progress(srcpath, dstpath, bytes_copied,
+                             total_bytes, depth, block_size):
+            """Monitor progress and request window of copy"""
+
+            # pylint: disable=unused-argument
+
+            reports.append((bytes_copied, depth, block_size))
+
+        for method in ('get', 'put', 'copy'):
+            reports = []
+
+            with self.subTest(method=method):
+                try:
+                    self._create_file('src', 1000000*'a')
+                    yield from getattr(sftp, method)(
+                        'src', 'dst', block_size=4096,
+                        progress_handler=_report_progress,
+                        progress_details=True)
+                    self._check_file('src', 'dst')
+
+                    self.assertEqual(len(reports), 245)
+                    self.assertEqual(reports[-1][0], 1000000)
+
+                    for _, depth, _ in reports:
+                        self.assertGreaterEqual(depth, 4)
+                        self.assertLessEqual(depth, 128)
+
+                    for _, _, block_size in reports:
+                        self.assertEqual(block_size, 4096)
+                finally:
+                    remove('src dst')
+
+    def test_copy_request_window(self):
+        """Test the request window follows recent round trip samples"""
+
+        copier = asyncssh.sftp._SFTPFileCopier(self.loop, max_requests=64)
+        copier._block_size = 1000
+
+        # 20 blocks delivered in 10ms needs 40 requests outstanding
+        for _ in range(32):
+            copier._update_depth(0.01, 20000)
+
+        self.assertEqual(copier._depth, 40)
+
+        # A single fast sample doesn't pin the window once it ages out
+        copier._update_depth(0.01, 100000)
+        self.assertEqual(copier._depth, 64)
+
+        for _ in range(32):
+            copier._update_depth(0.02, 10000)
+
+        self.assertEqual(copier._depth, 20)
+
+        for _ in range(32):
+            copier._update_depth(0.001, 100)
+
+        self.assertEqual(copier._depth, 4)
+
+        copier._update_depth(0, 100000)
+        self.assertEqual(copier._depth, 4)
+
+    @sftp_test
+    def test_copy_data(self, sftp):
+        """Test copying a remote file using the copy-data extension"""
+
+        try:
+            self._create_file('src', 100000*'a')
+
+            with patch('asyncssh.sftp.SFTPClientHandler.read') as mock_read:
+                yield from sftp.copy('src', 'dst', block_size=8192)
+
+            self.assertFalse(mock_read.called)
+            self._check_file('src', 'dst')
+        finally:
+            remove('src dst')
+
+    @sftp_test
+    def test_copy_data_rejected(self, sftp):
+        """Test falling back when the server rejects copy-data"""
+
+        try:
+            self._create_file('src', 100000*'a')
+
+            with patch.dict(SFTPServerHandler._packet_handlers):
+                del SFTPServerHandler._packet_handlers[b'copy-data']
+                yield from sftp.copy('src', 'dst')
+
+            self._check_file('src', 'dst')
+        finally:
+            remove('src dst')
+
+    @sftp_test
+    def test_copy_data_check_file_interleaved(self, sftp):
+        """Test whole-file copy-data and check-file yield between blocks"""
+
+        @asyncio.coroutine
+        def _tick():
+            """Count event loop iterations"""
+
+            while True:
+                ticks.append(None)
+                yield from asyncio.sleep(0, loop=self.loop)
+
+        def _record_read(server, file_obj, offset, size):
+            """Record event loop activity at each server read"""
+
+            reads.append(len(ticks))
+            return server_read(server, file_obj, offset, size)
+
+        server_read = asyncssh.SFTPServer.read
+        ticks = []
+        src = dst = None
+
+        try:
+            self._create_file('src', 1000000*'a')
+
+            src = yield from sftp.open('src', 'rb')
+            dst = yield from sftp.open('dst', 'wb')
+
+            ticker = asyncio.ensure_future(_tick(), loop=self.loop)
+
+            try:
+                with patch('asyncssh.sftp.SFTPServer.read', _record_read):
+                    reads = []
+                    yield from sftp._handler.copy_data(src._handle, 0, 0,
+                                                       dst._handle, 0)
+                    self.assertGreater(len(reads), 1)
+                    self.assertEqual(len(set(reads)), len(reads))
+
+                    reads = []
+                    yield from src.check_file()
+                    self.assertGreater(len(reads), 1)
+                    self.assertEqual(len(set(reads)), len(reads))
+            finally:
+                ticker.cancel()
+
+            yield from dst.close()
+            dst = None
+
+            self._check_file('src', 'dst')
+        finally:
+            for f in (src, dst):
+                if f: # pragma: no branch
+                    yield from f.close()
+
+            remove('src dst')
+
+    @sftp_test
+    def test_copy_data_errors(self, sftp):
+        """Test invalid copy-data requests"""
+
+        # pylint: disable=protected-access
+
+        f = None
+
+        try:
+            self._create_file('file', 100*'a')
+
+            f = yield from sftp.open('file', 'r+')
+
+            with self.assertRaises(SFTPError):
+                yield from sftp._handler.copy_data(f._handle, 0, 50,
+                                                   b'\xff\xff\xff\xff', 0)
+
+            with self.assertRaises(SFTPError):
+                yield from sftp._handler.copy_data(f._handle, 0, 50,
+                                                   f._handle, 25)
+
+            with self.assertRaises(SFTPError):
+                yield from sftp._handler.copy_data(f._handle, 0, 0,
+                                                   f._handle, 100)
+
+            yield from sftp._handler.copy_data(f._handle, 0, 50,
+                                               f._handle, 100)
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+        try:
+            with open('file') as f:
+                self.assertEqual(f.read(), 150*'a')
+        finally:
+            remove('file')
+
+    def _check_delta(self, sftp, method, old, new, max_transfer):
+        """Check a delta transfer from new data into an older copy"""
+
+        def _report_progress(srcpath, dstpath, bytes_copied, total_bytes):
+            """Monitor progress of copy"""
+
+            # pylint: disable=unused-argument
+
+            reports.append(bytes_copied)
+
+        reports = []
+        patcher, transfers = _count_transfers('read' if method == 'get'
+                                              else 'write')
+
+        try:
+            with open('src', 'wb') as f:
+                f.write(new)
+
+            if old is not None:
+                with open('dst', 'wb') as f:
+                    f.write(old)
+
+            with patcher:
+                yield from getattr(sftp, method)(
+                    'src', 'dst', block_size=4096, delta=True,
+                    progress_handler=_report_progress)
+
+            with open('dst', 'rb') as f:
+                self.assertEqual(f.read(), new)
+
+            self.assertLessEqual(sum(transfers), max_transfer)
+            self.assertEqual(reports[-1], len(new))
+            self.assertFalse([name for name in os.listdir('.')
+                              if name.startswith('dst.')])
+        finally:
+            remove('src dst')
+
+    @sftp_test
+    def test_delta(self, sftp):
+        """Test transferring only changed data over SFTP"""
+
+        old = os.urandom(100000)
+
+        for method in ('get', 'put'):
+            with self.subTest(method=method, change='in place'):
+                new = old[:50000] + 100*b'x' + old[50100:]
+                yield from self._check_delta(sftp, method, old, new, 8192)
+
+            with self.subTest(method=method, change='inserted'):
+                new = b'prefix' + old[:50000] + b'insert' + old[50000:]
+                yield from self._check_delta(sftp, method, old, new, 12288)
+
+            with self.subTest(method=method, change='truncated'):
+                new = old[:60000]
+                yield from self._check_delta(sftp, method, old, new, 4096)
+
+            with self.subTest(method=method, change='new file'):
+                yield from self._check_delta(sftp, method, None, old, 100000)
+
+    @sftp_test
+    def test_delta_block_sums_limit(self, sftp):
+        """Test block checksum requests are limited in size"""
+
+        old = os.urandom(100000)
+        new = b'prefix' + old[:50000] + b'insert' + old[50000:]
+
+        with patch('asyncssh.sftp._MAX_BLOCK_SUMS_LEN', 16384):
+            try:
+                with open('src', 'wb') as f:
+                    f.write(old)
+
+                block_sums = yield from sftp._handler.block_sums(
+                    'src', 0, 0, 4096)
+                self.assertEqual(len(block_sums), 4)
+
+                block_sums = yield from sftp._handler.block_sums(
+                    'src', 0, 50000, 5000)
+                self.assertEqual(len(block_sums), 3)
+
+                with self.assertRaises(asyncssh.SFTPError):
+                    yield from sftp._handler.block_sums('src', 0, 0, 32768)
+            finally:
+                remove('src')
+
+            for method in ('get', 'put'):
+                with self.subTest(method=method):
+                    yield from self._check_delta(sftp, method, old,
+                                                 new, 12288)
+
+    @sftp_test
+    def test_delta_chunked_scan(self, sftp):
+        """Test matching blocks which span chunks of the local file"""
+
+        old = os.urandom(100000)
+        new = b'prefix' + old[:50000] + b'insert' + old[50000:]
+
+        with patch('asyncssh.sftp_delta._DELTA_READ_SIZE', 5000):
+            for method in ('get', 'put'):
+                with self.subTest(method=method):
+                    yield from self._check_delta(sftp, method, old,
+                                                 new, 12288)
+
+    @sftp_test
+    def test_delta_replace_attrs(self, sftp):
+        """Test a replaced delta file keeps attrs and other files"""
+
+        old = _random_text(100000)
+        new = 'prefix' + old
+
+        for method in ('get', 'put'):
+            with self.subTest(method=method):
+                try:
+                    self._create_file('src', new)
+                    self._create_file('dst', old)
+                    os.chmod('dst', 0o600)
+                    self._create_file('dst.delta', 'existing')
+
+                    yield from getattr(sftp, method)(
+                        'src', 'dst', block_size=4096, delta=True)
+
+                    self._check_file('src', 'dst')
+                    self.assertEqual(stat.S_IMODE(os.stat('dst').st_mode),
+                                     0o600)
+
+                    with open('dst.delta') as f:
+                        self.assertEqual(f.read(), 'existing')
+                finally:
+                    remove('src dst dst.delta')
+
+    @sftp_test
+    def test_delta_no_posix_rename(self, sftp):
+        """Test a delta upload to a server without rename or copy-data"""
+
+        old = _random_text(100000)
+        new = 'prefix' + old
+
+        for attr in ('supports_posix_rename', 'supports_copy_data'):
+            with self.subTest(attr=attr):
+                read_patcher, reads = _count_transfers('read')
+                write_patcher, writes = _count_transfers('write')
+
+                try:
+                    self._create_file('src', new)
+                    self._create_file('dst', old)
+
+                    with read_patcher, write_patcher:
+                        with patch('asyncssh.sftp.SFTPClientHandler.' + attr,
+                                   False):
+                            yield from sftp.put('src', 'dst',
+                                                block_size=4096, delta=True)
+
+                    self._check_file('src', 'dst')
+                    self.assertEqual(sum(reads), 0)
+                    self.assertEqual(sum(writes), len(new))
+                    self.assertFalse([name for name in os.listdir('.')
+                                      if name.startswith('dst.')])
+                finally:
+                    remove('src dst')
+
+    @sftp_test
+    def test_delta_cleanup(self, sftp):
+        """Test the temporary file is removed when a delta copy fails"""
+
+        old = _random_text(100000)
+        new = 'prefix' + old
+
+        for method in ('get', 'put'):
+            for step in ('_copy_attrs', 'posix_rename'):
+                for exc in (asyncio.CancelledError, RuntimeError):
+                    with self.subTest(method=method, step=step, exc=exc):
+                        if step == '_copy_attrs':
+                            target = 'asyncssh.sftp._SFTPDeltaCopier.' + step
+                        elif method == 'get':
+                            target = 'asyncssh.sftp.LocalFile.' + step
+                        else:
+                            target = 'asyncssh.sftp.SFTPClient.' + step
+
+                        try:
+                            self._create_file('src', new)
+                            self._create_file('dst', old)
+
+                            with patch(target, side_effect=exc):
+                                with self.assertRaises(exc):
+                                    yield from getattr(sftp, method)(
+                                        'src', 'dst', block_size=4096,
+                                        delta=True)
+
+                            with open('dst') as f:
+                                self.assertEqual(f.read(), old)
+
+                            self.assertFalse([name for name in os.listdir('.')
+                                              if name.startswith('dst.')])
+                        finally:
+                            remove('src dst')
+
+    @sftp_test
+    def test_delta_scan_in_executor(self, sftp):
+        """Test the event loop keeps running during a delta scan"""
+
+        @asyncio.coroutine
+        def _tick():
+            """Count event loop iterations"""
+
+            while True:
+                ticks.append(None)
+                yield from asyncio.sleep(0.01, loop=self.loop)
+
+        def _slow_find_matching_blocks(*args):
+            """Record event loop activity during a slow scan"""
+
+            start = len(ticks)
+            time.sleep(0.5)
+            scan_ticks.append(len(ticks) - start)
+
+            return find_matching_blocks(*args)
+
+        ticks = []
+        scan_ticks = []
+        find_matching_blocks = asyncssh.sftp._find_matching_blocks
+
+        old = _random_text(100000)
+        ticker = asyncio.ensure_future(_tick(), loop=self.loop)
+
+        try:
+            self._create_file('src', 'prefix' + old)
+            self._create_file('dst', old)
+
+            with patch('asyncssh.sftp._find_matching_blocks',
+                       _slow_find_matching_blocks):
+                yield from sftp.get('src', 'dst', delta=True)
+
+            self._check_file('src', 'dst')
+            self.assertGreater(scan_ticks[0], 10)
+        finally:
+            ticker.cancel()
+            remove('src dst')
+
+    def test_delta_unsupported(self):
+        """Test a delta transfer with a server that doesn't support it"""
+
+        @sftp_test
+        def _delta_unsupported(self, sftp):
+            """Fall back to a full transfer"""
+
+            old = os.urandom(20000)
+            new = old[:10000] + b'x' + old[10001:]
+
+            for method in ('get', 'put'):
+                with self.subTest(method=method):
+                    yield from self._check_delta(sftp, method, old,
+                                                 new, 20000)
+
+        with patch('asyncssh.sftp.SFTPServerHandler._extensions', []):
+            _delta_unsupported(self)
+
+    def _check_resume(self, sftp, method, data, partial, max_transfer):
+        """Check resuming a transfer into a partial copy of a file"""
+
+        def _report_progress(srcpath, dstpath, bytes_copied, total_bytes):
+            """Monitor progress of copy"""
+
+            # pylint: disable=unused-argument
+
+            reports.append(bytes_copied)
+
+        reports = []
+        patcher, transfers = _count_transfers('read' if method == 'get'
+                                              else 'write')
+
+        try:
+            with open('src', 'wb') as f:
+                f.write(data)
+
+            with open('dst', 'wb') as f:
+                f.write(partial)
+
+            with patcher:
+                yield from getattr(sftp, method)(
+                    'src', 'dst', block_size=4096, resume=True,
+                    progress_handler=_report_progress)
+
+            with open('dst', 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+            if method != 'copy':
+                self.assertLessEqual(sum(transfers), max_transfer)
+
+            self.assertEqual(reports[-1], len(data))
+        finally:
+            remove('src dst')
+
+    @sftp_test
+    def test_resume(self, sftp):
+        """Test resuming a partially completed transfer"""
+
+        data = os.urandom(100000)
+        corrupt = data[:59999] + bytes([data[59999] ^ 0xff])
+
+        for method in ('get', 'put', 'copy'):
+            tail = 4096 if method == 'get' else 0
+
+            with self.subTest(method=method, partial='prefix'):
+                yield from self._check_resume(sftp, method, data,
+                                              data[:60000], 40000 + tail)
+
+            with self.subTest(method=method, partial='complete'):
+                yield from self._check_resume(sftp, method, data,
+                                              data, tail)
+
+            with self.subTest(method=method, partial='empty'):
+                yield from self._check_resume(sftp, method, data,
+                                              b'', 100000)
+
+            with self.subTest(method=method, partial='mismatched'):
+                yield from self._check_resume(sftp, method, data,
+                                              corrupt, 100000 + tail)
+
+            with self.subTest(method=method, partial='larger'):
+                yield from self._check_resume(sftp, method, data,
+                                              data + b'x', 100000)
+
+    @sftp_test
+    def test_limits(self, sftp):
+        """Test getting server limits and choosing a block size from them"""
+
+        self.assertEqual(sftp.limits.max_read_len, 261120)
+        self.assertEqual(sftp.limits.max_write_len, 261120)
+        self.assertEqual(sftp.limits.max_open_handles, 0)
+
+        data = os.urandom(1000000)
+
+        for method in ('get', 'put'):
+            with self.subTest(method=method):
+                patcher, transfers = _count_transfers('read' if method == 'get'
+                                                      else 'write')
+
+                try:
+                    with open('src', 'wb') as f:
+                        f.write(data)
+
+                    with patcher:
+                        yield from getattr(sftp, method)('src', 'dst')
+
+                    with open('dst', 'rb') as f:
+                        self.assertEqual(f.read(), data)
+
+                    self.assertEqual(max(transfers), 261120)
+                finally:
+                    remove('src dst')
+
+    @sftp_test
+    def test_limits_read_clamped(self, sftp):
+        """Test the server limiting reads larger than it allows"""
+
+        # pylint: disable=protected-access
+
+        f = None
+
+        try:
+            self._create_file('file', 1000000*'x')
+
+            f = yield from sftp.open('file', 'rb')
+
+            data = yield from sftp._handler.read(f._handle, 0, 1000000)
+            self.assertEqual(len(data), sftp.limits.max_read_len)
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    def test_limits_unsupported(self):
+        """Test transfers with a server that doesn't report its limits"""
+
+        @sftp_test
+        def _limits_unsupported(self, sftp):
+            """Fall back to the default block size"""
+
+            self.assertEqual(sftp.limits.max_read_len, 0)
+
+            patcher, transfers = _count_transfers('write')
+
+            try:
+                self._create_file('src', 100000*'x')
+
+                with patcher:
+                    yield from sftp.put('src', 'dst')
+
+                self._check_file('src', 'dst')
+                self.assertEqual(max(transfers), 16384)
+            finally:
+                remove('src dst')
+
+        with patch.dict('asyncssh.sftp.SFTPServerHandler._packet_handlers',
+                        {b'limits@openssh.com': None}):
+            _limits_unsupported(self)
+
+    @patch('asyncssh.sftp._MAX_SFTP_WRITE_LEN', 1000)
+    @sftp_test
+    def test_limits_write_split(self, sftp):
+        """Test splitting writes larger than the server allows"""
+
+        def _write(self, file_obj, offset, data):
+            """Record the size of writes received by the server"""
+
+            transfers.append(len(data))
+            return orig_write(self, file_obj, offset, data)
+
+        f = None
+        transfers = []
+        orig_write = SFTPServer.write
+
+        try:
+            self._create_file('src', 100000*'x')
+
+            with patch.object(SFTPServer, 'write', _write), \
+                    patch('asyncssh.sftp._vectored_io', False):
+                yield from sftp.put('src', 'dst', block_size=8192)
+
+                f = yield from sftp.open('file', 'wb')
+                yield from f.write(2500*b'y')
+                yield from f.close()
+
+            self._check_file('src', 'dst')
+            self.assertEqual(max(transfers), 1000)
+
+            with open('file', 'rb') as localf:
+                self.assertEqual(localf.read(), 2500*b'y')
+        finally:
+            remove('src dst file')
+
+    @sftp_test
+    def test_copy_hash(self, sftp):
+        """Test computing a digest of files while copying them over SFTP"""
+
+        def _report_hash(srcpath, dstpath, digest):
+            """Record the digest of each file copied"""
+
+            digests.append((srcpath, dstpath, digest))
+
+        data = os.urandom(100000)
+
+        for method in ('get', 'put', 'copy'):
+            options = [{}, {'hash_alg': 'sha512'}, {'resume': True}]
+
+            if method != 'copy':
+                options.append({'delta': True})
+
+            for kwargs in options:
+                digests = []
+
+                with self.subTest(method=method, **kwargs):
+                    try:
+                        with open('src', 'wb') as f:
+                            f.write(data)
+
+                        with open('dst', 'wb') as f:
+                            f.write(data[:50000])
+
+                        yield from getattr(sftp, method)(
+                            'src', 'dst', block_size=4096,
+                            hash_handler=_report_hash, **kwargs)
+
+                        with open('dst', 'rb') as f:
+                            self.assertEqual(f.read(), data)
+
+                        hash_obj = hashlib.new(kwargs.get('hash_alg',
+                                                          'sha256'), data)
+
+                        self.assertEqual(digests, [(b'src', b'dst',
+                                                    hash_obj.digest())])
+                    finally:
+                        remove('src dst')
+
+    @sftp_test
+    def test_copy_hash_in_executor(self, sftp):
+        """Test local file data is hashed outside of the event loop"""
 
+        def _report_hash(srcpath, dstpath, digest):
+            """Record the digest of each file copied"""
 
-class _TestSFTP(_CheckSFTP):
-    """Unit tests for AsyncSSH SFTP client and server"""
+            # pylint: disable=unused-argument
 
-    # pylint: disable=too-many-public-methods
+            digests.append(digest)
 
-    @classmethod
-    @asyncio.coroutine
-    def start_server(cls):
-        """Start an SFTP server for the tests to use"""
+        def _record_hash_local_file(*args):
+            """Record which thread hashes local file data"""
 
-        return (yield from cls.create_server(sftp_factory=True))
+            threads.append(threading.current_thread())
+            hash_local_file(*args)
 
-    @sftp_test
-    def test_copy(self, sftp):
-        """Test copying a file over SFTP"""
+        hash_local_file = asyncssh.sftp._hash_local_file
+        data = os.urandom(100000)
 
-        for method in ('get', 'put', 'copy'):
-            with self.subTest(method=method):
-                try:
-                    self._create_file('src')
-                    yield from getattr(sftp, method)('src', 'dst')
-                    self._check_file('src', 'dst')
-                finally:
-                    remove('src dst')
+        for method in ('get', 'put'):
+            for kwargs in ({'resume': True}, {'delta': True}):
+                digests = []
+                threads = []
+
+                with self.subTest(method=method, **kwargs):
+                    try:
+                        with open('src', 'wb') as f:
+                            f.write(data)
+
+                        with open('dst', 'wb') as f:
+                            f.write(data[:50000])
+
+                        with patch('asyncssh.sftp._hash_local_file',
+                                   _record_hash_local_file):
+                            yield from getattr(sftp, method)(
+                                'src', 'dst', block_size=4096,
+                                hash_handler=_report_hash, **kwargs)
+
+                        self.assertEqual(digests,
+                                         [hashlib.sha256(data).digest()])
+                        self.assertEqual(len(threads), 1)
+                        self.assertIsNot(threads[0],
+                                         threading.main_thread())
+                    finally:
+                        remove('src dst')
 
     @sftp_test
-    def test_copy_progress(self, sftp):
-        """Test copying a file over SFTP with progress reporting"""
+    def test_copy_progress_no_details(self, sftp):
+        """Test request window details aren't reported unless requested"""
 
-        def _report_progress(srcpath, dstpath, bytes_copied, total_bytes):
+        def _report_progress(*args):
             """Monitor progress of copy"""
 
-            # pylint: disable=unused-argument
-
-            reports.append(bytes_copied)
+            reports.append(args)
 
         for method in ('get', 'put', 'copy'):
             reports = []
@@ -503,12 +1284,12 @@ class _TestSFTP(_CheckSFTP):
                 try:
                     self._create_file('src', 100000*'a')
                     yield from getattr(sftp, method)(
-                        'src', 'dst', block_size=8192,
+                        'src', 'dst', block_size=4096,
                         progress_handler=_report_progress)
                     self._check_file('src', 'dst')
 
-                    self.assertEqual(len(reports), 13)
-                    self.assertEqual(reports[-1], 100000)
+                    self.assertEqual(reports[-1],
+                                     (b'src', b'dst', 100000, 100000))
                 finally:
                     remove('src dst')
 
@@ -764,6 +1545,76 @@ class _TestSFTP(_CheckSFTP):
         finally:
             remove('file2')
 
+    @sftp_test
+    def test_glob_attrs(self, sftp):
+        """Test a glob pattern match using attributes from readdir"""
+
+        try:
+            os.makedirs('filedir/subdir1')
+            os.mkdir('filedir/subdir2')
+            self._create_file('file1')
+            self._create_file('filedir/subdir1/file2')
+            self._create_file('filedir/subdir2/file3')
+
+            with patch('asyncssh.sftp.SFTPClientHandler.stat',
+                       side_effect=SFTPError(FX_FAILURE, 'Unexpected stat')):
+                self.assertEqual(sorted((yield from sftp.glob('**/file?'))),
+                                 ['file1', 'filedir/subdir1/file2',
+                                  'filedir/subdir2/file3'])
+                self.assertEqual(sorted((yield from sftp.glob('file*/sub*/'))),
+                                 ['filedir/subdir1', 'filedir/subdir2'])
+
+            os.symlink('filedir', 'link')
+
+            self.assertEqual((yield from sftp.glob('lin*/*1/file*')),
+                             ['link/subdir1/file2'])
+            self.assertEqual((yield from sftp.glob('filedir/*2/file3')),
+                             ['filedir/subdir2/file3'])
+
+            os.symlink('nonexistent', 'filedir/broken')
+
+            self.assertEqual((yield from sftp.glob('file*/broken')),
+                             ['filedir/broken'])
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.glob('nonexistent/*')
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.glob('file1/*')
+        finally:
+            remove('file1 filedir link')
+
+    @sftp_test
+    def test_glob_case(self, sftp):
+        """Test glob case folding is only done on local Windows paths"""
+
+        def _record_glob(fs, loop=None, ignore_case=False):
+            """Record the glob matchers which are created"""
+
+            glob = _SFTPGlob(fs, loop, ignore_case)
+            globs.append(glob)
+            return glob
+
+        for platform in ('linux', 'win32'):
+            with self.subTest(platform=platform):
+                globs = []
+
+                with patch('sys.platform', platform):
+                    with patch('asyncssh.sftp._SFTPGlob', _record_glob):
+                        for fs in (LocalFile, sftp):
+                            yield from match_glob(fs, b'nonexistent/FILE?',
+                                                  lambda exc: None)
+
+                local_glob, remote_glob = globs
+
+                [_, (_, local_match)] = local_glob._compile(b'x/FILE?')
+                [_, (_, remote_match)] = remote_glob._compile(b'x/FILE?')
+
+                self.assertEqual(bool(local_match(b'file1')),
+                                 platform == 'win32')
+                self.assertTrue(local_match(b'FILE1'))
+                self.assertFalse(remote_match(b'file1'))
+
     @sftp_test
     def test_stat(self, sftp):
         """Test getting attributes on a file"""
@@ -828,6 +1679,159 @@ class _TestSFTP(_CheckSFTP):
         finally:
             remove('link')
 
+    @asynctest
+    def test_attr_cache(self):
+        """Test caching of file attributes and directory listings"""
+
+        requests = []
+        orig_make_request = SFTPClientHandler._make_request
+
+        def _make_request(self, pkttype, *args):
+            """Record the type of each request made"""
+
+            requests.append(pkttype)
+            return orig_make_request(self, pkttype, *args)
+
+        try:
+            self._create_file('file', 'xxx')
+            os.mkdir('dir')
+            self._create_file('dir/file1')
+            self._create_file('dir/file2')
+
+            with patch.object(SFTPClientHandler, '_make_request',
+                              _make_request):
+                with (yield from self.connect()) as conn:
+                    sftp = yield from conn.start_sftp_client(cache_ttl=60)
+
+                    with sftp:
+                        self.assertEqual((yield from sftp.getsize('file')), 3)
+                        self.assertTrue((yield from sftp.isfile('file')))
+                        self.assertEqual(requests.count(FXP_STAT), 1)
+
+                        self._create_file('file', 'xxxxx')
+                        self.assertEqual((yield from sftp.getsize('file')), 3)
+
+                        sftp.clear_cache('file')
+                        self.assertEqual((yield from sftp.getsize('file')), 5)
+                        self.assertEqual(requests.count(FXP_STAT), 2)
+
+                        yield from sftp.chmod('file', 0o600)
+                        self.assertEqual(
+                            stat.S_IMODE((yield from
+                                          sftp.stat('file')).permissions),
+                            0o600)
+                        self.assertEqual(requests.count(FXP_STAT), 3)
+
+                        with (yield from sftp.open('file', 'a')) as f:
+                            yield from f.write('yyy')
+
+                        self.assertEqual((yield from sftp.getsize('file')), 8)
+                        self.assertEqual(requests.count(FXP_STAT), 4)
+
+                        self.assertEqual(
+                            sorted((yield from sftp.listdir('dir'))),
+                            ['.', '..', 'file1', 'file2'])
+                        self.assertEqual(
+                            sorted((yield from sftp.listdir('dir'))),
+                            ['.', '..', 'file1', 'file2'])
+                        self.assertTrue((yield from sftp.isfile('dir/file1')))
+                        self.assertEqual(requests.count(FXP_OPENDIR), 1)
+                        self.assertEqual(requests.count(FXP_STAT), 4)
+
+                        yield from sftp.remove('dir/file1')
+                        self.assertFalse((yield from sftp.exists('dir/file1')))
+                        self.assertEqual(
+                            sorted((yield from sftp.listdir('dir'))),
+                            ['.', '..', 'file2'])
+                        self.assertEqual(requests.count(FXP_OPENDIR), 2)
+
+                        yield from sftp.rename('dir', 'dir2')
+                        self.assertFalse((yield from sftp.exists('dir/file2')))
+                        self.assertTrue((yield from sftp.exists('dir2/file2')))
+
+                        self.assertTrue((yield from sftp.exists('file')))
+                        sftp.clear_cache()
+                        self.assertTrue((yield from sftp.exists('file')))
+                        self.assertEqual(requests.count(FXP_STAT), 8)
+
+                    yield from sftp.wait_closed()
+
+                yield from conn.wait_closed()
+        finally:
+            remove('file dir dir2')
+
+    @asynctest
+    def test_attr_cache_copies(self):
+        """Test changing cached attributes doesn't affect the cache"""
+
+        try:
+            self._create_file('file', 'xxx')
+
+            with (yield from self.connect()) as conn:
+                sftp = yield from conn.start_sftp_client(cache_ttl=60)
+
+                with sftp:
+                    for _ in range(2):
+                        attrs = yield from sftp.stat('file')
+                        self.assertEqual(attrs.size, 3)
+                        attrs.size = 0
+
+                        names = yield from sftp.readdir('.')
+                        name = [name for name in names
+                                if name.filename == 'file'][0]
+                        self.assertEqual(name.attrs.size, 3)
+                        name.attrs.size = 0
+                        names.clear()
+
+                yield from sftp.wait_closed()
+
+            yield from conn.wait_closed()
+        finally:
+            remove('file')
+
+    @asynctest
+    def test_attr_cache_eviction(self):
+        """Test expiry and eviction of cached file attributes"""
+
+        requests = []
+        orig_make_request = SFTPClientHandler._make_request
+
+        def _make_request(self, pkttype, *args):
+            """Record the type of each request made"""
+
+            requests.append(pkttype)
+            return orig_make_request(self, pkttype, *args)
+
+        try:
+            self._create_file('file1')
+            self._create_file('file2')
+
+            with patch.object(SFTPClientHandler, '_make_request',
+                              _make_request):
+                with (yield from self.connect()) as conn:
+                    sftp = yield from conn.start_sftp_client(cache_ttl=0.1,
+                                                             cache_size=1)
+
+                    with sftp:
+                        yield from sftp.stat('file1')
+                        yield from sftp.stat('file1')
+                        self.assertEqual(requests.count(FXP_STAT), 1)
+
+                        yield from sftp.stat('file2')
+                        yield from sftp.stat('file1')
+                        self.assertEqual(requests.count(FXP_STAT), 3)
+
+                        yield from asyncio.sleep(0.2)
+
+                        yield from sftp.stat('file1')
+                        self.assertEqual(requests.count(FXP_STAT), 4)
+
+                    yield from sftp.wait_closed()
+
+                yield from conn.wait_closed()
+        finally:
+            remove('file1 file2')
+
     @sftp_test
     def test_setstat(self, sftp):
         """Test setting attributes on a file"""
@@ -840,6 +1844,85 @@ class _TestSFTP(_CheckSFTP):
             remove('file')
 
     @unittest.skipIf(sys.platform == 'win32', 'skip statvfs tests on Windows')
+    def _check_bulk_ops(self, sftp):
+        """Check batched stat, setstat, and remove of multiple paths"""
+
+        requests = []
+        orig_make_request = SFTPClientHandler._make_request
+
+        def _make_request(self, pkttype, *args):
+            """Record the type of each request made"""
+
+            requests.append(pkttype)
+            return orig_make_request(self, pkttype, *args)
+
+        paths = ['file%d' % i for i in range(10)] + ['nonexistent']
+
+        try:
+            for i in range(10):
+                self._create_file('file%d' % i, i*'x')
+
+            with patch.object(SFTPClientHandler, '_make_request',
+                              _make_request):
+                results = yield from sftp.bulk('stat', paths)
+                self.assertEqual([attrs.size for attrs in results[:10]],
+                                 list(range(10)))
+                self.assertEqual(results[10].code, FX_NO_SUCH_FILE)
+
+                results = yield from sftp.bulk('lstat', paths)
+                self.assertEqual(results[9].size, 9)
+                self.assertIsInstance(results[10], SFTPError)
+
+                results = yield from sftp.bulk(
+                    'setstat', ((path, SFTPAttrs(permissions=0o600))
+                                for path in paths))
+                self.assertEqual(results[:10], 10*[None])
+                self.assertIsInstance(results[10], SFTPError)
+                self.assertEqual(stat.S_IMODE(os.stat('file5').st_mode),
+                                 0o600)
+
+                results = yield from sftp.bulk('remove', paths)
+                self.assertEqual(results[:10], 10*[None])
+                self.assertIsInstance(results[10], SFTPError)
+                self.assertEqual([path for path in paths
+                                  if os.path.exists(path)], [])
+
+                self.assertEqual((yield from sftp.bulk('stat', [])), [])
+
+                with self.assertRaises(ValueError):
+                    yield from sftp.bulk('rename', paths)
+
+            return requests
+        finally:
+            remove(' '.join(paths))
+
+    @patch('asyncssh.sftp._MAX_BULK_ITEMS', 4)
+    @sftp_test
+    def test_bulk_ops(self, sftp):
+        """Test batched operations on multiple paths"""
+
+        requests = yield from self._check_bulk_ops(sftp)
+
+        self.assertEqual(requests.count(b'stat-many@asyncssh.com'), 6)
+        self.assertEqual(requests.count(b'setstat-many@asyncssh.com'), 3)
+        self.assertEqual(requests.count(b'remove-many@asyncssh.com'), 3)
+        self.assertNotIn(FXP_STAT, requests)
+
+    def test_bulk_ops_unsupported(self):
+        """Test batched operations with a server that doesn't support them"""
+
+        @sftp_test
+        def _bulk_ops_unsupported(self, sftp):
+            """Fall back to pipelined single requests"""
+
+            requests = yield from self._check_bulk_ops(sftp)
+
+            self.assertEqual(requests.count(FXP_STAT), 11)
+            self.assertNotIn(b'stat-many@asyncssh.com', requests)
+
+        with patch('asyncssh.sftp.SFTPServerHandler._extensions', []):
+            _bulk_ops_unsupported(self)
+
     @sftp_test
     def test_statvfs(self, sftp):
         """Test getting attributes on a filesystem
@@ -1075,6 +2158,158 @@ class _TestSFTP(_CheckSFTP):
         finally:
             remove('dir')
 
+    @sftp_test
+    def test_makedirs(self, sftp):
+        """Test creating a directory and its missing parents"""
+
+        try:
+            os.mkdir('dir')
+
+            yield from sftp.makedirs('dir/dir1/dir2')
+            self.assertTrue(os.path.isdir('dir/dir1/dir2'))
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.makedirs('dir/dir1')
+
+            yield from sftp.makedirs('dir/dir1', exist_ok=True)
+            yield from sftp.makedirs(b'dir/dir1/dir3', exist_ok=True)
+            self.assertTrue(os.path.isdir('dir/dir1/dir3'))
+
+            self._create_file('dir/file')
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.makedirs('dir/file/dir4', exist_ok=True)
+
+            yield from sftp.makedirs(os.path.abspath('dir/dir5'))
+            self.assertTrue(os.path.isdir('dir/dir5'))
+        finally:
+            remove('dir')
+
+    @sftp_test
+    def test_makedirs_concurrent(self, sftp):
+        """Test a directory being created by someone else during makedirs"""
+
+        @asyncio.coroutine
+        def _mkdir(self, path, attrs):
+            """Create the directory just before this client does"""
+
+            os.mkdir(path)
+            return (yield from orig_mkdir(self, path, attrs))
+
+        orig_mkdir = SFTPClientHandler.mkdir
+
+        try:
+            with patch.object(SFTPClientHandler, 'mkdir', _mkdir):
+                with self.assertRaises(SFTPError):
+                    yield from sftp.makedirs('dir')
+
+                yield from sftp.makedirs('dir/dir1', exist_ok=True)
+
+            self.assertTrue(os.path.isdir('dir/dir1'))
+        finally:
+            remove('dir')
+
+    @sftp_test
+    def test_rmtree(self, sftp):
+        """Test recursively removing a directory tree"""
+
+        try:
+            self._create_file('file')
+
+            for dirname in ('dir', 'dir/dir1', 'dir/dir1/dir2', 'dir/dir3'):
+                os.mkdir(dirname)
+
+                for i in range(5):
+                    self._create_file('%s/file%d' % (dirname, i))
+
+            if self._symlink_supported: # pragma: no branch
+                os.symlink('../file', 'dir/link')
+                os.symlink('dir', 'link')
+
+                with self.assertRaises(SFTPError):
+                    yield from sftp.rmtree('link')
+
+            yield from sftp.rmtree('dir')
+
+            self.assertFalse(os.path.exists('dir'))
+            self.assertTrue(os.path.exists('file'))
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.rmtree('dir')
+        finally:
+            remove('dir file link')
+
+    @sftp_test
+    def test_rmtree_error_handler(self, sftp):
+        """Test reporting errors while removing a directory tree"""
+
+        def _remove(self, path):
+            """Fail to remove some of the files in the tree"""
+
+            if path.endswith(b'file1'):
+                raise SFTPError(FX_PERMISSION_DENIED, 'Permission denied')
+            else:
+                return orig_remove(self, path)
+
+        errors = []
+        orig_remove = SFTPServer.remove
+
+        try:
+            os.mkdir('dir')
+            os.mkdir('dir/dir1')
+            os.mkdir('dir/dir2')
+
+            for i in range(3):
+                self._create_file('dir/dir1/file%d' % i)
+
+            for i in range(50):
+                self._create_file('dir/dir2/other%d' % i)
+
+            with patch.object(SFTPServer, 'remove', _remove):
+                with self.assertRaises(SFTPError):
+                    yield from sftp.rmtree('dir')
+
+                # Removal of other subtrees finishes before the error
+                # is raised
+                self.assertEqual(sorted(os.listdir('dir')), ['dir1'])
+
+                yield from sftp.rmtree('dir', error_handler=errors.append)
+
+            self.assertEqual(sorted(exc.code for exc in errors),
+                             [FX_PERMISSION_DENIED, FX_FAILURE, FX_FAILURE])
+            self.assertEqual(sorted(os.listdir('dir/dir1')), ['file1'])
+
+            yield from sftp.rmtree('nonexistent', error_handler=errors.append)
+            self.assertEqual(len(errors), 4)
+        finally:
+            remove('dir')
+
+    @asynctest
+    def test_rmtree_cached(self):
+        """Test removing a directory tree with a stale cached listing"""
+
+        try:
+            os.mkdir('dir')
+            self._create_file('dir/file1')
+
+            with (yield from self.connect()) as conn:
+                sftp = yield from conn.start_sftp_client(cache_ttl=60)
+
+                with sftp:
+                    names = yield from sftp.readdir('dir')
+                    self.assertIn('file1', [name.filename for name in names])
+
+                    self._create_file('dir/file2')
+
+                    yield from sftp.rmtree('dir')
+                    self.assertFalse(os.path.exists('dir'))
+
+                yield from sftp.wait_closed()
+
+            yield from conn.wait_closed()
+        finally:
+            remove('dir')
+
     @sftp_test
     def test_readlink(self, sftp):
         """Test reading a symlink"""
@@ -1175,8 +2410,96 @@ class _TestSFTP(_CheckSFTP):
         try:
             self._create_file('file', 'xxx')
 
-            f = yield from sftp.open('file')
-            self.assertEqual((yield from f.read()), 'xxx')
+            f = yield from sftp.open('file')
+            self.assertEqual((yield from f.read()), 'xxx')
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_open_read_bytes(self, sftp):
+        """Test reading bytes from a file"""
+
+        f = None
+
+        try:
+            self._create_file('file', 'xxx')
+
+            f = yield from sftp.open('file', 'rb')
+            self.assertEqual((yield from f.read()), b'xxx')
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_open_read_buffered(self, sftp):
+        """Test reading data from a file with read-ahead"""
+
+        f = None
+        data = ''.join(chr(ord('a') + i % 26) for i in range(100000))
+
+        try:
+            self._create_file('file', data)
+
+            f = yield from sftp.open('file', block_size=4096, max_requests=8)
+
+            result = []
+
+            while True:
+                chunk = yield from f.read(1000)
+
+                if not chunk:
+                    break
+
+                result.append(chunk)
+
+            self.assertEqual(''.join(result), data)
+            self.assertEqual((yield from f.read()), '')
+
+            self.assertEqual((yield from f.read(10, 5000)), data[5000:5010])
+            self.assertEqual((yield from f.read(10)), data[5010:5020])
+            self.assertEqual((yield from f.read(10, 200)), data[200:210])
+
+            yield from f.seek(95000)
+            self.assertEqual((yield from f.read()), data[95000:])
+
+            yield from f.seek(0)
+            self.assertEqual((yield from f.read(-1)), data)
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_open_readinto(self, sftp):
+        """Test reading data from a file into a buffer"""
+
+        f = None
+        data = bytes(i % 256 for i in range(100000))
+
+        try:
+            with open('file', 'wb') as localf:
+                localf.write(data)
+
+            f = yield from sftp.open('file', 'rb')
+
+            buf = bytearray(60000)
+            self.assertEqual((yield from f.readinto(buf)), 60000)
+            self.assertEqual(buf, data[:60000])
+
+            view = memoryview(buf)[:50000]
+            self.assertEqual((yield from f.readinto(view)), 40000)
+            self.assertEqual(buf[:40000], data[60000:])
+            self.assertEqual((yield from f.readinto(view)), 0)
+
+            self.assertEqual((yield from f.readinto(view[:10], 5)),
+                             10)
+            self.assertEqual(buf[:10], data[5:15])
         finally:
             if f: # pragma: no branch
                 yield from f.close()
@@ -1184,22 +2507,101 @@ class _TestSFTP(_CheckSFTP):
             remove('file')
 
     @sftp_test
-    def test_open_read_bytes(self, sftp):
-        """Test reading bytes from a file"""
+    def test_open_read_parallel(self, sftp):
+        """Test parallel reads at explicit offsets on the same file"""
 
         f = None
+        data = bytes(i % 256 for i in range(100000))
 
         try:
-            self._create_file('file', 'xxx')
+            with open('file', 'wb') as localf:
+                localf.write(data)
 
-            f = yield from sftp.open('file', 'rb')
-            self.assertEqual((yield from f.read()), b'xxx')
+            for block_size in (None, 4096):
+                with self.subTest(block_size=block_size):
+                    f = yield from sftp.open('file', 'rb',
+                                             block_size=block_size)
+
+                    buf = bytearray(20000)
+
+                    results = yield from asyncio.gather(
+                        f.read(30000, 0), f.read(30000, 50000),
+                        f.read(-1, 90000), f.readinto(buf, 10000),
+                        loop=self.loop)
+
+                    self.assertEqual(results, [data[:30000],
+                                               data[50000:80000],
+                                               data[90000:], 20000])
+                    self.assertEqual(buf, data[10000:30000])
+
+                    yield from f.close()
+                    f = None
         finally:
-            if f: # pragma: no branch
+            if f: # pragma: no cover
                 yield from f.close()
 
             remove('file')
 
+    @asynctest
+    def test_local_file_positional_io(self):
+        """Test positional reads and writes on a local file"""
+
+        for positional in (True, False):
+            with self.subTest(positional=positional):
+                f = None
+
+                try:
+                    with patch('asyncssh.sftp._positional_io', positional):
+                        with patch('os.pwrite', wraps=os.pwrite) as pwrite:
+                            f = yield from LocalFile.open('file', 'w+b')
+
+                            yield from f.write(b'yyyy', 4)
+                            yield from f.write(b'xxxx', 0)
+
+                            self.assertEqual(pwrite.called, positional)
+
+                        yield from f.close()
+                        f = yield from LocalFile.open('file', 'rb')
+
+                        with patch('os.pread', wraps=os.pread) as pread:
+                            self.assertEqual((yield from f.read(4, 2)),
+                                             b'xxyy')
+                            self.assertEqual(pread.called, positional)
+
+                        yield from f.close()
+                        f = yield from LocalFile.open('file', 'ab')
+
+                        with patch('os.pwrite', wraps=os.pwrite) as pwrite:
+                            yield from f.write(b'zz', 0)
+                            self.assertFalse(pwrite.called)
+
+                        yield from f.close()
+                        f = None
+
+                    with open('file', 'rb') as localf:
+                        self.assertEqual(localf.read(), b'xxxxyyyyzz')
+                finally:
+                    if f: # pragma: no branch
+                        yield from f.close()
+
+                    remove('file')
+
+    @sftp_test
+    def test_positional_io_fallback(self, sftp):
+        """Test transferring files without positional reads and writes"""
+
+        try:
+            self._create_file('src', 4*1024*1024*'\0')
+
+            with patch('asyncssh.sftp._positional_io', False):
+                yield from sftp.get('src', 'dst')
+                self._check_file('src', 'dst')
+
+                yield from sftp.put('src', 'dst2')
+                self._check_file('src', 'dst2')
+        finally:
+            remove('src dst dst2')
+
     @sftp_test
     def test_open_read_offset_size(self, sftp):
         """Test reading at a specific offset and size"""
@@ -1287,6 +2689,85 @@ class _TestSFTP(_CheckSFTP):
 
             remove('file')
 
+    @sftp_test
+    def test_open_write_buffered(self, sftp):
+        """Test writing data to a file with write-behind"""
+
+        f = None
+        data = ''.join(chr(ord('a') + i % 26) for i in range(100000))
+
+        try:
+            f = yield from sftp.open('file', 'w+', block_size=4096,
+                                     max_requests=4)
+
+            for i in range(0, len(data), 1000):
+                yield from f.write(data[i:i+1000])
+
+            self.assertEqual((yield from f.stat()).size, len(data))
+
+            yield from f.write('xxx', 10)
+            yield from f.write('yyy', 50000)
+            yield from f.fsync()
+
+            yield from f.seek(0)
+            self.assertEqual((yield from f.read(20)),
+                             data[:10] + 'xxx' + data[13:20])
+
+            yield from f.close()
+
+            with open('file') as localf:
+                self.assertEqual(localf.read(),
+                                 data[:10] + 'xxx' + data[13:50000] +
+                                 'yyy' + data[50003:])
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_open_append_buffered(self, sftp):
+        """Test appending data to a file with write-behind"""
+
+        f = None
+
+        try:
+            self._create_file('file', 'xxx')
+
+            f = yield from sftp.open('file', 'a', block_size=4)
+
+            for _ in range(10):
+                yield from f.write('yyy')
+
+            self.assertEqual((yield from f.tell()), 33)
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            with open('file') as localf:
+                self.assertEqual(localf.read(), 'xxx' + 10*'yyy')
+
+            remove('file')
+
+    @sftp_test
+    def test_open_write_buffered_context_manager(self, sftp):
+        """Test buffered writes refuse a non-async context manager"""
+
+        try:
+            f = yield from sftp.open('file', 'w', block_size=4096)
+
+            with self.assertRaises(ValueError):
+                with f:
+                    pass # pragma: no cover
+
+            with self.assertRaises(ValueError):
+                yield from f.write('xxx')
+
+            with (yield from sftp.open('file', block_size=4096)) as f:
+                self.assertEqual((yield from f.read()), '')
+        finally:
+            remove('file')
+
     @sftp_test
     def test_open_truncate(self, sftp):
         """Test truncating a file at open time"""
@@ -1565,6 +3046,55 @@ class _TestSFTP(_CheckSFTP):
 
             remove('file')
 
+    @sftp_test
+    def test_check_file(self, sftp):
+        """Test getting hashes of a remote file from the server"""
+
+        data = ''.join(chr(ord('a') + i % 26) for i in range(50000))
+        expected = data.encode()
+
+        f = None
+
+        try:
+            self._create_file('file', data)
+
+            alg, hashes = yield from sftp.check_file('file')
+            self.assertEqual(alg, 'sha256')
+            self.assertEqual(hashes, [hashlib.sha256(expected).digest()])
+
+            alg, hashes = yield from sftp.check_file('file', ['xxx', 'md5'],
+                                                     offset=100, length=5000,
+                                                     block_size=1024)
+            self.assertEqual(alg, 'md5')
+            self.assertEqual(hashes,
+                             [hashlib.md5(expected[i:min(i+1024,
+                                                         5100)]).digest()
+                              for i in range(100, 5100, 1024)])
+
+            f = yield from sftp.open('file')
+
+            alg, hashes = yield from f.check_file('sha1', block_size=20000)
+            self.assertEqual(alg, 'sha1')
+            self.assertEqual(hashes,
+                             [hashlib.sha1(expected[i:i+20000]).digest()
+                              for i in range(0, 50000, 20000)])
+
+            with self.assertRaises(SFTPError) as exc:
+                yield from sftp.check_file('file', 'xxx')
+
+            self.assertEqual(exc.exception.code, FX_OP_UNSUPPORTED)
+
+            with self.assertRaises(SFTPError):
+                yield from f.check_file(block_size=100)
+
+            with self.assertRaises(SFTPError):
+                yield from sftp.check_file('nonexistent')
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
     @sftp_test
     def test_file_sync(self, sftp):
         """Test file sync"""
@@ -2081,11 +3611,20 @@ class _TestSFTP(_CheckSFTP):
 
                 with self.assertRaises(SFTPError):
                     yield from f.fsync()
+
+                with self.assertRaises(SFTPError):
+                    yield from f.check_file()
+
+                with self.assertRaises(SFTPError):
+                    yield from sftp.check_file('file1')
+
+                yield from sftp.copy('file1', 'file2')
+                self._check_file('file1', 'file2')
             finally:
                 if f: # pragma: no branch
                     yield from f.close()
 
-                remove('file1')
+                remove('file1 file2')
 
         with patch('asyncssh.sftp.SFTPServerHandler._extensions', []):
             sftp_test(_unsupported_extensions)(self)
@@ -2243,6 +3782,87 @@ class _TestSFTPIOError(_CheckSFTP):
                 finally:
                     remove('src dst')
 
+    @sftp_test
+    def test_buffered_write_error(self, sftp):
+        """Test error reported after a buffered write fails"""
+
+        f = None
+
+        try:
+            f = yield from sftp.open('file', 'wb', block_size=16384,
+                                     max_requests=1)
+
+            with self.assertRaises(SFTPError):
+                for _ in range(6):
+                    yield from f.write(16384*b'\0')
+
+            yield from f.write(b'\0', 70000)
+
+            with self.assertRaises(SFTPError):
+                yield from f.close()
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+
+class _TestSFTPShortRead(_CheckSFTP):
+    """Unit test for SFTP server returning short reads"""
+
+    @classmethod
+    @asyncio.coroutine
+    def start_server(cls):
+        """Start an SFTP server which returns short reads"""
+
+        return (yield from cls.create_server(sftp_factory=_ShortReadSFTPServer))
+
+    @sftp_test
+    def test_buffered_short_read(self, sftp):
+        """Test read-ahead when the server returns short reads"""
+
+        f = None
+        data = ''.join(chr(ord('a') + i % 26) for i in range(100000))
+
+        try:
+            self._create_file('file', data)
+
+            f = yield from sftp.open('file', block_size=4096)
+
+            self.assertEqual((yield from f.read(3000)), data[:3000])
+            self.assertEqual((yield from f.read()), data[3000:])
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_delta_short_read(self, sftp):
+        """Test block checksums when the server returns short reads"""
+
+        old = os.urandom(50000)
+        new = old[:20000] + b'x' + old[20001:]
+
+        try:
+            with open('src', 'wb') as f:
+                f.write(old)
+
+            with open('dst', 'wb') as f:
+                f.write(new)
+
+            patcher, transfers = _count_transfers('write')
+
+            with patcher:
+                yield from sftp.put('dst', 'src', block_size=4096, delta=True)
+
+            with open('src', 'rb') as f:
+                self.assertEqual(f.read(), new)
+
+            self.assertLessEqual(sum(transfers), 8192)
+        finally:
+            remove('src dst')
+
 
 class _TestSFTPNotImplemented(_CheckSFTP):
     """Unit test for SFTP server returning not-implemented error"""
@@ -2261,6 +3881,15 @@ class _TestSFTPNotImplemented(_CheckSFTP):
         with self.assertRaises(SFTPError):
             yield from sftp.symlink('file', 'link')
 
+    @sftp_test
+    def test_bulk_remove_error(self, sftp):
+        """Test per-path errors when removing files on an SFTP server"""
+
+        results = yield from sftp.bulk('remove', ['file1', 'file2'])
+
+        self.assertEqual([result.code for result in results],
+                         2*[FX_OP_UNSUPPORTED])
+
 
 class _TestSFTPLongname(_CheckSFTP):
     """Unit test for SFTP server formatting directory listings"""
@@ -2440,6 +4069,80 @@ class _TestSFTPChown(_CheckSFTP):
             remove('file')
 
 
+@unittest.skipUnless(hasattr(os, 'pwritev'), 'skip merged write tests '
+                     'without pwritev')
+class _TestSFTPMergedWrites(_CheckSFTP):
+    """Unit tests for merging adjacent writes on the SFTP server"""
+
+    @classmethod
+    @asyncio.coroutine
+    def start_server(cls):
+        """Start an SFTP server which uses the default write method"""
+
+        return (yield from cls.create_server(sftp_factory=True))
+
+    @sftp_test
+    def test_write_merged(self, sftp):
+        """Test merging adjacent writes into a single vectored write"""
+
+        f = None
+
+        try:
+            f = yield from sftp.open('file', 'w+b')
+
+            with patch('os.pwritev', wraps=os.pwritev) as pwritev:
+                yield from asyncio.gather(*(f.write(4096*bytes((i,)), i*4096)
+                                            for i in range(64)),
+                                          loop=self.loop)
+
+                self.assertGreater(pwritev.call_count, 0)
+                self.assertLess(pwritev.call_count, 64)
+
+                data = yield from asyncio.gather(f.write(b'xxxx', 4096),
+                                                 f.read(8, 4092),
+                                                 loop=self.loop)
+                self.assertEqual(data[1], 4*b'\0' + b'xxxx')
+
+            yield from f.close()
+
+            with open('file', 'rb') as localf:
+                data = localf.read()
+
+            self.assertEqual(len(data), 64*4096)
+            self.assertEqual(data[4096:4100], b'xxxx')
+            self.assertEqual(data[8192:], b''.join(4096*bytes((i,))
+                                                   for i in range(2, 64)))
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+    @sftp_test
+    def test_write_merged_error(self, sftp):
+        """Test an error returned for all writes merged together"""
+
+        f = None
+
+        try:
+            f = yield from sftp.open('file', 'wb')
+
+            with patch('os.pwritev', side_effect=OSError(errno.ENOSPC,
+                                                          'No space')):
+                results = yield from asyncio.gather(
+                    *(f.write(b'xxxx', i*4) for i in range(16)),
+                    loop=self.loop, return_exceptions=True)
+
+            for result in results:
+                self.assertIsInstance(result, SFTPError)
+                self.assertEqual(result.code, FX_FAILURE)
+        finally:
+            if f: # pragma: no branch
+                yield from f.close()
+
+            remove('file')
+
+
 class _TestSFTPAttrs(unittest.TestCase):
     """Unit test for SFTPAttrs object"""
 
@@ -2580,6 +4283,30 @@ class _TestSCP(_CheckSCP):
         finally:
             remove('src dst')
 
+    @asynctest
+    def test_get_hash(self):
+        """Test computing a digest of a file while getting it over SCP"""
+
+        def _report_hash(srcpath, dstpath, digest):
+            """Record the digest of each file copied"""
+
+            # pylint: disable=unused-argument
+
+            digests.append(digest)
+
+        digests = []
+
+        try:
+            self._create_file('src', 100000*'a')
+            yield from scp((self._scp_server, 'src'), 'dst', block_size=8192,
+                           hash_handler=_report_hash)
+            self._check_file('src', 'dst')
+
+            self.assertEqual(digests,
+                             [hashlib.sha256(100000*b'a').digest()])
+        finally:
+            remove('src dst')
+
     @asynctest
     def test_get_preserve(self):
         """Test getting a file with preserved attributes over SCP"""
@@ -2740,6 +4467,30 @@ class _TestSCP(_CheckSCP):
         finally:
             remove('src dst')
 
+    @asynctest
+    def test_put_hash(self):
+        """Test computing a digest of a file while putting it over SCP"""
+
+        def _report_hash(srcpath, dstpath, digest):
+            """Record the digest of each file copied"""
+
+            # pylint: disable=unused-argument
+
+            digests.append(digest)
+
+        digests = []
+
+        try:
+            self._create_file('src', 100000*'a')
+            yield from scp('src', (self._scp_server, 'dst'), block_size=8192,
+                           hash_handler=_report_hash)
+            self._check_file('src', 'dst')
+
+            self.assertEqual(digests,
+                             [hashlib.sha256(100000*b'a').digest()])
+        finally:
+            remove('src dst')
+
     @asynctest
     def test_put_preserve(self):
         """Test putting a file with preserved attributes over SCP"""
@@ -2916,6 +4667,31 @@ class _TestSCP(_CheckSCP):
         finally:
             remove('src dst')
 
+    @asynctest
+    def test_copy_hash(self):
+        """Test computing a digest of a file while copying it over SCP"""
+
+        def _report_hash(srcpath, dstpath, digest):
+            """Record the digest of each file copied"""
+
+            # pylint: disable=unused-argument
+
+            digests.append(digest)
+
+        digests = []
+
+        try:
+            self._create_file('src', 100000*'a')
+            yield from scp((self._scp_server, 'src'),
+                           (self._scp_server, 'dst'), block_size=8192,
+                           hash_handler=_report_hash)
+            self._check_file('src', 'dst')
+
+            self.assertEqual(digests,
+                             [hashlib.sha256(100000*b'a').digest()])
+        finally:
+            remove('src dst')
+
     @asynctest
     def test_copy_preserve(self):
         """Test copying a file with preserved attributes between hosts"""
@@ -14,6 +14,7 @@
 
 import time
 import unittest
+from unittest.mock import patch
 
 from cryptography import x509
 
@@ -25,6 +26,7 @@ if x509_available: # pragma: no branch
     from asyncssh.crypto import X509Name, X509NamePattern
     from asyncssh.crypto import generate_x509_certificate
     from asyncssh.crypto import import_x509_certificate
+    from asyncssh.crypto.x509 import crypto as openssl_crypto
 
 _purpose_secureShellClient = x509.ObjectIdentifier('1.3.6.1.5.5.7.3.21')
 
@@ -145,6 +147,49 @@ class _TestX509(unittest.TestCase):
 
         self.assertIsNone(cert.validate([int_ca, root_ca], None, None, None))
 
+    def test_validation_cache(self):
+        """Test caching successful validations of X.509 certificates"""
+
+        root_ca = self.generate_certificate('OU=root', ca=True, ca_path_len=0)
+        cert = self.generate_certificate('OU=user', 'OU=root')
+
+        with patch('asyncssh.crypto.x509.crypto.X509StoreContext',
+                   wraps=openssl_crypto.X509StoreContext) as ctx:
+            for _ in range(3):
+                cert.validate([root_ca], None, None, None)
+
+            self.assertEqual(ctx.call_count, 1)
+
+            cert.validate([root_ca, cert], None, None, None)
+            self.assertEqual(ctx.call_count, 2)
+
+    def test_store_cache(self):
+        """Test reusing a trust store for the same trusted certificates"""
+
+        root_ca = self.generate_certificate('OU=root', ca=True, ca_path_len=0)
+        cert1 = self.generate_certificate('OU=user1', 'OU=root')
+        cert2 = self.generate_certificate('OU=user2', 'OU=root')
+
+        with patch('asyncssh.crypto.x509.crypto.X509Store',
+                   wraps=openssl_crypto.X509Store) as store:
+            cert1.validate([root_ca], None, None, None)
+            cert2.validate([root_ca], None, None, None)
+
+            self.assertEqual(store.call_count, 1)
+
+    def test_validation_cache_expiry(self):
+        """Test revalidating an X.509 certificate after it expires"""
+
+        cert = self.generate_certificate(valid_before=time.time() + 60)
+        cert.validate([cert], None, None, None)
+
+        with patch('asyncssh.crypto.x509.crypto.X509StoreContext',
+                   wraps=openssl_crypto.X509StoreContext) as ctx:
+            with patch('time.time', return_value=time.time() + 120):
+                cert.validate([cert], None, None, None)
+
+            self.assertEqual(ctx.call_count, 1)
+
     def test_incomplete_chain(self):
         """Test failed validation of incomplete X.509 certificate chain"""
 
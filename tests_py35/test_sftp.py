@@ -94,3 +94,51 @@ class _TestSFTP(ServerTestCase):
                         yield from f.close()
 
                     os.unlink('file')
+
+    @asynctest35
+    async def test_sftp_file_async_iterator(self):
+        """Test reading SFTP file data by using it as an async iterator"""
+
+        data = bytes(i % 256 for i in range(100000))
+
+        with open('file', 'wb') as f:
+            f.write(data)
+
+        async with self.connect() as conn:
+            async with conn.start_sftp_client() as sftp:
+                try:
+                    async with sftp.open('file', 'rb') as f:
+                        chunks = [chunk async for chunk in f]
+
+                    self.assertEqual(b''.join(chunks), data)
+                    self.assertEqual(len(chunks[0]),
+                                     min(len(data), sftp.limits.max_read_len))
+
+                    async with sftp.open('file', 'rb',
+                                         block_size=4096) as f:
+                        await f.seek(1000)
+                        chunks = [chunk async for chunk in f]
+
+                    self.assertEqual(b''.join(chunks), data[1000:])
+                    self.assertEqual(len(chunks[0]), 4096)
+                finally:
+                    os.unlink('file')
+
+    @asynctest35
+    async def test_sftp_file_async_iterator_text(self):
+        """Test decoding text from an SFTP file used as an async iterator"""
+
+        data = 5000 * 'é€'
+
+        with open('file', 'w', encoding='utf-8') as f:
+            f.write(data)
+
+        async with self.connect() as conn:
+            async with conn.start_sftp_client() as sftp:
+                try:
+                    async with sftp.open('file', block_size=1000) as f:
+                        chunks = [chunk async for chunk in f]
+
+                    self.assertEqual(''.join(chunks), data)
+                finally:
+                    os.unlink('file')